@@ -0,0 +1,227 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from host_scheduler import host_key
+from run_context import run_component
+
+#
+# 3.8 АДАПТИВНА КІЛЬКІСТЬ ОДНОЧАСНИХ ПЕРЕВІРОК (AIMD)
+#
+
+# Початковий ліміт одночасних перевірок: загальний і для одного хоста
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_INITIAL_HOST_LIMIT = 2
+DEFAULT_MAX_HOST_LIMIT = 16
+# У скільки разів зменшується ліміт після перевантаження і як часто можна зменшувати його знову (секунди)
+DEFAULT_DECREASE_FACTOR = 0.5
+DEFAULT_DECREASE_INTERVAL = 1.0
+# Затримка відповіді вважається ознакою перевантаження, якщо вона в стільки разів більша за найменшу
+# нещодавню затримку хоста і не менша за DEFAULT_MIN_SLOW_LATENCY секунд
+DEFAULT_LATENCY_TOLERANCE = 4
+DEFAULT_MIN_SLOW_LATENCY = 1.0
+LATENCY_WINDOW = 50 # Скільки останніх затримок хоста враховується для базової
+# Загальний ліміт зменшується через збої окремих хостів лише тоді, коли серед останніх ERROR_WINDOW відповідей
+# (щонайменше MIN_ERROR_SAMPLES) частка таймаутів, помилок з'єднання та повільних відповідей не менша за DEFAULT_ERROR_RATE
+ERROR_WINDOW = 50
+MIN_ERROR_SAMPLES = 10
+DEFAULT_ERROR_RATE = 0.5
+
+# Статус-коди, якими сервер прямо просить зменшити навантаження
+OVERLOAD_STATUS_CODES = (429, 503)
+
+class AdaptiveLimit:
+    """Ліміт одночасних перевірок, що змінюється за AIMD.
+
+    Кожна успішна відповідь збільшує ліміт на 1/limit (приблизно +1 за кожне "вікно" успішних запитів),
+    перевантаження зменшує його в decrease_factor разів, але не частіше ніж раз на decrease_interval секунд,
+    щоб одна хвиля помилок не обвалила ліміт до мінімуму.
+    """
+
+    def __init__(self, initial, max_limit, min_limit=1, decrease_factor=DEFAULT_DECREASE_FACTOR,
+                 decrease_interval=DEFAULT_DECREASE_INTERVAL):
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.limit = float(min(max(initial, min_limit), self.max_limit))
+        self.decrease_factor = decrease_factor
+        self.decrease_interval = decrease_interval
+        self.lowest = self.highest = self.limit
+        self.decreases = 0
+        self._in_flight = 0
+        self._last_decrease = None
+        self._cond = threading.Condition()
+        self._changed = None # asyncio.Event для asyncio-рушія (створюється в його циклі подій)
+        self._changed_loop = None
+
+    def _capacity(self):
+        return max(self.min_limit, int(self.limit))
+
+    def try_acquire(self):
+        """Займає місце, якщо поточний ліміт дозволяє; повертає True у такому разі."""
+        with self._cond:
+            if self._in_flight >= self._capacity():
+                return False
+            self._in_flight += 1
+            return True
+
+    def acquire(self):
+        """Займає місце, чекаючи, доки одночасних перевірок стане менше за ліміт."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._in_flight < self._capacity())
+            self._in_flight += 1
+
+    async def acquire_async(self):
+        """Асинхронний аналог acquire; усі виклики для цього ліміту мають іти з одного циклу подій."""
+        loop = asyncio.get_running_loop()
+        if self._changed_loop is not loop:
+            self._changed, self._changed_loop = asyncio.Event(), loop
+        while not self.try_acquire():
+            self._changed.clear()
+            await self._changed.wait()
+
+    def release(self):
+        """Звільняє місце."""
+        with self._cond:
+            self._in_flight -= 1
+            self._notify()
+
+    def _notify(self):
+        # Викликається під self._cond
+        self._cond.notify_all()
+        if self._changed is not None:
+            self._changed.set()
+
+    def on_success(self):
+        """Адитивне збільшення після успішної відповіді."""
+        with self._cond:
+            before = self._capacity()
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.highest = max(self.highest, self.limit)
+            if self._capacity() > before:
+                self._notify()
+
+    def on_overload(self):
+        """Мультиплікативне зменшення після перевантаження (таймаут, 429/503, повільна відповідь)."""
+        with self._cond:
+            now = time.monotonic()
+            if self._last_decrease is not None and now - self._last_decrease < self.decrease_interval:
+                return
+            self._last_decrease = now
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            self.lowest = min(self.lowest, self.limit)
+            self.decreases += 1
+
+class ConcurrencyController:
+    """Адаптивна кількість одночасних перевірок: загальна та для кожного хоста.
+
+    Рушій займає місце (slot/async_slot) перед перевіркою донора, а кожна відповідь або збій запиту
+    повідомляється через observe(). Таймаути, помилки з'єднання та відповіді, набагато повільніші за звичні
+    для хоста, зменшують ліміт лише цього хоста: кілька мертвих чи повільних донорів не обмежують решту.
+    Загальний ліміт зменшують статуси 429/503 (сервер прямо просить зменшити навантаження) або частка таких
+    збоїв серед останніх відповідей, не менша за error_rate. Успішні відповіді поступово збільшують обидва ліміти.
+    max_limit - верхня межа загального ліміту (кількість потоків або одночасних рядків рушія).
+    """
+
+    def __init__(self, max_limit, initial_limit=DEFAULT_INITIAL_LIMIT, initial_host_limit=DEFAULT_INITIAL_HOST_LIMIT,
+                 max_host_limit=DEFAULT_MAX_HOST_LIMIT, latency_tolerance=DEFAULT_LATENCY_TOLERANCE,
+                 min_slow_latency=DEFAULT_MIN_SLOW_LATENCY, decrease_interval=DEFAULT_DECREASE_INTERVAL,
+                 error_rate=DEFAULT_ERROR_RATE):
+        self.global_limit = AdaptiveLimit(initial_limit, max_limit, decrease_interval=decrease_interval)
+        self.initial_host_limit = initial_host_limit
+        self.max_host_limit = max_host_limit
+        self.latency_tolerance = latency_tolerance
+        self.min_slow_latency = min_slow_latency
+        self.decrease_interval = decrease_interval
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._hosts = {} # host -> AdaptiveLimit
+        self._latencies = {} # host -> deque останніх затримок, секунди
+        self._recent_errors = deque(maxlen=ERROR_WINDOW) # Чи був збій хоста, для останніх відповідей
+
+    def _host_limit(self, url):
+        host = host_key(url)
+        if host is None:
+            return None
+        with self._lock:
+            limit = self._hosts.get(host)
+            if limit is None:
+                limit = self._hosts[host] = AdaptiveLimit(self.initial_host_limit, self.max_host_limit,
+                                                          decrease_interval=self.decrease_interval)
+            return limit
+
+    @contextmanager
+    def slot(self, url):
+        """Місце для перевірки донора: спершу в ліміті хоста, потім у загальному."""
+        host_limit = self._host_limit(url)
+        if host_limit is not None:
+            host_limit.acquire()
+        try:
+            self.global_limit.acquire()
+            try:
+                yield
+            finally:
+                self.global_limit.release()
+        finally:
+            if host_limit is not None:
+                host_limit.release()
+
+    @asynccontextmanager
+    async def async_slot(self, url):
+        """Асинхронний аналог slot для asyncio-рушія."""
+        host_limit = self._host_limit(url)
+        if host_limit is not None:
+            await host_limit.acquire_async()
+        try:
+            await self.global_limit.acquire_async()
+            try:
+                yield
+            finally:
+                self.global_limit.release()
+        finally:
+            if host_limit is not None:
+                host_limit.release()
+
+    def _is_slow(self, host, latency):
+        # Повільна відповідь порівняно з найменшою нещодавньою затримкою хоста; затримка додається до вікна
+        with self._lock:
+            latencies = self._latencies.setdefault(host, deque(maxlen=LATENCY_WINDOW))
+            baseline = min(latencies) if latencies else None
+            latencies.append(latency)
+        return baseline is not None and latency >= self.min_slow_latency and latency > baseline * self.latency_tolerance
+
+    def _error_rate_exceeded(self, host_failure):
+        # Додає результат до вікна останніх відповідей; True - частка збоїв хостів досягла error_rate (вікно очищується)
+        with self._lock:
+            self._recent_errors.append(host_failure)
+            if len(self._recent_errors) < MIN_ERROR_SAMPLES or sum(self._recent_errors) < self.error_rate * len(self._recent_errors):
+                return False
+            self._recent_errors.clear()
+            return True
+
+    def observe(self, url, latency=None, status_code=None, failed=False):
+        """Результат запиту до URL: затримка до заголовків, статус-код або failed=True (таймаут, з'єднання)."""
+        host = host_key(url)
+        host_limit = self._host_limit(url)
+        host_failure = failed or (latency is not None and host is not None and self._is_slow(host, latency))
+        server_overload = status_code in OVERLOAD_STATUS_CODES
+        if host_limit is not None:
+            if host_failure or server_overload:
+                host_limit.on_overload()
+            else:
+                host_limit.on_success()
+        if server_overload or self._error_rate_exceeded(host_failure):
+            self.global_limit.on_overload()
+        elif not host_failure:
+            self.global_limit.on_success()
+
+    def stats(self):
+        """Поточний, найменший і найбільший загальний ліміт та кількість його зменшень."""
+        limit = self.global_limit
+        with limit._cond:
+            return {"limit": limit._capacity(), "lowest": int(limit.lowest), "highest": int(limit.highest), "decreases": limit.decreases}
+
+def get_concurrency_controller():
+    """Контролер одночасних перевірок активного запуску або None."""
+    return run_component("concurrency_controller")
@@ -0,0 +1,582 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import pandas as pd
+import requests
+
+try:
+    import aiohttp
+    from aiohttp.abc import AbstractResolver
+except ImportError:  # aiohttp потрібен лише для asyncio-рушія, основний шлях працює без нього
+    aiohttp = None
+    AbstractResolver = object
+
+from utils import normalize_url, is_ssl_error, buffered_row_output, routed_stdout
+from seo_checks import robots_entry, evaluate_robots_entry, get_robots_cache, stored_robots_lookup, robots_entry_from_response, robots_verify_ssl
+from indexing_checks import format_search_query, build_indexing_params, parse_indexing_response, VALUESERP_SEARCH_URL
+from request_processor import (_new_row_result, _process_response, _is_html_response, _decode_html, _completion_tracker, _reuse_page_results,
+                               _remember_page_results, _new_seo_results, _check_page_content, _row_pairs, _group_rows_by_donor,
+                               _fan_out_results, _results_in_row_order, _dns_failed, _host_unavailable, _unexpected_error_results,
+                               _row_deadline_seconds, _check_order, IN_FLIGHT_PER_WORKER)
+from page_cache import PageCache, page_inputs_key, get_page_cache
+from http_client import default_headers, request_timeout, get_pool_maxsize, accepts_byte_ranges, is_partial_content_truncated, BODY_CHUNK_SIZE
+from retry_policy import get_retry_policy
+from ssl_registry import get_ssl_registry
+from host_scheduler import get_host_scheduler, host_delay
+from adaptive_concurrency import get_concurrency_controller
+from single_flight import coalesced_async
+from host_breaker import record_host_result
+from proxy_pool import get_proxy_pool
+from dns_cache import get_dns_cache
+from redirect_cache import RedirectWalk, REDIRECT_STATUS_CODES
+from timeouts import DEADLINE_MESSAGE, RowDeadlineExceeded, get_host_timeouts, row_deadline, time_left, check_deadline, fits_deadline, is_deadline_error
+
+logger = logging.getLogger(__name__)
+
+#
+# 3.1 ASYNCIO-РУШІЙ ПЕРЕВІРОК (aiohttp)
+#
+# Блокуюча робота рядка (SQLite-сховища robots.txt, сторінок і SSL-хостів, визначення кодування, розбір
+# BeautifulSoup) виконується через asyncio.to_thread: цикл подій не зупиняється, а потік отримує копію
+# контексту задачі - активний запуск, ліміт часу рядка та буфер її виводу.
+#
+
+def _request_errors():
+    """Винятки aiohttp, що відповідають requests.exceptions.RequestException у блокуючому шляху."""
+    return (aiohttp.ClientError, asyncio.TimeoutError, RowDeadlineExceeded, requests.exceptions.TooManyRedirects)
+
+def _error_text(error):
+    """Текст помилки; asyncio.TimeoutError має порожній str(), тому підставляємо назву класу.
+
+    Таймаут, що спрацював через вичерпаний ліміт часу рядка, описується так само, як у блокуючому шляху.
+    """
+    left = time_left()
+    if isinstance(error, asyncio.TimeoutError) and left is not None and left <= 0:
+        return DEADLINE_MESSAGE
+    return str(error) or type(error).__name__
+
+def _is_ssl_failure(error):
+    """Чи є помилка aiohttp помилкою SSL.
+
+    Текст ClientConnectorError завжди містить "ssl:default", тому для нього перевіряємо лише
+    вихідну помилку ОС, а не повний текст.
+    """
+    if isinstance(error, aiohttp.ClientSSLError):
+        return True
+    if isinstance(error, aiohttp.ClientConnectorError):
+        return is_ssl_error(str(error.os_error))
+    return is_ssl_error(_error_text(error))
+
+def _is_transient_failure(error):
+    """Аналог retry_policy.is_transient_error для aiohttp: помилка з'єднання або таймаут, але не SSL."""
+    if not isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+        return False
+    return not _is_ssl_failure(error)
+
+async def _send_with_retries_async(send, label, url=None):
+    """Асинхронний аналог retry_policy.send_with_retries: повтори тимчасових збоїв за активною політикою."""
+    try:
+        response = await _retry_loop_async(send, label, url)
+    except _request_errors() as e:
+        error_text = _error_text(e)
+        if _is_transient_failure(e) and error_text != DEADLINE_MESSAGE: # Вичерпаний ліміт часу рядка - не збій хоста
+            record_host_result(url, error_text)
+        raise
+    record_host_result(url)
+    return response
+
+async def _retry_loop_async(send, label, url=None):
+    policy = get_retry_policy()
+    host_timeouts = get_host_timeouts()
+    controller = get_concurrency_controller()
+    attempt = 0
+    while True:
+        try:
+            await asyncio.sleep(host_delay(url)) # Черга хоста в планувальнику хостів
+            started = time.monotonic()
+            response = await send()
+        except _request_errors() as e:
+            if controller is not None and url is not None and _is_transient_failure(e):
+                controller.observe(url, failed=True)
+            if policy is None or not _is_transient_failure(e):
+                raise
+            wait = policy.delay(attempt)
+            if not fits_deadline(wait) or not policy.acquire(attempt):
+                raise
+            print(f"   🔁 {label}: {_error_text(e)} - повтор {attempt + 1} через {wait:.1f} с")
+        else:
+            if host_timeouts is not None:
+                # Час до заголовків відповіді (разом з редиректами) - затримка хоста фінального URL
+                host_timeouts.record(str(response.url), time.monotonic() - started)
+            if controller is not None and url is not None:
+                controller.observe(url, time.monotonic() - started, response.status)
+            if policy is None or not policy.should_retry_status(response.status):
+                return response
+            wait = policy.delay(attempt, response.headers.get('Retry-After'))
+            if not fits_deadline(wait) or not policy.acquire(attempt):
+                return response
+            response.release()
+            print(f"   🔁 {label}: статус {response.status} - повтор {attempt + 1} через {wait:.1f} с")
+        await asyncio.sleep(wait)
+        attempt += 1
+
+async def _request(session, method, url, **kwargs):
+    """session.request через активний пул проксі (лише HTTP-проксі; без пулу - напряму).
+
+    Аналог proxy_pool.ProxyPoolAdapter: місце в ліміті проксі займається до отримання заголовків відповіді.
+    """
+    pool = get_proxy_pool()
+    proxy_url = pool.proxy_for(url, allow_socks=False) if pool is not None else None
+    if proxy_url is None:
+        return await session.request(method, url, **kwargs)
+    async with pool.async_slot(proxy_url):
+        started = time.monotonic()
+        try:
+            response = await session.request(method, url, proxy=proxy_url, **kwargs)
+        except _request_errors() as e:
+            if isinstance(e, (aiohttp.ClientProxyConnectionError, aiohttp.ClientHttpProxyError)):
+                pool.observe(proxy_url, proxy_error=True)
+            elif _is_transient_failure(e) and _error_text(e) != DEADLINE_MESSAGE:
+                pool.observe(proxy_url, failed=True, url=url)
+            raise
+    pool.observe(proxy_url, time.monotonic() - started, response.status, url=url)
+    return response
+
+def _timeout(kind, url=None):
+    """Таймаут aiohttp для запиту типу kind до url.
+
+    З'єднання та читання з сокета обмежені адаптивним таймаутом хоста (семантика requests), а весь запит
+    разом з тілом - залишком часу рядка; запит до ValueSerp API ("api") обмежено повністю.
+    """
+    seconds = request_timeout(kind, url)
+    if kind == "api":
+        return aiohttp.ClientTimeout(total=seconds)
+    return aiohttp.ClientTimeout(total=time_left(), sock_connect=seconds, sock_read=seconds)
+
+class _ResponseView:
+    """Відповідь aiohttp в інтерфейсі, який очікує _process_response (status_code, url, history).
+
+    history - кроки ланцюжка, пройдені вручну (redirect_cache.RedirectWalk); без них - з самої відповіді.
+    """
+
+    def __init__(self, response, history=None):
+        self.status_code = response.status
+        self.url = str(response.url)
+        self.headers = response.headers
+        self.history = history if history else [_ResponseView(resp) for resp in response.history]
+
+async def _read_page_async(response, final_url, pairs_list, max_body_bytes=None):
+    """Асинхронний аналог request_processor._read_page: потокове читання HTML з лімітом і ранньою зупинкою."""
+    if not _is_html_response(response.headers):
+        print(f"   ├── ℹ️ Content-Type '{response.headers.get('Content-Type')}' не HTML, тіло сторінки не завантажуємо")
+        return "", response.headers, False
+
+    tracker = _completion_tracker(final_url, pairs_list, response.headers)
+    chunks = []
+    total = 0
+    truncated = stopped_early = False
+    async for chunk in response.content.iter_chunked(BODY_CHUNK_SIZE):
+        check_deadline()
+        if max_body_bytes is not None and total + len(chunk) > max_body_bytes:
+            chunks.append(chunk[:max_body_bytes - total])
+            truncated = True
+            break
+        chunks.append(chunk)
+        total += len(chunk)
+        if tracker.feed_bytes(chunk):
+            stopped_early = True
+            break
+    html_content_bytes = b"".join(chunks)
+    truncated = truncated or is_partial_content_truncated(response.status, response.headers, len(html_content_bytes))
+
+    if stopped_early:
+        print(f"   ├── ⏹️ Завантаження зупинено після {len(html_content_bytes)} байт: head та всі пари Урл/Анкор уже знайдено")
+    if truncated:
+        print(f"   ├── ⚠️ Сторінку обрізано: прочитано {len(html_content_bytes)} байт (ліміт {max_body_bytes})")
+    return await asyncio.to_thread(_decode_html, html_content_bytes), response.headers, truncated
+
+async def _robots_entry_async(session, robots_url, verify_ssl=True):
+    """Запис robots.txt для origin: з кешу запуску, дискового сховища або завантажений через aiohttp."""
+    cache = get_robots_cache()
+    store = cache.store if cache is not None else None
+
+    async def fetch():
+        entry, record, conditional_headers = await asyncio.to_thread(stored_robots_lookup, store, robots_url)
+        if entry is not None:
+            return entry
+        ssl_mode = None if robots_verify_ssl(robots_url, verify_ssl) else False
+        try:
+            await asyncio.sleep(host_delay(robots_url))
+            async with await _request(session, "GET", robots_url, timeout=_timeout("robots", robots_url), ssl=ssl_mode, headers=conditional_headers) as resp:
+                robots_text = await resp.text(errors='replace') if resp.status == 200 else None
+                return await asyncio.to_thread(robots_entry_from_response, store, robots_url, record, resp.status, robots_text, resp.headers)
+        except Exception as e:
+            # Збій через вичерпаний ліміт часу рядка не кешується як помилка robots.txt для всього origin
+            check_deadline()
+            return robots_entry(robots_url, error=_error_text(e))
+
+    return await fetch() if cache is None else await cache.get_or_fetch_async(robots_url, fetch)
+
+async def _prefetch_robots_txt_async(session, url_to_check, verify_ssl=True):
+    """Асинхронний аналог seo_checks.prefetch_robots_txt: robots.txt у кеш запуску паралельно із завантаженням сторінки."""
+    if get_robots_cache() is None:
+        return
+    try:
+        await _robots_entry_async(session, urljoin(normalize_url(url_to_check), '/robots.txt'), verify_ssl)
+    except Exception:
+        pass # Помилку покаже _check_robots_txt_async, який повторить завантаження
+
+async def _check_robots_txt_async(session, url_to_check, user_agent='*', verify_ssl=True):
+    """Асинхронний аналог seo_checks.check_robots_txt з тією ж логікою та виводом."""
+    print(f"   ├── Перевірка robots.txt для User-agent: {user_agent}...")
+    try:
+        normalized_url = normalize_url(url_to_check)
+        robots_url = urljoin(normalized_url, '/robots.txt')
+    except Exception as e:
+        print(f"   │   └── ⚠️ Помилка нормалізації URL: {e}, припускаємо, що дозволено")
+        return True
+    entry = await _robots_entry_async(session, robots_url, verify_ssl)
+    return evaluate_robots_entry(entry, normalized_url, user_agent)
+
+async def _check_google_indexing_async(session, url, api_key):
+    """Асинхронний аналог indexing_checks.check_google_indexing; повертає (bool, пошуковий запит).
+
+    Вичерпаний ліміт часу рядка - RowDeadlineExceeded, а не "не проіндексовано".
+    """
+    query = format_search_query(url)
+    logger.info(f"Перевіряємо індексацію для URL: {url}")
+    logger.info(f"Пошуковий запит: {query}")
+    params = build_indexing_params(query, api_key)
+    try:
+        async with session.get(VALUESERP_SEARCH_URL, params=params, timeout=_timeout("api")) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+        return parse_indexing_response(data, url), query
+    except Exception as e:
+        if is_deadline_error(e):
+            raise RowDeadlineExceeded(DEADLINE_MESSAGE) from e
+        logger.error(f"Помилка при перевірці індексації URL {url}: {_error_text(e)}")
+        # У випадку помилки вважаємо, що URL не проіндексований
+        return False, query
+
+async def _perform_seo_and_link_checks_async(session, final_url, html_content, get_headers, pairs_list, verify_ssl=True, page_results=None):
+    """Асинхронний аналог request_processor._perform_seo_and_link_checks: robots.txt через aiohttp, парсинг - як у блокуючому шляху."""
+    print(f"   ├── Виконуємо SEO та перевірку посилань для: {final_url} (SSL Verify: {verify_ssl})")
+    seo_results = _new_seo_results()
+    try:
+        seo_results["robots_star_allowed"] = await _check_robots_txt_async(session, final_url, '*', verify_ssl=verify_ssl)
+        seo_results["robots_googlebot_allowed"] = await _check_robots_txt_async(session, final_url, 'Googlebot', verify_ssl=verify_ssl)
+        # Розбір BeautifulSoup - у потоці, щоб великі сторінки не зупиняли цикл подій
+        return await asyncio.to_thread(_check_page_content, final_url, html_content, get_headers, pairs_list, seo_results, page_results)
+
+    except Exception as seo_e:
+        error_msg = f"Помилка під час SEO/Link перевірок: {seo_e}"
+        print(f"   │   └── ⚠️ {error_msg}")
+        seo_results["seo_check_error"] = error_msg
+
+    return [dict(seo_results) for _ in pairs_list]
+
+async def _open_first_response(session, url, verify_ssl, fetch_mode):
+    """Перший запит рядка з покроковим слідуванням редиректам: HEAD (режим head_get) або GET (режим get).
+
+    Аналог request_processor._open_with_redirects. Повертає (відповідь, кроки ланцюжка); відповідь
+    повертається відкритою: у режимі get з неї ж читається тіло; закриває її викликач.
+    """
+    timeout_kind = "get" if fetch_mode == "get" else "head"
+    method = "GET" if fetch_mode == "get" else "HEAD"
+    walk = RedirectWalk(url)
+    while True:
+        hop_url = walk.next_url()
+        response = await _send_with_retries_async(
+            lambda: _request(session, method, hop_url, allow_redirects=False, timeout=_timeout(timeout_kind, hop_url), ssl=None if verify_ssl else False),
+            timeout_kind.upper(), hop_url
+        )
+        location = response.headers.get('Location') if response.status in REDIRECT_STATUS_CODES else None
+        if location is None:
+            walk.finish()
+            return response, walk.hops
+        response.release()
+        walk.follow(str(response.url), response.status, location)
+
+async def _download_page_async(session, final_url, ssl_verify, head_response, page_record, pairs_list, max_body_bytes=None):
+    """Асинхронний аналог request_processor._download_page, з тим самим об'єднанням однакових завантажень."""
+    async def download():
+        request_headers = PageCache.conditional_headers(page_record)
+        if max_body_bytes and accepts_byte_ranges(head_response.headers):
+            request_headers['Range'] = f'bytes=0-{max_body_bytes - 1}'
+        response_get = await _send_with_retries_async(
+            lambda: _request(session, "GET", final_url, timeout=_timeout("get", final_url), ssl=None if ssl_verify else False, headers=request_headers or None),
+            "GET", final_url
+        )
+        async with response_get:
+            response_get.raise_for_status()
+            if response_get.status == 304 and page_record is not None:
+                return None, response_get.headers, page_record["results"][0].get("page_truncated")
+            return await _read_page_async(response_get, final_url, pairs_list, max_body_bytes)
+
+    return await coalesced_async(("page", final_url, ssl_verify, page_inputs_key(pairs_list), max_body_bytes), download)
+
+async def _check_rows_async(session, i, rows_group, valueserp_api_key=None, fetch_mode="head_get", max_body_bytes=None):
+    """Асинхронний аналог request_processor._check_rows з тими ж полями результату та SSL-fallback."""
+    url = rows_group[0].get("Url")
+    pairs_list = [_row_pairs(row_info) for row_info in rows_group]
+
+    # Спільні поля сторінки; результати посилань кожного рядка - в row_checks
+    current_result = _new_row_result(rows_group[0])
+    row_checks = [{}] * len(rows_group)
+
+    if not url or pd.isna(url):
+        print(f"{i}. URL порожній, пропускаємо")
+        current_result["error"] = "URL порожній"
+        return _fan_out_results(rows_group, current_result, row_checks)
+
+    print(f"{i}. Перевіряємо: {url}")
+    if len(rows_group) > 1:
+        print(f"   ℹ️ Донор у {len(rows_group)} рядках: сторінка перевіряється один раз для пар Урл/Анкор усіх рядків")
+    request_label = "GET" if fetch_mode == "get" else "HEAD"
+    if _dns_failed(current_result, url) or _host_unavailable(current_result, url):
+        print("---")
+        return _fan_out_results(rows_group, current_result, row_checks)
+    ssl_registry = get_ssl_registry()
+    known_ssl_error = ssl_registry.known_error(url) if ssl_registry is not None else None
+    ssl_verify = known_ssl_error is None
+    ssl_error_text = known_ssl_error
+
+    # 1. Перший запит; при помилці SSL - одна повторна спроба з вимкненою перевіркою
+    try:
+        if known_ssl_error is not None:
+            # Хост уже дав помилку SSL - перевірена спроба приречена, одразу переходимо до fallback
+            print(f"   🔓 Хост має недійсний SSL ({known_ssl_error}), запит одразу з вимкненою перевіркою SSL...")
+            current_result["ssl_disabled"] = True
+        response, redirect_hops = await _open_first_response(session, url, ssl_verify, fetch_mode)
+    except _request_errors() as e:
+        if not ssl_verify:
+            final_error = f"Помилка {request_label} і з вимкненим SSL: {_error_text(e)}"
+            current_result["error"] = final_error
+            current_result["status_code"] = 0
+            current_result["final_status_code"] = 0
+            print(f"   ❌ {final_error}")
+            print("---")
+            return _fan_out_results(rows_group, current_result, row_checks)
+        error_text = _error_text(e)
+        current_result["status_code"] = 0
+        current_result["final_status_code"] = 0
+        if not _is_ssl_failure(e):
+            current_result["error"] = error_text
+            print(f"   ❌ Помилка {request_label}: {current_result['error']}")
+            print("---")
+            return _fan_out_results(rows_group, current_result, row_checks)
+
+        print(f"   ⚠️ Виявлено помилку SSL: {error_text}")
+        print(f"   🔄 Повторюємо запит з вимкненою перевіркою SSL...")
+        if ssl_registry is not None:
+            await asyncio.to_thread(ssl_registry.remember, url, error_text)
+        ssl_verify = False
+        ssl_error_text = error_text
+        current_result["ssl_disabled"] = True
+        try:
+            response, redirect_hops = await _open_first_response(session, url, ssl_verify, fetch_mode)
+        except _request_errors() as e2:
+            final_error = f"Помилка {request_label} і з вимкненим SSL: {_error_text(e2)}"
+            current_result["error"] = final_error
+            current_result["status_code"] = 0
+            current_result["final_status_code"] = 0
+            print(f"   ❌ {final_error}")
+            print("---")
+            return _fan_out_results(rows_group, current_result, row_checks)
+
+    background_tasks, indexing_task = [], None
+    try:
+        redirect_chain, final_url, final_status_code, status_code = _process_response(_ResponseView(response, redirect_hops), url, ssl_disabled=not ssl_verify)
+        current_result.update({
+            "status_code": status_code, "redirect_chain": redirect_chain,
+            "final_url": final_url, "final_status_code": final_status_code,
+            "error": "SSL вимкнено: " + ssl_error_text if ssl_error_text else None,
+            "ssl_disabled": not ssl_verify,
+            "http_version": f"HTTP/{response.version.major}.{response.version.minor}" if response.version else None
+        })
+
+        # 2. Якщо фінальний статус 200, виконуємо SEO, перевірку посилань та індексації
+        if final_status_code == 200:
+            ssl_suffix = '(SSL вимкнено)' if not ssl_verify else ''
+            # robots.txt і ValueSerp не залежать від сторінки - стартують паралельно з її завантаженням
+            background_tasks.append(asyncio.ensure_future(_prefetch_robots_txt_async(session, final_url, ssl_verify)))
+            if valueserp_api_key:
+                indexing_task = asyncio.ensure_future(coalesced_async(
+                    ("indexing", final_url), lambda: _check_google_indexing_async(session, final_url, valueserp_api_key)))
+                background_tasks.append(indexing_task)
+            page_cache = get_page_cache()
+            inputs_key = page_inputs_key(pairs_list)
+            page_record = await asyncio.to_thread(page_cache.lookup, final_url, inputs_key) if page_cache is not None else None
+            try:
+                if fetch_mode == "get":
+                    # Тіло беремо з тієї ж відповіді, лише для HTML
+                    html_content, get_headers, truncated = await _read_page_async(response, final_url, pairs_list, max_body_bytes)
+                    # Звільняємо з'єднання до запитів robots.txt: ліміт з'єднань конектора може бути вичерпано
+                    response.release()
+                else:
+                    html_content, get_headers, truncated = await _download_page_async(session, final_url, ssl_verify, response,
+                                                                                      page_record, pairs_list, max_body_bytes)
+                current_result["page_truncated"] = truncated
+                cached_results, body_hash = await asyncio.to_thread(_reuse_page_results, page_cache, page_record, html_content, get_headers)
+
+                page_checks = await _perform_seo_and_link_checks_async(
+                    session, final_url, html_content, get_headers, pairs_list, verify_ssl=ssl_verify, page_results=cached_results
+                )
+                if html_content is not None:
+                    await asyncio.to_thread(_remember_page_results, page_cache, final_url, inputs_key, get_headers, body_hash,
+                                            [dict(current_result, **checks) for checks in page_checks])
+
+                # 3. Перевірка індексації в Google
+                if valueserp_api_key:
+                    print(f"   ├── Перевіряємо індексацію в Google для: {final_url}{' ' + ssl_suffix if ssl_suffix else ''}")
+                    try:
+                        is_indexed, search_query = await indexing_task
+                        current_result["google_indexing"] = "Так" if is_indexed else "Ні"
+                        print(f"   │   ├── Пошуковий запит: {search_query}")
+                        print(f"   │   └── {'✅ URL проіндексований' if is_indexed else '❌ URL не проіндексований'}")
+                    except Exception as index_e:
+                        error_msg = f"Помилка при перевірці індексації: {str(index_e)}"
+                        print(f"   │   └── ⚠️ {error_msg}")
+                        current_result["google_indexing"] = "Помилка"
+                else:
+                    print(f"   │   └── ℹ️ Пропускаємо перевірку індексації (API ключ не вказано)")
+                row_checks = page_checks
+
+            except _request_errors() as get_e:
+                error_msg = f"Помилка GET-запиту {ssl_suffix}: {_error_text(get_e)}"
+                print(f"   └── ⚠️ {error_msg}")
+                current_result["seo_check_error"] = error_msg
+                current_result["link_check_error"] = error_msg
+            except Exception as general_e:
+                error_msg = f"Загальна помилка обробки контенту {ssl_suffix}: {general_e}"
+                print(f"   └── ⚠️ {error_msg}")
+                current_result["seo_check_error"] = error_msg
+                current_result["link_check_error"] = error_msg
+    finally:
+        response.release()
+        for task in background_tasks:
+            if not task.done():
+                task.cancel() # Сторінку не перевірено - результати фонових запитів більше не потрібні
+            elif not task.cancelled():
+                task.exception() # Помилку ValueSerp без перевірки сторінки не показуємо, але й не лишаємо непрочитаною
+
+    print("---")
+    return _fan_out_results(rows_group, current_result, row_checks)
+
+async def _check_group_limited(session, semaphore, i, rows_group, valueserp_api_key=None, fetch_mode="head_get", max_body_bytes=None, on_result=None,
+                               result_executor=None):
+    """Обмежує кількість одночасних груп рядків і друкує вивід групи одним блоком.
+
+    Місце хоста в планувальнику хостів і в адаптивному ліміті займається до загального ліміту, тож група,
+    що чекає на свій хост, не забирає місце в групи іншого хоста. on_result викликається в result_executor:
+    якщо він чекає (заповнена черга запису в таблицю), чекає лише ця група, а не весь цикл подій.
+    """
+    scheduler = get_host_scheduler()
+    controller = get_concurrency_controller()
+    url = rows_group[0].get("Url")
+    has_url = isinstance(url, str)
+    host_slot = scheduler.async_slot(url) if scheduler is not None and has_url else contextlib.nullcontext()
+    adaptive_slot = controller.async_slot(url) if controller is not None and has_url else contextlib.nullcontext()
+    async with host_slot, adaptive_slot, semaphore:
+        with buffered_row_output(), row_deadline(_row_deadline_seconds()):
+            try:
+                results = await _check_rows_async(session, i, rows_group, valueserp_api_key, fetch_mode, max_body_bytes)
+            except Exception as e:
+                results = _unexpected_error_results(i, rows_group, e)
+    if on_result is not None:
+        loop = asyncio.get_running_loop()
+        for result in results:
+            await loop.run_in_executor(result_executor, on_result, result)
+    return results
+
+async def _run_groups_bounded(groups, window, check_group):
+    """Запускає задачі check_group(group) так, щоб одночасно існувало не більше window задач груп.
+
+    Задача наступної групи створюється, лише коли завершилась одна з попередніх, тож кількість задач
+    (і їхніх кадрів) не росте з розміром таблиці. Повертає результати в порядку groups; якщо перевірку
+    перервано, незавершені задачі скасовуються.
+    """
+    group_results = [None] * len(groups)
+    pending = {} # Task -> номер групи
+    try:
+        for index, group in enumerate(groups):
+            if len(pending) >= window:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    group_results[pending.pop(task)] = task.result()
+            pending[asyncio.ensure_future(check_group(group))] = index
+        for task, index in pending.items():
+            group_results[index] = await task
+    finally:
+        for task in pending:
+            task.cancel()
+    return group_results
+
+class _CachedDnsResolver(AbstractResolver):
+    """Резолвер сесії aiohttp: адреси з DNS-кешу запуску, решта хостів - стандартним резолвером aiohttp."""
+
+    def __init__(self, dns_cache):
+        self._dns_cache = dns_cache
+        self._fallback = aiohttp.DefaultResolver()
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        infos = self._dns_cache.lookup(host, port, family, socket.SOCK_STREAM)
+        if not infos:
+            return await self._fallback.resolve(host, port, family)
+        return [{"hostname": host, "host": sockaddr[0], "port": sockaddr[1], "family": fam, "proto": proto,
+                 "flags": socket.AI_NUMERICHOST | socket.AI_NUMERICSERV}
+                for fam, _, proto, _, sockaddr in infos]
+
+    async def close(self):
+        await self._fallback.close()
+
+async def check_status_code_requests_async(rows_data, valueserp_api_key=None, concurrency=100, fetch_mode="head_get", max_body_bytes=None,
+                                           on_result=None):
+    """Перевіряє всі рядки на одному циклі подій; до concurrency донорів обробляються одночасно.
+
+    Рядки з однаковим донором перевіряються разом, як і в блокуючому шляху.
+    Повертає список результатів у порядку rows_data з тими ж полями, що й блокуючий шлях.
+    on_result(result) викликається для кожного рядка одразу після його перевірки.
+    """
+    if aiohttp is None:
+        raise ImportError("Для asyncio-рушія потрібен пакет aiohttp (pip install aiohttp)")
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    # Ті самі User-Agent, таймаути та ліміт з'єднань на хост, що й у спільній сесії http_client
+    dns_cache = get_dns_cache()
+    resolver = _CachedDnsResolver(dns_cache) if dns_cache is not None else None # None - стандартний резолвер aiohttp
+    connector = aiohttp.TCPConnector(limit=max(1, concurrency), limit_per_host=get_pool_maxsize(), resolver=resolver)
+    groups = _check_order(_group_rows_by_donor(rows_data))
+    # Окремий потік для on_result (контрольна точка, етап запису), щоб їхнє очікування не зупиняло цикл подій
+    result_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="on-result") if on_result is not None else None
+    try:
+        async with aiohttp.ClientSession(headers=default_headers(), connector=connector) as session:
+            with routed_stdout():
+                group_results = await _run_groups_bounded(groups, IN_FLIGHT_PER_WORKER * max(1, concurrency), lambda group: _check_group_limited(
+                    session, semaphore, group[0][0] + 1, [row_info for _, row_info in group], valueserp_api_key, fetch_mode,
+                    max_body_bytes, on_result, result_executor))
+    finally:
+        if result_executor is not None:
+            result_executor.shutdown(wait=True)
+        if resolver is not None:
+            await resolver.close() # Переданий резолвер з'єднувач не закриває
+    return _results_in_row_order(len(rows_data), groups, group_results)
+
+def run_async_checks(rows_data, valueserp_api_key=None, concurrency=100, fetch_mode="head_get", max_body_bytes=None, on_result=None):
+    """Синхронна точка входу в asyncio-рушій, що працює і всередині вже запущеного циклу подій."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(check_status_code_requests_async(rows_data, valueserp_api_key, concurrency, fetch_mode, max_body_bytes, on_result))
+
+    # У Colab/Jupyter код комірки виконується всередині запущеного циклу подій, де asyncio.run заборонено,
+    # тому запускаємо окремий цикл у допоміжному потоці (з контекстом запуску) й чекаємо на результат
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(contextvars.copy_context().run, asyncio.run, check_status_code_requests_async(rows_data, valueserp_api_key, concurrency, fetch_mode, max_body_bytes, on_result)).result()
@@ -0,0 +1,49 @@
+import json
+import os
+import threading
+
+from utils import row_key
+
+#
+# 6.2 КОНТРОЛЬНІ ТОЧКИ ЗАПУСКУ (відновлення після розриву з'єднання)
+#
+
+class RunCheckpoint:
+    """JSONL-файл з результатами рядків, що записуються одразу після перевірки кожного рядка.
+
+    Кожен результат дописується окремим рядком і скидається на диск (fsync), тож після розриву
+    сеансу Colab втрачається щонайбільше рядок, що перевірявся в момент збою.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def completed(self):
+        """Збережені результати: словник row_key -> результат. Пошкоджений останній рядок ігнорується."""
+        results = {}
+        if not os.path.exists(self.path):
+            return results
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue # Рядок, записаний не повністю в момент збою
+                results[row_key(result)] = result
+        return results
+
+    def append(self, result):
+        """Дописує результат рядка і чекає, доки він потрапить на диск."""
+        line = json.dumps(result, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def clear(self):
+        """Видаляє файл контрольної точки (після успішного запису результатів у таблицю)."""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
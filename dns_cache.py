@@ -0,0 +1,106 @@
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from run_context import run_component
+
+#
+# 3.4 DNS-КЕШ ТА ПОПЕРЕДНЄ ВИЗНАЧЕННЯ ХОСТІВ
+#
+
+# Кількість одночасних DNS-запитів попереднього етапу (не залежить від кількості потоків перевірки)
+DEFAULT_DNS_WORKERS = 32
+
+# Коди getaddrinfo, що означають "такого хоста немає" (NXDOMAIN, немає адрес); решта, як-от EAI_AGAIN, - тимчасові
+PERMANENT_DNS_ERRORS = frozenset(code for code in (getattr(socket, "EAI_NONAME", None), getattr(socket, "EAI_NODATA", None)) if code is not None)
+
+def url_hostname(url):
+    """Ім'я хоста URL у нижньому регістрі або None для порожнього чи некоректного URL."""
+    try:
+        return urlsplit(url).hostname or None
+    except (ValueError, AttributeError, TypeError):
+        return None
+
+class DnsCache:
+    """Кеш IP-адрес хостів донорів на один запуск.
+
+    resolve_hosts() одночасно визначає адреси всіх унікальних хостів ще до перевірки рядків. Поки кеш
+    активний (run_context.RunContext.dns_cache), з'єднання спільної сесії requests і сесії aiohttp беруть адреси з кешу замість
+    повторних DNS-запитів, а хости, яких не існує (EAI_NONAME), позначені помилкою, тож їхні рядки завершуються
+    одразу. Хости з тимчасовою помилкою DNS не кешуються: їх визначить звичайний резолвер під час з'єднання.
+    """
+
+    def __init__(self, resolver=None):
+        self._resolver = resolver or socket.getaddrinfo
+        self._lock = threading.Lock()
+        self._addresses = {} # host -> результат getaddrinfo(host, None, 0, SOCK_STREAM)
+        self._failures = {} # host -> текст помилки DNS
+        self.hits = 0
+        self.transient = 0 # хостів з тимчасовою помилкою DNS
+
+    def resolve_hosts(self, urls, max_workers=DEFAULT_DNS_WORKERS):
+        """Визначає адреси унікальних хостів зі списку URL, яких ще немає в кеші. Повертає кількість нових хостів."""
+        hosts = {url_hostname(url) for url in urls if url}
+        with self._lock:
+            hosts = sorted(host for host in hosts if host and host not in self._addresses and host not in self._failures)
+        if hosts:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(hosts)))) as executor:
+                list(executor.map(self._resolve, hosts))
+        return len(hosts)
+
+    def _resolve(self, host):
+        try:
+            infos = self._resolver(host, None, 0, socket.SOCK_STREAM)
+        except UnicodeError as e: # Некоректне ім'я хоста (IDNA) не визначиться й пізніше
+            with self._lock:
+                self._failures[host] = str(e)
+        except OSError as e:
+            with self._lock:
+                if isinstance(e, socket.gaierror) and e.errno in PERMANENT_DNS_ERRORS:
+                    self._failures[host] = str(e)
+                else:
+                    self.transient += 1
+        else:
+            with self._lock:
+                self._addresses[host] = infos
+
+    def failure(self, url):
+        """Текст помилки DNS, якщо хост URL не вдалося визначити на попередньому етапі; інакше None."""
+        with self._lock:
+            return self._failures.get(url_hostname(url))
+
+    def lookup(self, host, port, family=0, type=0, proto=0):
+        """Адреси з кешу у форматі socket.getaddrinfo для заданого порту або None (немає в кеші чи інші параметри)."""
+        if isinstance(host, bytes):
+            host = host.decode("ascii", "ignore")
+        if not isinstance(host, str) or type not in (0, socket.SOCK_STREAM):
+            return None
+        if isinstance(port, str):
+            if not port.isdigit():
+                return None # Ім'я сервісу ("http") визначає справжній резолвер
+            port = int(port)
+        with self._lock:
+            infos = self._addresses.get(host.lower().rstrip("."))
+            if not infos:
+                return None
+            matched = [(fam, socktype, prot, canonname, (sockaddr[0], port or 0) + tuple(sockaddr[2:]))
+                       for fam, socktype, prot, canonname, sockaddr in infos
+                       if (not family or fam == family) and (not proto or prot == proto)]
+            if matched:
+                self.hits += 1
+            return matched or None
+
+    def resolved_urls(self, urls):
+        """URL, хости яких визначено успішно (для попереднього відкриття з'єднань)."""
+        with self._lock:
+            return [url for url in urls if url_hostname(url) in self._addresses]
+
+    def stats(self):
+        """Кількість визначених хостів, хостів з помилкою DNS, з тимчасовою помилкою та з'єднань, адреси яких взято з кешу."""
+        with self._lock:
+            return {"hosts": len(self._addresses), "failed": len(self._failures), "transient": self.transient, "hits": self.hits}
+
+def get_dns_cache():
+    """DNS-кеш активного запуску або None."""
+    return run_component("dns_cache")
@@ -0,0 +1,89 @@
+import sqlite3
+import threading
+import time
+
+from utils import row_key
+
+#
+# 6.1 ІНКРЕМЕНТАЛЬНІ ЗАПУСКИ (пропуск нещодавно перевірених рядків)
+#
+
+# Скільки секунд результат рядка вважається актуальним: окремо для успішних і проблемних рядків
+DEFAULT_HEALTHY_WINDOW = 7 * 24 * 3600
+DEFAULT_UNHEALTHY_WINDOW = 24 * 3600
+
+def is_healthy_result(result):
+    """Чи успішний результат рядка: статус 200, без помилок, усі задані пари Урл/Анкор знайдено."""
+    if result.get("final_status_code") != 200 or result.get("error"):
+        return False
+    if result.get("seo_check_error") or result.get("link_check_error"):
+        return False
+    for n in (1, 2, 3):
+        if result.get(f"Анкор-{n}") and result.get(f"Урл-{n}"):
+            if result.get(f"url{n}_found") != "Так" or result.get(f"anchor{n}_match") != "Так":
+                return False
+    return True
+
+class RowFreshness:
+    """SQLite-журнал перевірок рядків: коли рядок (Url + пари Анкор/Урл) перевірявся і чи був результат успішним.
+
+    Рядок пропускається, якщо його перевіряли не довше ніж healthy_window секунд тому (успішний результат)
+    або unhealthy_window секунд тому (помилка, не 200 чи відсутнє посилання).
+    """
+
+    def __init__(self, path, healthy_window=DEFAULT_HEALTHY_WINDOW, unhealthy_window=DEFAULT_UNHEALTHY_WINDOW):
+        self.path = path
+        self.healthy_window = healthy_window
+        self.unhealthy_window = unhealthy_window
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS row_checks ("
+                " row_key TEXT PRIMARY KEY,"
+                " url TEXT,"
+                " healthy INTEGER NOT NULL,"
+                " checked_at REAL NOT NULL)"
+            )
+
+    def _last_checks(self):
+        with self._lock:
+            return {key: (bool(healthy), checked_at)
+                    for key, healthy, checked_at in self._conn.execute("SELECT row_key, healthy, checked_at FROM row_checks")}
+
+    def select_rows(self, rows_data, now=None):
+        """Розділяє рядки на ті, що потребують перевірки, та пропущені як актуальні.
+
+        Повертає (rows_to_check, skipped_rows). Рядки для перевірки впорядковані за пріоритетом:
+        спочатку нові, потім проблемні, потім успішні - від найдавніше перевірених.
+        """
+        now = now if now is not None else time.time()
+        last_checks = self._last_checks()
+        due, skipped = [], []
+        for position, row_info in enumerate(rows_data):
+            last = last_checks.get(row_key(row_info))
+            if last is None:
+                due.append(((0, 0, position), row_info))
+                continue
+            healthy, checked_at = last
+            window = self.healthy_window if healthy else self.unhealthy_window
+            if now - checked_at < window:
+                skipped.append(row_info)
+            else:
+                due.append(((2 if healthy else 1, checked_at, position), row_info))
+        due.sort(key=lambda item: item[0])
+        return [row_info for _, row_info in due], skipped
+
+    def record(self, results, now=None):
+        """Записує час і успішність перевірки для кожного результату."""
+        now = now if now is not None else time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO row_checks (row_key, url, healthy, checked_at) VALUES (?, ?, ?, ?)",
+                [(row_key(result), result.get("Url"), int(is_healthy_result(result)), now) for result in results]
+            )
+
+    def close(self):
+        """Закриває з'єднання з базою."""
+        with self._lock:
+            self._conn.close()
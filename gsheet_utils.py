@@ -1,11 +1,12 @@
 import pandas as pd
 import gspread
 import ast
+import re
 from urllib.parse import unquote
 from google.colab import auth
 from google.auth import default
 
-from utils import extract_sheet_params, normalize_url
+from utils import extract_sheet_params, normalize_url, row_key, ROW_INPUT_FIELDS
 
 #
 # 4. ФУНКЦІЇ РОБОТИ З GOOGLE SHEETS
@@ -104,23 +105,11 @@ def check_sheet_structure(google_sheet):
     except Exception as e:
         return {"success": False, "error": f"Помилка: {str(e)}"}
 
-def update_sheet_with_results(worksheet, results):
-    """Оновлює Google таблицю результатами перевірок URL та посилань."""
-    print("\n\n📝 ЗБЕРЕЖЕННЯ РЕЗУЛЬТАТІВ У GOOGLE ТАБЛИЦЮ...\n")
-
-    sheet_data = worksheet.get_all_values()
-    headers = sheet_data[0] if sheet_data else []
-    if not headers:
-        print("⚠️ Помилка: Не вдалося прочитати заголовки з таблиці.")
-        return
-
-    # Визначаємо індекс стовпця "Url"
-    try:
-        url_index = headers.index("Url")
-    except ValueError:
-        print(f"⚠️ Помилка: Стовпець 'Url' не знайдено в заголовках: {headers}")
-        return
+def ensure_result_headers(worksheet, headers):
+    """Додає в перший рядок відсутні стовпці результатів.
 
+    Повертає (headers, header_indices, has_input_pair2, has_input_pair3, headers_added).
+    """
     # Базові заголовки результатів (завжди додаються/перевіряються)
     base_result_headers = [
         "Status Code", "Final Redirect URL", "Final Status Code",
@@ -169,147 +158,281 @@ def update_sheet_with_results(worksheet, results):
         # Визначаємо діапазон для оновлення заголовків (весь перший рядок)
         header_range = f"A1:{gspread.utils.rowcol_to_a1(1, len(headers))[:-1]}1" # Використовуємо оновлену довжину headers
         worksheet.update(values=[headers], range_name=header_range)
-        # Перечитуємо дані, щоб мати актуальну кількість стовпців для подальших оновлень
-        sheet_data = worksheet.get_all_values()
         # Перезаповнюємо індекси, оскільки стовпці могли додатись
         header_indices = {}
         for i, h in enumerate(headers): # Використовуємо оновлені headers з таблиці
             if h in required_headers or h == "Url":
                  header_indices[h] = i
 
+    return headers, header_indices, has_input_pair2, has_input_pair3, bool(new_headers)
+
+class SheetUpdateError(Exception):
+    """Частину оновлень комірок не вдалося записати в таблицю.
+
+    rows - номери рядків таблиці з незаписаними комірками, headers - заголовки після виклику
+    (нові стовпці результатів могли вже додатися).
+    """
+
+    def __init__(self, message, rows, headers=None):
+        super().__init__(message)
+        self.rows = rows
+        self.headers = headers
+
+def _update_rows(updates):
+    """Номери рядків таблиці, яких стосуються оновлення комірок."""
+    return sorted({int(re.search(r"(\d+)$", update['range']).group(1)) for update in updates})
+
+def _send_batch_updates(worksheet, all_updates):
+    """Надсилає оновлення комірок пакетами; повертає оновлення з пакетів, які не вдалося записати."""
+    failed_updates = []
+    if all_updates:
+        print(f"Виконується пакетне оновлення {len(all_updates)} комірок...")
+        
+        # Розбиваємо на частини, якщо оновлень забагато (API може мати ліміти)
+        BATCH_SIZE = 500
+        for i in range(0, len(all_updates), BATCH_SIZE):
+            batch = all_updates[i:i + BATCH_SIZE]
+            print(f"  Надсилаємо пакет {i//BATCH_SIZE + 1} ({len(batch)} оновлень)...")
+            try:
+                worksheet.batch_update(batch)
+            except gspread.exceptions.APIError as api_e:
+                print(f"   ⚠️ Помилка API при оновленні пакету: {api_e}")
+                failed_updates.extend(batch)
+            except Exception as batch_e:
+                print(f"   ⚠️ Невідома помилка при оновленні пакету: {batch_e}")
+                failed_updates.extend(batch)
+
+        print(f"Пакетне оновлення завершено!")
+    else:
+        print("Немає змін для запису в таблицю.")
+    return failed_updates
+
+def _raise_for_failed_updates(failed_updates, headers=None):
+    # SheetUpdateError, якщо якийсь пакет оновлень не записано
+    if failed_updates:
+        rows = _update_rows(failed_updates)
+        raise SheetUpdateError(f"Не вдалося записати в таблицю рядки ({len(rows)}): {', '.join(map(str, rows[:10]))}"
+                               f"{'...' if len(rows) > 10 else ''}", rows, headers)
+
+def _cell_updates(row_idx, row_updates):
+    """Оновлення комірок рядка у форматі batch_update."""
+    return [{'range': f"{gspread.utils.rowcol_to_a1(1, col_idx + 1)[:-1]}{row_idx}", 'values': [[value]]}
+            for col_idx, value in row_updates.items() if col_idx is not None]
+
+def update_rows_with_results(worksheet, headers, row_results):
+    """Записує результати лише в задані рядки без читання всієї таблиці.
+
+    row_results - пари (номер рядка в таблиці, результат). Відсутні стовпці результатів додаються;
+    повертає оновлений список заголовків для наступних викликів. Якщо якийсь пакет не записано - SheetUpdateError.
+    """
+    headers, header_indices, has_input_pair2, has_input_pair3, _ = ensure_result_headers(worksheet, list(headers))
+    all_updates = []
+    for row_idx, result in row_results:
+        all_updates.extend(_cell_updates(row_idx, _build_row_updates(result, header_indices, has_input_pair2, has_input_pair3)))
+    _raise_for_failed_updates(_send_batch_updates(worksheet, all_updates), headers)
+    return headers
+
+def try_update_rows(worksheet, headers, row_results, write_rows=update_rows_with_results):
+    """write_rows (update_rows_with_results), що не зупиняє запуск при помилці запису.
+
+    Повертає (заголовки, пари (номер рядка, результат), які не вдалося записати).
+    """
+    try:
+        return write_rows(worksheet, headers, row_results), []
+    except SheetUpdateError as e:
+        print(f"   ⚠️ {e}")
+        failed_rows = set(e.rows)
+        return e.headers or headers, [(row_idx, result) for row_idx, result in row_results if row_idx in failed_rows]
+    except Exception as e:
+        print(f"   ⚠️ Не вдалося записати пакет з {len(row_results)} рядків: {e}")
+        return headers, list(row_results)
+
+def _build_row_updates(result, header_indices, has_input_pair2, has_input_pair3):
+    """Формує значення комірок рядка з результату перевірки: словник {індекс стовпця: значення}."""
+    original_url = result.get("url")
+    row_updates = {} # Оновлення для поточного рядка [col_index] = value
+
+    # --- Оновлення для базових полів ---
+    # (Status Code, Final URL, Final Status, Robots, Meta, Canonical) - ця логіка залишається
+    has_redirects = len(result.get("redirect_chain", [])) > 0
+    # Status Code / Final Status Code / Final Redirect URL
+    if has_redirects:
+        if "Status Code" in header_indices: row_updates[header_indices["Status Code"]] = "Redirect"
+        if "Final Redirect URL" in header_indices and result.get("final_url") and result["final_url"] != original_url:
+             row_updates[header_indices["Final Redirect URL"]] = result["final_url"]
+        else:
+             if "Final Redirect URL" in header_indices: row_updates[header_indices["Final Redirect URL"]] = "" # Очищаємо, якщо URL такий самий
+        if "Final Status Code" in header_indices and result.get("final_status_code") is not None:
+             row_updates[header_indices["Final Status Code"]] = str(result["final_status_code"])
+    elif "status_code" in result and result.get("status_code") is not None:
+         if "Status Code" in header_indices: row_updates[header_indices["Status Code"]] = str(result["status_code"])
+         # Якщо не було редиректів, очищуємо Final URL та Final Status
+         if header_indices.get("Final Redirect URL"):
+             row_updates[header_indices["Final Redirect URL"]] = ""
+         if header_indices.get("Final Status Code"):
+             row_updates[header_indices["Final Status Code"]] = ""
+    elif result.get("error"): # Якщо була помилка запиту (не редирект і не успішний статус)
+        if "Status Code" in header_indices: row_updates[header_indices["Status Code"]] = "Error" # Або result["error"]?
+        if header_indices.get("Final Redirect URL"): row_updates[header_indices["Final Redirect URL"]] = ""
+        if header_indices.get("Final Status Code"): row_updates[header_indices["Final Status Code"]] = ""
+
+
+    # Robots.txt
+    if "Robots.txt" in header_indices:
+         robots_disallowed = []
+         if result.get("robots_star_allowed") is False: robots_disallowed.append("*")
+         if result.get("robots_googlebot_allowed") is False: robots_disallowed.append("Googlebot")
+         row_updates[header_indices["Robots.txt"]] = f"Заборонено ({', '.join(robots_disallowed)})" if robots_disallowed else ""
+
+    # Meta Robots/X-Robots-Tag
+    if "Meta Robots/X-Robots-Tag" in header_indices:
+         if dr := result.get("indexing_directives"):
+             tags = []
+             if dr.get("noindex"): tags.append("noindex")
+             if dr.get("nofollow"): tags.append("nofollow")
+             if tags and dr.get("source"):
+                 row_updates[header_indices["Meta Robots/X-Robots-Tag"]] = f"{dr['source']}: {', '.join(tags)}"
+             else:
+                  row_updates[header_indices["Meta Robots/X-Robots-Tag"]] = "" # Очищаємо, якщо немає тегів або джерела
+         else:
+              row_updates[header_indices["Meta Robots/X-Robots-Tag"]] = "" # Очищаємо, якщо немає директив
+
+    # Canonical
+    if "Canonical" in header_indices:
+         if canon_url := result.get("canonical_url"):
+             decoded_canon = unquote(canon_url)
+             target_url_to_compare = result.get("final_url") if has_redirects else normalize_url(original_url)
+             decoded_target = unquote(target_url_to_compare) if target_url_to_compare else ""
+             # Записуємо тільки якщо відрізняється і не порожній
+             row_updates[header_indices["Canonical"]] = canon_url if canon_url and decoded_canon != decoded_target else ""
+         else:
+              row_updates[header_indices["Canonical"]] = "" # Очищаємо, якщо немає
+
+    # Оновлюємо результати перевірки індексації в Google
+    if "Google indexing" in header_indices:
+        if result.get("google_indexing") is not None:
+            row_updates[header_indices["Google indexing"]] = result["google_indexing"]
+        else:
+            row_updates[header_indices["Google indexing"]] = ""
+
+    # --- Оновлення для полів перевірки посилань (з перевірками) ---
+    if result.get("final_status_code") == 200: # Записуємо результати посилань тільки якщо була перевірка (статус 200)
+
+        # Пара 1 (завжди перевіряється)
+        if "Урл-1 наявність" in header_indices: row_updates[header_indices["Урл-1 наявність"]] = result.get("url1_found", "Ні")
+        if "Анкор-1 співпадає" in header_indices: row_updates[header_indices["Анкор-1 співпадає"]] = result.get("anchor1_match", "Ні")
+        if "Урл-1 rel" in header_indices:
+            rel_val_1 = result.get("url1_rel")
+            row_updates[header_indices["Урл-1 rel"]] = rel_val_1 if rel_val_1 is not None else ""
+
+        # Пара 2 (тільки якщо відповідні стовпці існують)
+        if has_input_pair2 and "Урл-2 наявність" in header_indices:
+            if result.get("Анкор-2") and result.get("Урл-2"): # Чи були дані для перевірки пари 2?
+                row_updates[header_indices["Урл-2 наявність"]] = result.get("url2_found", "Ні")
+                if "Анкор-2 співпадає" in header_indices: row_updates[header_indices["Анкор-2 співпадає"]] = result.get("anchor2_match", "Ні")
+                if "Урл-2 rel" in header_indices:
+                     rel_val_2 = result.get("url2_rel")
+                     row_updates[header_indices["Урл-2 rel"]] = rel_val_2 if rel_val_2 is not None else ""
+            else: # Якщо даних для пари 2 не було, очищаємо результати (якщо стовпці є)
+                row_updates[header_indices["Урл-2 наявність"]] = ""
+                if "Анкор-2 співпадає" in header_indices: row_updates[header_indices["Анкор-2 співпадає"]] = ""
+                if "Урл-2 rel" in header_indices: row_updates[header_indices["Урл-2 rel"]] = ""
+
+        # Пара 3 (тільки якщо відповідні стовпці існують)
+        if has_input_pair3 and "Урл-3 наявність" in header_indices:
+            if result.get("Анкор-3") and result.get("Урл-3"): # Чи були дані для перевірки пари 3?
+                row_updates[header_indices["Урл-3 наявність"]] = result.get("url3_found", "Ні")
+                if "Анкор-3 співпадає" in header_indices: row_updates[header_indices["Анкор-3 співпадає"]] = result.get("anchor3_match", "Ні")
+                if "Урл-3 rel" in header_indices:
+                    rel_val_3 = result.get("url3_rel")
+                    row_updates[header_indices["Урл-3 rel"]] = rel_val_3 if rel_val_3 is not None else ""
+            else: # Якщо даних для пари 3 не було, очищаємо результати (якщо стовпці є)
+                row_updates[header_indices["Урл-3 наявність"]] = ""
+                if "Анкор-3 співпадає" in header_indices: row_updates[header_indices["Анкор-3 співпадає"]] = ""
+                if "Урл-3 rel" in header_indices: row_updates[header_indices["Урл-3 rel"]] = ""
+
+    else: # Очищаємо всі поля посилань, якщо перевірка не проводилась (статус не 200)
+         # Перевіряємо наявність стовпців перед очищенням
+         if "Урл-1 наявність" in header_indices: row_updates[header_indices["Урл-1 наявність"]] = ""
+         if "Анкор-1 співпадає" in header_indices: row_updates[header_indices["Анкор-1 співпадає"]] = ""
+         if "Урл-1 rel" in header_indices: row_updates[header_indices["Урл-1 rel"]] = ""
+         # Очищення для пари 2, якщо стовпці є
+         if has_input_pair2:
+             if "Урл-2 наявність" in header_indices: row_updates[header_indices["Урл-2 наявність"]] = ""
+             if "Анкор-2 співпадає" in header_indices: row_updates[header_indices["Анкор-2 співпадає"]] = ""
+             if "Урл-2 rel" in header_indices: row_updates[header_indices["Урл-2 rel"]] = ""
+         # Очищення для пари 3, якщо стовпці є
+         if has_input_pair3:
+             if "Урл-3 наявність" in header_indices: row_updates[header_indices["Урл-3 наявність"]] = ""
+             if "Анкор-3 співпадає" in header_indices: row_updates[header_indices["Анкор-3 співпадає"]] = ""
+             if "Урл-3 rel" in header_indices: row_updates[header_indices["Урл-3 rel"]] = ""
+    return row_updates
+
+def _sheet_rows_by_url(sheet_data, url_index):
+    """Url -> список (номер рядка, ключ рядка) у порядку таблиці; ключ - utils.row_key за вхідними стовпцями."""
+    headers = sheet_data[0]
+    input_indices = {field: headers.index(field) for field in ROW_INPUT_FIELDS if field in headers}
+    rows_by_url = {}
+    for i, row in enumerate(sheet_data[1:]):
+        if url_index < len(row) and row[url_index]:
+            row_info = {field: row[index] for field, index in input_indices.items() if index < len(row)}
+            rows_by_url.setdefault(row[url_index], []).append((i + 2, row_key(row_info)))
+    return rows_by_url
+
+def _take_sheet_row(candidates, result):
+    """Забирає зі списку candidates (_sheet_rows_by_url) рядок для результату: перший з тими самими
+    вхідними даними (Url і пари Анкор/Урл), інакше перший вільний. None - рядків не залишилось.
+    """
+    if not candidates:
+        return None
+    key = row_key(result) if "Url" in result else None
+    for position, (row_idx, candidate_key) in enumerate(candidates):
+        if candidate_key == key:
+            return candidates.pop(position)[0]
+    return candidates.pop(0)[0]
+
+def update_sheet_with_results(worksheet, results):
+    """Оновлює Google таблицю результатами перевірок URL та посилань.
+
+    Якщо якийсь пакет оновлень не записано - SheetUpdateError з номерами незаписаних рядків.
+    """
+    print("\n\n📝 ЗБЕРЕЖЕННЯ РЕЗУЛЬТАТІВ У GOOGLE ТАБЛИЦЮ...\n")
+
+    sheet_data = worksheet.get_all_values()
+    headers = sheet_data[0] if sheet_data else []
+    if not headers:
+        print("⚠️ Помилка: Не вдалося прочитати заголовки з таблиці.")
+        return
+
+    # Визначаємо індекс стовпця "Url"
+    try:
+        url_index = headers.index("Url")
+    except ValueError:
+        print(f"⚠️ Помилка: Стовпець 'Url' не знайдено в заголовках: {headers}")
+        return
+
+    headers, header_indices, has_input_pair2, has_input_pair3, headers_added = ensure_result_headers(worksheet, headers)
+    if headers_added:
+        # Перечитуємо дані, щоб мати актуальну кількість стовпців для подальших оновлень
+        sheet_data = worksheet.get_all_values()
+
     print(f"Збираємо дані для оновлення {len(results)} URL...")
 
     all_updates = []
     updated_rows = 0
     not_found_urls = []
 
-    # Створюємо словник для швидкого пошуку рядка за URL
-    url_to_row_index = {row[url_index]: i + 2 for i, row in enumerate(sheet_data[1:]) if url_index < len(row) and row[url_index]}
+    # Рядки таблиці за URL: у кожного результату свій рядок, навіть якщо кілька рядків мають той самий Url донора
+    rows_by_url = _sheet_rows_by_url(sheet_data, url_index)
 
     for result in results:
         original_url = result.get("url") # Використовуємо оригінальний URL з результатів
         if not original_url: continue # Пропускаємо, якщо URL не було
 
-        row_idx = url_to_row_index.get(original_url) # Шукаємо індекс рядка
+        row_idx = _take_sheet_row(rows_by_url.get(original_url), result) # Шукаємо індекс рядка
 
         if row_idx:
-            row_updates = {} # Оновлення для поточного рядка [col_index] = value
-
-            # --- Оновлення для базових полів ---
-            # (Status Code, Final URL, Final Status, Robots, Meta, Canonical) - ця логіка залишається
-            has_redirects = len(result.get("redirect_chain", [])) > 0
-            # Status Code / Final Status Code / Final Redirect URL
-            if has_redirects:
-                if "Status Code" in header_indices: row_updates[header_indices["Status Code"]] = "Redirect"
-                if "Final Redirect URL" in header_indices and result.get("final_url") and result["final_url"] != original_url:
-                     row_updates[header_indices["Final Redirect URL"]] = result["final_url"]
-                else:
-                     if "Final Redirect URL" in header_indices: row_updates[header_indices["Final Redirect URL"]] = "" # Очищаємо, якщо URL такий самий
-                if "Final Status Code" in header_indices and result.get("final_status_code") is not None:
-                     row_updates[header_indices["Final Status Code"]] = str(result["final_status_code"])
-            elif "status_code" in result and result.get("status_code") is not None:
-                 if "Status Code" in header_indices: row_updates[header_indices["Status Code"]] = str(result["status_code"])
-                 # Якщо не було редиректів, очищуємо Final URL та Final Status
-                 if header_indices.get("Final Redirect URL"):
-                     row_updates[header_indices["Final Redirect URL"]] = ""
-                 if header_indices.get("Final Status Code"):
-                     row_updates[header_indices["Final Status Code"]] = ""
-            elif result.get("error"): # Якщо була помилка запиту (не редирект і не успішний статус)
-                if "Status Code" in header_indices: row_updates[header_indices["Status Code"]] = "Error" # Або result["error"]?
-                if header_indices.get("Final Redirect URL"): row_updates[header_indices["Final Redirect URL"]] = ""
-                if header_indices.get("Final Status Code"): row_updates[header_indices["Final Status Code"]] = ""
-
-
-            # Robots.txt
-            if "Robots.txt" in header_indices:
-                 robots_disallowed = []
-                 if result.get("robots_star_allowed") is False: robots_disallowed.append("*")
-                 if result.get("robots_googlebot_allowed") is False: robots_disallowed.append("Googlebot")
-                 row_updates[header_indices["Robots.txt"]] = f"Заборонено ({', '.join(robots_disallowed)})" if robots_disallowed else ""
-
-            # Meta Robots/X-Robots-Tag
-            if "Meta Robots/X-Robots-Tag" in header_indices:
-                 if dr := result.get("indexing_directives"):
-                     tags = []
-                     if dr.get("noindex"): tags.append("noindex")
-                     if dr.get("nofollow"): tags.append("nofollow")
-                     if tags and dr.get("source"):
-                         row_updates[header_indices["Meta Robots/X-Robots-Tag"]] = f"{dr['source']}: {', '.join(tags)}"
-                     else:
-                          row_updates[header_indices["Meta Robots/X-Robots-Tag"]] = "" # Очищаємо, якщо немає тегів або джерела
-                 else:
-                      row_updates[header_indices["Meta Robots/X-Robots-Tag"]] = "" # Очищаємо, якщо немає директив
-
-            # Canonical
-            if "Canonical" in header_indices:
-                 if canon_url := result.get("canonical_url"):
-                     decoded_canon = unquote(canon_url)
-                     target_url_to_compare = result.get("final_url") if has_redirects else normalize_url(original_url)
-                     decoded_target = unquote(target_url_to_compare) if target_url_to_compare else ""
-                     # Записуємо тільки якщо відрізняється і не порожній
-                     row_updates[header_indices["Canonical"]] = canon_url if canon_url and decoded_canon != decoded_target else ""
-                 else:
-                      row_updates[header_indices["Canonical"]] = "" # Очищаємо, якщо немає
-            
-            # Оновлюємо результати перевірки індексації в Google
-            if "Google indexing" in header_indices:
-                if result.get("google_indexing") is not None:
-                    row_updates[header_indices["Google indexing"]] = result["google_indexing"]
-                else:
-                    row_updates[header_indices["Google indexing"]] = ""
-
-            # --- Оновлення для полів перевірки посилань (з перевірками) ---
-            if result.get("final_status_code") == 200: # Записуємо результати посилань тільки якщо була перевірка (статус 200)
-
-                # Пара 1 (завжди перевіряється)
-                if "Урл-1 наявність" in header_indices: row_updates[header_indices["Урл-1 наявність"]] = result.get("url1_found", "Ні")
-                if "Анкор-1 співпадає" in header_indices: row_updates[header_indices["Анкор-1 співпадає"]] = result.get("anchor1_match", "Ні")
-                if "Урл-1 rel" in header_indices:
-                    rel_val_1 = result.get("url1_rel")
-                    row_updates[header_indices["Урл-1 rel"]] = rel_val_1 if rel_val_1 is not None else ""
-
-                # Пара 2 (тільки якщо відповідні стовпці існують)
-                if has_input_pair2 and "Урл-2 наявність" in header_indices:
-                    if result.get("Анкор-2") and result.get("Урл-2"): # Чи були дані для перевірки пари 2?
-                        row_updates[header_indices["Урл-2 наявність"]] = result.get("url2_found", "Ні")
-                        if "Анкор-2 співпадає" in header_indices: row_updates[header_indices["Анкор-2 співпадає"]] = result.get("anchor2_match", "Ні")
-                        if "Урл-2 rel" in header_indices:
-                             rel_val_2 = result.get("url2_rel")
-                             row_updates[header_indices["Урл-2 rel"]] = rel_val_2 if rel_val_2 is not None else ""
-                    else: # Якщо даних для пари 2 не було, очищаємо результати (якщо стовпці є)
-                        row_updates[header_indices["Урл-2 наявність"]] = ""
-                        if "Анкор-2 співпадає" in header_indices: row_updates[header_indices["Анкор-2 співпадає"]] = ""
-                        if "Урл-2 rel" in header_indices: row_updates[header_indices["Урл-2 rel"]] = ""
-
-                # Пара 3 (тільки якщо відповідні стовпці існують)
-                if has_input_pair3 and "Урл-3 наявність" in header_indices:
-                    if result.get("Анкор-3") and result.get("Урл-3"): # Чи були дані для перевірки пари 3?
-                        row_updates[header_indices["Урл-3 наявність"]] = result.get("url3_found", "Ні")
-                        if "Анкор-3 співпадає" in header_indices: row_updates[header_indices["Анкор-3 співпадає"]] = result.get("anchor3_match", "Ні")
-                        if "Урл-3 rel" in header_indices:
-                            rel_val_3 = result.get("url3_rel")
-                            row_updates[header_indices["Урл-3 rel"]] = rel_val_3 if rel_val_3 is not None else ""
-                    else: # Якщо даних для пари 3 не було, очищаємо результати (якщо стовпці є)
-                        row_updates[header_indices["Урл-3 наявність"]] = ""
-                        if "Анкор-3 співпадає" in header_indices: row_updates[header_indices["Анкор-3 співпадає"]] = ""
-                        if "Урл-3 rel" in header_indices: row_updates[header_indices["Урл-3 rel"]] = ""
-
-            else: # Очищаємо всі поля посилань, якщо перевірка не проводилась (статус не 200)
-                 # Перевіряємо наявність стовпців перед очищенням
-                 if "Урл-1 наявність" in header_indices: row_updates[header_indices["Урл-1 наявність"]] = ""
-                 if "Анкор-1 співпадає" in header_indices: row_updates[header_indices["Анкор-1 співпадає"]] = ""
-                 if "Урл-1 rel" in header_indices: row_updates[header_indices["Урл-1 rel"]] = ""
-                 # Очищення для пари 2, якщо стовпці є
-                 if has_input_pair2:
-                     if "Урл-2 наявність" in header_indices: row_updates[header_indices["Урл-2 наявність"]] = ""
-                     if "Анкор-2 співпадає" in header_indices: row_updates[header_indices["Анкор-2 співпадає"]] = ""
-                     if "Урл-2 rel" in header_indices: row_updates[header_indices["Урл-2 rel"]] = ""
-                 # Очищення для пари 3, якщо стовпці є
-                 if has_input_pair3:
-                     if "Урл-3 наявність" in header_indices: row_updates[header_indices["Урл-3 наявність"]] = ""
-                     if "Анкор-3 співпадає" in header_indices: row_updates[header_indices["Анкор-3 співпадає"]] = ""
-                     if "Урл-3 rel" in header_indices: row_updates[header_indices["Урл-3 rel"]] = ""
-
+            row_updates = _build_row_updates(result, header_indices, has_input_pair2, has_input_pair3)
 
             # Додаємо оновлення до масиву, якщо є зміни
             if row_updates:
@@ -335,26 +458,7 @@ def update_sheet_with_results(worksheet, results):
         else:
              not_found_urls.append(original_url)
 
-    if all_updates:
-        print(f"Виконується пакетне оновлення {len(all_updates)} комірок...")
-        
-        # Розбиваємо на частини, якщо оновлень забагато (API може мати ліміти)
-        BATCH_SIZE = 500
-        for i in range(0, len(all_updates), BATCH_SIZE):
-            batch = all_updates[i:i + BATCH_SIZE]
-            print(f"  Надсилаємо пакет {i//BATCH_SIZE + 1} ({len(batch)} оновлень)...")
-            try:
-                worksheet.batch_update(batch)
-            except gspread.exceptions.APIError as api_e:
-                print(f"   ⚠️ Помилка API при оновленні пакету: {api_e}")
-                # Можна додати логіку повторної спроби або пропуску
-            except Exception as batch_e:
-                print(f"   ⚠️ Невідома помилка при оновленні пакету: {batch_e}")
-
-        print(f"Пакетне оновлення завершено!")
-    else:
-        print("Немає змін для запису в таблицю.")
-
+    failed_updates = _send_batch_updates(worksheet, all_updates)
 
     print(f"\nРезультати оновлення:")
     print(f"✅ Оновлено рядків (з реальним змінами значень): {updated_rows}")
@@ -362,6 +466,7 @@ def update_sheet_with_results(worksheet, results):
         print(f"⚠️ URL, не знайдені в таблиці ({len(not_found_urls)}): {', '.join(not_found_urls[:5])}...")
         if len(not_found_urls) > 5:
             print(f"   ... та ще {len(not_found_urls) - 5}")
+    _raise_for_failed_updates(failed_updates, headers)
 
 #
 # 4.5 ФУНКЦІЇ ОБРОБКИ ПОМИЛОК (Google Sheet)
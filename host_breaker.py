@@ -0,0 +1,101 @@
+import threading
+import time
+
+from host_scheduler import host_key
+from run_context import run_component
+
+#
+# 3.10 ЗАПОБІЖНИК НЕДОСТУПНИХ ХОСТІВ (circuit breaker)
+#
+
+# Скільки помилок з'єднання чи таймаутів поспіль роблять хост недоступним (0 - запобіжник вимкнено)
+DEFAULT_FAILURE_THRESHOLD = 3
+# Через скільки секунд до недоступного хоста знову йде пробний запит
+DEFAULT_COOL_DOWN = 60
+
+class HostCircuitBreaker:
+    """Запобіжник хостів донорів на один запуск.
+
+    Після failure_threshold помилок з'єднання чи таймаутів поспіль хост вважається недоступним: рядки
+    цього хоста одразу отримують помилку, не чекаючи таймаутів HEAD, SSL-fallback та robots.txt.
+    Позначка недоступності діє cool_down секунд; після цього один рядок перевіряє хост знову (пробний запит):
+    успіх знімає позначку, нова помилка поновлює її ще на cool_down секунд. Будь-яка відповідь хоста
+    обнуляє лічильник помилок.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, cool_down=DEFAULT_COOL_DOWN, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cool_down = cool_down
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = {} # host -> (помилок поспіль, текст останньої помилки)
+        self._open_until = {} # host -> момент (clock), до якого хост вважається недоступним
+        self.opened = 0
+        self.rejected = 0
+        self.probes = 0
+
+    def rejection(self, url):
+        """Текст помилки, якщо хост URL зараз вважається недоступним; інакше None.
+
+        Коли позначка недоступності закінчилась, перший виклик повертає None (його рядок - пробний запит),
+        а решта рядків хоста отримують помилку ще cool_down секунд або до результату пробного запиту.
+        """
+        host = host_key(url)
+        if host is None or not self.failure_threshold:
+            return None
+        with self._lock:
+            open_until = self._open_until.get(host)
+            if open_until is None:
+                return None
+            now = self._clock()
+            if now >= open_until:
+                self._open_until[host] = now + self.cool_down
+                self.probes += 1
+                return None
+            self.rejected += 1
+            failures, error_text = self._failures[host]
+            return (f"Хост недоступний: {failures} помилок з'єднання поспіль (остання: {error_text}); "
+                    f"повторна спроба через {open_until - now:.0f} с")
+
+    def record_success(self, url):
+        """Хост відповів: лічильник помилок обнуляється, позначка недоступності знімається."""
+        host = host_key(url)
+        if host is None:
+            return
+        with self._lock:
+            self._failures.pop(host, None)
+            self._open_until.pop(host, None)
+
+    def record_failure(self, url, error_text):
+        """Помилка з'єднання чи таймаут запиту до хоста URL (після всіх повторів)."""
+        host = host_key(url)
+        if host is None or not self.failure_threshold:
+            return
+        with self._lock:
+            failures = self._failures.get(host, (0, None))[0] + 1
+            self._failures[host] = (failures, error_text)
+            if failures >= self.failure_threshold:
+                if host not in self._open_until:
+                    self.opened += 1
+                self._open_until[host] = self._clock() + self.cool_down
+
+    def stats(self):
+        """Кількість недоступних зараз хостів, спрацювань запобіжника, рядків, що отримали помилку одразу, та пробних запитів."""
+        with self._lock:
+            now = self._clock()
+            return {"open": sum(1 for until in self._open_until.values() if until > now), "opened": self.opened,
+                    "rejected": self.rejected, "probes": self.probes}
+
+def get_host_breaker():
+    """Запобіжник хостів активного запуску або None."""
+    return run_component("host_breaker")
+
+def record_host_result(url, error_text=None):
+    """Результат запиту до хоста URL для активного запобіжника: error_text - текст помилки з'єднання чи таймауту."""
+    breaker = get_host_breaker()
+    if breaker is None or url is None:
+        return
+    if error_text is None:
+        breaker.record_success(url)
+    else:
+        breaker.record_failure(url, error_text)
@@ -0,0 +1,164 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlsplit
+
+from timeouts import RowDeadlineExceeded, DEADLINE_MESSAGE, time_left
+from run_context import run_component
+
+#
+# 3.7 ВВІЧЛИВІСТЬ ДО ХОСТІВ ДОНОРІВ (ліміти на хост та Crawl-delay)
+#
+
+# Скільки донорів одного хоста перевіряється одночасно
+DEFAULT_MAX_PER_HOST = 2
+# Запитів на секунду до одного хоста та скільки запитів можна надіслати одразу, без пауз
+DEFAULT_HOST_RATE = 2.0
+DEFAULT_HOST_BURST = 4
+# Найбільший Crawl-delay з robots.txt, який враховується (секунди); більші значення обрізаються
+DEFAULT_MAX_CRAWL_DELAY = 10
+# Скільки хостів одночасно чергуються в порядку перевірки (не більше за кількість пулів з'єднань сесії)
+DEFAULT_HOST_WINDOW = 50
+
+def host_key(url):
+    """Хост URL у нижньому регістрі (без порту) або None для URL без хоста."""
+    try:
+        return urlsplit(url).hostname or None
+    except (ValueError, AttributeError, TypeError):
+        return None
+
+def interleave_by_host(items, url_of, window=DEFAULT_HOST_WINDOW):
+    """Порядок перевірки, в якому сусідні елементи належать різним хостам.
+
+    Елементи чергуються по колу між щонайбільше window хостами (у порядку їх першої появи); наступний
+    хост приєднується, коли в одного з них закінчилися елементи. Елементи одного хоста зберігають свій
+    порядок і йдуть не далі ніж через window позицій, тож його з'єднання та robots.txt ще в кеші.
+    """
+    queues = OrderedDict()
+    for item in items:
+        queues.setdefault(host_key(url_of(item)), deque()).append(item)
+    waiting = deque(queues.values())
+    active = deque(waiting.popleft() for _ in range(min(max(1, window), len(waiting))))
+    ordered = []
+    while active:
+        queue = active.popleft()
+        ordered.append(queue.popleft())
+        if queue:
+            active.append(queue)
+        elif waiting:
+            active.append(waiting.popleft())
+    return ordered
+
+class HostScheduler:
+    """Планувальник запитів до хостів донорів на один запуск.
+
+    Одночасно перевіряється не більше max_per_host донорів одного хоста (slot/async_slot), а кожен запит
+    до хоста чекає на токен (reserve): до rate запитів на секунду з запасом burst. Якщо robots.txt хоста
+    задає Crawl-delay, запити до нього йдуть не частіше ніж раз на цей інтервал (не більше max_crawl_delay).
+    """
+
+    def __init__(self, max_per_host=DEFAULT_MAX_PER_HOST, rate=DEFAULT_HOST_RATE, burst=DEFAULT_HOST_BURST,
+                 max_crawl_delay=DEFAULT_MAX_CRAWL_DELAY, window=DEFAULT_HOST_WINDOW):
+        self.max_per_host = max(1, max_per_host) if max_per_host else None
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_crawl_delay = max_crawl_delay
+        self.window = window
+        self._lock = threading.Lock()
+        self._next_send = {} # host -> теоретичний момент наступного запиту (time.monotonic) за ритмом хоста
+        self._crawl_delays = {} # host -> Crawl-delay, секунди
+        self._slots = {} # host -> threading.BoundedSemaphore
+        self._async_slots = {} # host -> asyncio.Semaphore
+        self.delayed = 0
+        self.waited = 0.0
+
+    def set_crawl_delay(self, url, seconds):
+        """Запам'ятовує Crawl-delay з robots.txt хоста URL (None або 0 - без затримки)."""
+        host = host_key(url)
+        if host is None or not seconds:
+            return
+        with self._lock:
+            self._crawl_delays[host] = min(float(seconds), self.max_crawl_delay)
+
+    def _interval(self, host):
+        # Мінімальний інтервал між запитами до хоста та дозволений запас запитів без пауз
+        crawl_delay = self._crawl_delays.get(host)
+        if crawl_delay:
+            return max(crawl_delay, 1 / self.rate if self.rate else 0), 1
+        return (1 / self.rate if self.rate else 0), self.burst
+
+    def reserve(self, url, max_wait=None):
+        """Бронює наступний запит до хоста URL; повертає паузу перед ним у секундах.
+
+        Якщо пауза довша за max_wait, нічого не бронює і повертає None.
+        """
+        host = host_key(url)
+        if host is None:
+            return 0
+        with self._lock:
+            interval, burst = self._interval(host)
+            if not interval:
+                return 0
+            now = time.monotonic()
+            next_send = max(self._next_send.get(host, now), now)
+            wait = max(0.0, next_send - (burst - 1) * interval - now)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._next_send[host] = next_send + interval
+            if wait:
+                self.delayed += 1
+                self.waited += wait
+            return wait
+
+    @contextmanager
+    def slot(self, url):
+        """Місце для перевірки донора: чекає, доки одночасних перевірок хоста стане менше max_per_host."""
+        host = host_key(url)
+        if self.max_per_host is None or host is None:
+            yield
+            return
+        with self._lock:
+            semaphore = self._slots.setdefault(host, threading.BoundedSemaphore(self.max_per_host))
+        with semaphore:
+            yield
+
+    @asynccontextmanager
+    async def async_slot(self, url):
+        """Асинхронний аналог slot для asyncio-рушія."""
+        host = host_key(url)
+        if self.max_per_host is None or host is None:
+            yield
+            return
+        semaphore = self._async_slots.setdefault(host, asyncio.Semaphore(self.max_per_host))
+        async with semaphore:
+            yield
+
+    def stats(self):
+        """Кількість хостів з Crawl-delay, запитів, що чекали на свою чергу, та загальний час очікування."""
+        with self._lock:
+            return {"crawl_delay_hosts": len(self._crawl_delays), "delayed": self.delayed, "waited": round(self.waited, 1)}
+
+def get_host_scheduler():
+    """Планувальник хостів активного запуску або None."""
+    return run_component("host_scheduler")
+
+def host_delay(url):
+    """Пауза перед запитом до хоста URL за активним планувальником (0 - без паузи).
+
+    RowDeadlineExceeded, якщо пауза не вкладається в ліміт часу рядка.
+    """
+    scheduler = get_host_scheduler()
+    if scheduler is None or url is None:
+        return 0
+    wait = scheduler.reserve(url, max_wait=time_left())
+    if wait is None:
+        raise RowDeadlineExceeded(DEADLINE_MESSAGE)
+    return wait
+
+def wait_for_host(url):
+    """Чекає на чергу запиту до хоста URL (блокуючий шлях)."""
+    wait = host_delay(url)
+    if wait:
+        time.sleep(wait)
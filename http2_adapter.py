@@ -0,0 +1,168 @@
+import ssl
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, select_proxy
+
+try:
+    import httpx
+    import h2  # noqa: F401 - httpx підтримує HTTP/2 лише з пакетом h2
+except ImportError:  # httpx[http2] потрібен лише для HTTP/2-транспорту, основний шлях працює без нього
+    httpx = None
+
+#
+# 3.5 HTTP/2-ТРАНСПОРТ (httpx) ДЛЯ СПІЛЬНОЇ СЕСІЇ
+#
+
+# Заголовки з'єднання HTTP/1.1, заборонені в HTTP/2 (requests додає Connection: keep-alive за замовчуванням)
+HOP_BY_HOP_HEADERS = frozenset(("connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade"))
+
+def http2_available():
+    """Чи встановлено httpx з підтримкою HTTP/2 (пакет h2)."""
+    return httpx is not None
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+def _httpx_timeout(timeout):
+    # requests: число або кортеж (connect, read); httpx: окремо connect/read/write/pool
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+def _is_ssl_failure(error):
+    # Шукає ssl.SSLError у ланцюжку винятків (httpx → httpcore → ssl)
+    seen = set()
+    while isinstance(error, BaseException) and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, ssl.SSLError):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def _requests_error(error, request):
+    """Виняток requests, що відповідає винятку httpx (щоб SSL-fallback і повтори працювали без змін).
+
+    SSLError - лише коли причиною є справжня помилка ssl, а не слово "SSL" у тексті помилки з'єднання.
+    """
+    message = str(error) or type(error).__name__
+    if _is_ssl_failure(error):
+        return requests.exceptions.SSLError(message, request=request)
+    if isinstance(error, httpx.ConnectTimeout):
+        return requests.exceptions.ConnectTimeout(message, request=request)
+    if isinstance(error, httpx.ReadTimeout):
+        return requests.exceptions.ReadTimeout(message, request=request)
+    if isinstance(error, httpx.TimeoutException):
+        return requests.exceptions.Timeout(message, request=request)
+    if isinstance(error, httpx.UnsupportedProtocol):
+        return requests.exceptions.InvalidURL(message, request=request)
+    return requests.exceptions.ConnectionError(message, request=request)
+
+class _Http2Body:
+    """Тіло відповіді httpx в інтерфейсі response.raw, який використовують iter_content та read_body."""
+
+    def __init__(self, response, request):
+        self._response = response
+        self._request = request
+        self.version = 20 if response.http_version == "HTTP/2" else 11
+
+    def stream(self, chunk_size=None, decode_content=True):
+        try:
+            yield from self._response.iter_bytes(chunk_size)
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ChunkedEncodingError(str(e), request=self._request) from e
+
+    def read(self, amt=None, decode_content=True):
+        return b"".join(self.stream(amt))
+
+    def close(self):
+        self._response.close()
+
+    def release_conn(self):
+        self._response.close()
+
+class Http2Adapter(BaseAdapter):
+    """Адаптер requests, що надсилає HTTPS-запити через httpx з HTTP/2.
+
+    Одночасні запити з різних потоків до одного origin мультиплексуються в одному з'єднанні. Сервери без
+    HTTP/2 отримують HTTP/1.1 через ALPN; origin, де HTTP/2 завершився помилкою протоколу, до кінця роботи
+    сесії обслуговується звичайним HTTPAdapter. Відповідь має атрибут http_version ("HTTP/2" або "HTTP/1.1").
+    Запити через проксі теж ідуть через HTTPAdapter.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, transport=None):
+        super().__init__()
+        self._transport = transport # Транспорт httpx замість мережевого (для тестів)
+        self._fallback = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self._limits = httpx.Limits(max_connections=None, max_keepalive_connections=pool_connections * pool_maxsize)
+        self._clients = {} # verify -> httpx.Client
+        self._http1_origins = set()
+        self._lock = threading.Lock()
+
+    def _client(self, verify):
+        key = verify if isinstance(verify, (bool, str)) else True
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                # Шлях до CA-бандла (REQUESTS_CA_BUNDLE/certifi) передаємо як SSL-контекст
+                ssl_verify = ssl.create_default_context(cafile=key) if isinstance(key, str) else key
+                client = httpx.Client(http2=True, verify=ssl_verify, follow_redirects=False, limits=self._limits, transport=self._transport)
+                # Заголовки беруться з запиту requests; типовий Connection: keep-alive httpx для HTTP/2 зайвий
+                del client.headers["Connection"]
+                self._clients[key] = client
+            return client
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        origin = _origin(request.url)
+        if cert or (proxies and select_proxy(request.url, proxies)) or origin in self._http1_origins:
+            return self._fallback.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+        client = self._client(verify)
+        headers = {name: value for name, value in request.headers.items() if name.lower() not in HOP_BY_HOP_HEADERS}
+        httpx_request = client.build_request(request.method, request.url, headers=headers,
+                                             content=request.body, timeout=_httpx_timeout(timeout))
+        try:
+            httpx_response = client.send(httpx_request, stream=True)
+        except httpx.RemoteProtocolError:
+            # Сервер оголосив HTTP/2, але порушив протокол - цей origin далі працює через HTTP/1.1
+            with self._lock:
+                self._http1_origins.add(origin)
+            return self._fallback.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        except httpx.HTTPError as e:
+            raise _requests_error(e, request) from e
+
+        response = self.build_response(request, httpx_response)
+        if not stream:
+            response.content # Як і HTTPAdapter: без stream тіло читається одразу
+        return response
+
+    def build_response(self, request, httpx_response):
+        response = requests.Response()
+        response.status_code = httpx_response.status_code
+        response.reason = httpx_response.reason_phrase
+        headers = CaseInsensitiveDict()
+        # Як http.client: сирі байти заголовків як latin-1, інакше get_redirect_target не зможе
+        # перекодувати Location з UTF-8 (httpx уже декодував його як UTF-8)
+        for raw_name, raw_value in httpx_response.headers.raw:
+            name, value = raw_name.decode("latin-1"), raw_value.decode("latin-1")
+            headers[name] = f"{headers[name]}, {value}" if name in headers else value
+        response.headers = headers
+        response.encoding = get_encoding_from_headers(headers)
+        response.raw = _Http2Body(httpx_response, request)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.http_version = httpx_response.http_version
+        return response
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+        self._fallback.close()
@@ -0,0 +1,250 @@
+import contextvars
+import socket
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from dns_cache import get_dns_cache
+from http2_adapter import Http2Adapter, http2_available
+from proxy_pool import ProxyPoolAdapter
+from timeouts import get_host_timeouts, clamp_to_deadline, check_deadline
+
+#
+# 3. СПІЛЬНА HTTP-СЕСІЯ (пул з'єднань для всіх перевірок)
+#
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.6167.184 Safari/537.36'
+
+# Таймаути (секунди) за типом запиту: HEAD/GET сторінки донора, robots.txt та ValueSerp API
+DEFAULT_TIMEOUTS = {"head": 10, "get": 15, "robots": 5, "api": 30}
+
+# Розмір частини при потоковому читанні тіла відповіді
+BODY_CHUNK_SIZE = 16 * 1024
+
+# Кількість хостів, для яких зберігаються пули, та максимум keep-alive з'єднань на один хост
+DEFAULT_POOL_CONNECTIONS = 100
+DEFAULT_POOL_MAXSIZE = 10
+
+_settings = {
+    "pool_connections": DEFAULT_POOL_CONNECTIONS,
+    "pool_maxsize": DEFAULT_POOL_MAXSIZE,
+    "user_agent": DEFAULT_USER_AGENT,
+    "timeouts": dict(DEFAULT_TIMEOUTS),
+    "http2": False,
+}
+_session = None
+_session_lock = threading.Lock()
+_protocol_counts = Counter() # протокол -> кількість відповідей
+_protocol_lock = threading.Lock()
+
+def configure_session(pool_connections=None, pool_maxsize=None, user_agent=None, timeouts=None, http2=None):
+    """Змінює налаштування спільної сесії. Поточна сесія закривається, наступний get_session() створить нову."""
+    if pool_connections is not None:
+        _settings["pool_connections"] = pool_connections
+    if pool_maxsize is not None:
+        _settings["pool_maxsize"] = pool_maxsize
+    if user_agent is not None:
+        _settings["user_agent"] = user_agent
+    if timeouts:
+        _settings["timeouts"].update(timeouts)
+    if http2 is not None:
+        if http2 and not http2_available():
+            print("⚠️ HTTP/2 потребує пакета httpx[http2], використовуємо HTTP/1.1.")
+        _settings["http2"] = bool(http2) and http2_available()
+    close_session()
+
+def response_protocol(response):
+    """Протокол, яким отримано відповідь requests: "HTTP/2", "HTTP/1.1", "HTTP/1.0" або None (невідомо)."""
+    version = getattr(response, "http_version", None)
+    if version:
+        return version
+    return {10: "HTTP/1.0", 11: "HTTP/1.1", 20: "HTTP/2"}.get(getattr(getattr(response, "raw", None), "version", None))
+
+def _count_protocol(response, *args, **kwargs):
+    # Хук сесії: рахує протокол кожної відповіді (сторінки донорів, robots.txt, ValueSerp)
+    protocol = response_protocol(response)
+    if protocol:
+        with _protocol_lock:
+            _protocol_counts[protocol] += 1
+
+def _observe_latency(response, *args, **kwargs):
+    # Хук сесії: затримка кожної відповіді для адаптивних таймаутів; між редиректами - перевірка ліміту часу рядка
+    host_timeouts = get_host_timeouts()
+    if host_timeouts is not None:
+        host_timeouts.record(response.url, response.elapsed.total_seconds())
+    if response.is_redirect:
+        check_deadline()
+
+def protocol_stats(reset=False):
+    """Кількість відповідей за протоколом з моменту попереднього скидання; reset=True - скинути лічильники."""
+    with _protocol_lock:
+        stats = dict(_protocol_counts)
+        if reset:
+            _protocol_counts.clear()
+    return stats
+
+class _CachedDnsConnectionMixin:
+    # З'єднання urllib3, що бере адреси хоста з активного DNS-кешу запуску; без кешу чи запису - звичайний DNS
+
+    def _new_conn(self):
+        dns_cache = get_dns_cache()
+        infos = dns_cache.lookup(self.host, self.port) if dns_cache is not None else None
+        if not infos:
+            return super()._new_conn()
+        error = None
+        for _, _, _, _, sockaddr in infos:
+            try:
+                return urllib3.util.connection.create_connection(sockaddr[:2], self.timeout, source_address=self.source_address,
+                                                                 socket_options=self.socket_options)
+            except socket.timeout as e:
+                raise urllib3.exceptions.ConnectTimeoutError(self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})") from e
+            except OSError as e: # Недоступна адреса - пробуємо наступну, як і create_connection
+                error = urllib3.exceptions.NewConnectionError(self, f"Failed to establish a new connection: {e}")
+                error.__cause__ = e
+        raise error
+
+class _CachedDnsHTTPConnection(_CachedDnsConnectionMixin, HTTPConnection):
+    pass
+
+class _CachedDnsHTTPSConnection(_CachedDnsConnectionMixin, HTTPSConnection):
+    pass
+
+class _CachedDnsHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CachedDnsHTTPConnection
+
+class _CachedDnsHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CachedDnsHTTPSConnection
+
+class SessionAdapter(ProxyPoolAdapter):
+    """Адаптер спільної сесії: пул проксі (ProxyPoolAdapter) і адреси хостів з активного DNS-кешу (run_context.RunContext.dns_cache).
+
+    Кеш діє лише на прямі з'єднання цього адаптера, socket.getaddrinfo процесу не змінюється.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _CachedDnsHTTPConnectionPool, "https": _CachedDnsHTTPSConnectionPool}
+
+def get_session():
+    """Повертає спільну requests.Session з пулами keep-alive з'єднань для кожного хоста.
+
+    Якщо HTTP/2 увімкнено (configure_session(http2=True)), HTTPS-запити йдуть через Http2Adapter.
+    Запити через HTTP/1.1 використовують пул проксі та DNS-кеш активного запуску (run_context.RunContext).
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.headers['User-Agent'] = _settings["user_agent"]
+                adapter = SessionAdapter(pool_connections=_settings["pool_connections"], pool_maxsize=_settings["pool_maxsize"])
+                session.mount('http://', adapter)
+                if _settings["http2"]:
+                    session.mount('https://', Http2Adapter(pool_connections=_settings["pool_connections"], pool_maxsize=_settings["pool_maxsize"]))
+                else:
+                    session.mount('https://', adapter)
+                session.hooks['response'].extend([_count_protocol, _observe_latency])
+                _session = session
+    return _session
+
+def close_session():
+    """Закриває спільну сесію та всі її з'єднання."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+def prewarm_connection(origin):
+    """Заздалегідь відкриває з'єднання (TCP і TLS) до origin звичайним HEAD-запитом спільної сесії.
+
+    Після відповіді з'єднання лишається в пулі сесії (і HTTP/1.1, і HTTP/2) для запитів рядків.
+    Повертає True, якщо сервер відповів (з будь-яким статусом); помилки ігноруються - рядок однаково
+    відкриє з'єднання сам.
+    """
+    try:
+        with get_session().head(origin, timeout=get_timeout("head"), allow_redirects=False):
+            return True
+    except (requests.exceptions.RequestException, ValueError):
+        return False
+
+def prewarm_connections(urls, max_workers=DEFAULT_POOL_CONNECTIONS):
+    """Відкриває по одному з'єднанню до кожного унікального origin зі списку URL. Повертає кількість встановлених."""
+    origins = set()
+    for url in urls:
+        try:
+            parts = urlsplit(url)
+        except (ValueError, AttributeError, TypeError):
+            continue
+        if parts.scheme in ("http", "https") and parts.netloc:
+            origins.add(f"{parts.scheme}://{parts.netloc}/")
+    if not origins:
+        return 0
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(origins)))) as executor:
+        # Кожне з'єднання - з контекстом запуску (DNS-кеш, пул проксі, адаптивні таймаути)
+        futures = [executor.submit(contextvars.copy_context().run, prewarm_connection, origin) for origin in sorted(origins)]
+        return sum(future.result() for future in futures)
+
+def get_timeout(kind):
+    """Таймаут (секунди) для типу запиту: "head", "get", "robots" або "api"."""
+    return _settings["timeouts"][kind]
+
+def request_timeout(kind, url=None):
+    """Таймаут запиту типу kind до url з урахуванням адаптивного таймауту хоста та залишку часу рядка.
+
+    Для ValueSerp API ("api") адаптивний таймаут не застосовується - лише ліміт часу рядка.
+    Якщо час рядка вичерпано, кидає timeouts.RowDeadlineExceeded.
+    """
+    timeout = get_timeout(kind)
+    host_timeouts = get_host_timeouts()
+    if host_timeouts is not None and url and kind != "api":
+        timeout = host_timeouts.host_timeout(url, timeout)
+    return clamp_to_deadline(timeout)
+
+def get_pool_maxsize():
+    """Максимальна кількість keep-alive з'єднань на один хост."""
+    return _settings["pool_maxsize"]
+
+def default_headers():
+    """Заголовки, що додаються до кожного запиту (User-Agent)."""
+    return {'User-Agent': _settings["user_agent"]}
+
+def read_body(response, max_bytes=None, stop_when=None, chunk_size=BODY_CHUNK_SIZE):
+    """Читає тіло потокової відповіді (stream=True) частинами.
+
+    max_bytes - ліміт байтів (None - без ліміту); stop_when(chunk) - викликається для кожної частини
+    і повертає True, коли решту тіла читати вже не потрібно.
+    Повертає (body_bytes, truncated, stopped_early): truncated - тіло обрізано лімітом байтів.
+    """
+    chunks = []
+    total = 0
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        check_deadline() # Сторінка, що віддається повільно, не тримає потік довше за ліміт часу рядка
+        if not chunk:
+            continue
+        if max_bytes is not None and total + len(chunk) > max_bytes:
+            chunks.append(chunk[:max_bytes - total])
+            return b"".join(chunks), True, False
+        chunks.append(chunk)
+        total += len(chunk)
+        if stop_when is not None and stop_when(chunk):
+            return b"".join(chunks), False, True
+    return b"".join(chunks), False, False
+
+def accepts_byte_ranges(headers):
+    """Чи оголошує сервер підтримку Range-запитів (Accept-Ranges: bytes)."""
+    return (headers.get('Accept-Ranges') or '').strip().lower() == 'bytes'
+
+def is_partial_content_truncated(status_code, headers, received_bytes):
+    """Для відповіді 206 визначає за Content-Range, чи є в ресурсі ще байти після отриманих."""
+    if status_code != 206:
+        return False
+    content_range = headers.get('Content-Range') or ''
+    total = content_range.rsplit('/', 1)[-1].strip()
+    return not total.isdigit() or int(total) > received_bytes
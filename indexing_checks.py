@@ -1,10 +1,14 @@
-import requests
 import re
 import logging
 from urllib.parse import urlparse, parse_qsl
 
+from http_client import get_session, request_timeout
+from timeouts import RowDeadlineExceeded, DEADLINE_MESSAGE, is_deadline_error
+
 logger = logging.getLogger(__name__)
 
+VALUESERP_SEARCH_URL = "https://api.valueserp.com/search"
+
 def clean_url_for_indexing_check(url):
     """
     Очищає URL від протоколу та www для перевірки індексації.
@@ -70,6 +74,57 @@ def format_search_query(url):
     return query
 
 
+def build_indexing_params(query, api_key):
+    """
+    Формує параметри запиту до ValueSerp API для пошукового запиту.
+    
+    Args:
+        query (str): Пошуковий запит (site:...)
+        api_key (str): API ключ для ValueSerp
+        
+    Returns:
+        dict: Параметри запиту
+    """
+    return {
+        "api_key": api_key,
+        "q": query,
+        "google_domain": "google.com",
+        "gl": "us",
+        "hl": "en",
+        "num": 1  # Нам потрібен лише факт індексації, тому обмежуємо кількість результатів
+    }
+
+
+def parse_indexing_response(data, url):
+    """
+    Визначає за JSON-відповіддю ValueSerp, чи проіндексований URL.
+    
+    Args:
+        data (dict): Розібрана JSON-відповідь ValueSerp
+        url (str): URL, що перевіряється (для логування)
+        
+    Returns:
+        bool: True, якщо URL знайдено в індексі Google
+    """
+    # Перевіряємо, чи є органічні результати в відповіді
+    if "organic_results" in data and len(data["organic_results"]) > 0:
+        logger.info(f"URL {url} знайдено в індексі Google")
+        return True
+    else:
+        # Перевіряємо, чи є повідомлення про відсутність результатів
+        if "search_information" in data and data["search_information"].get("original_query_yields_zero_results", False):
+            logger.info(f"URL {url} не знайдено в індексі Google")
+            return False
+            
+        # На всяк випадок перевіряємо загальну кількість результатів
+        if "search_information" in data and data["search_information"].get("total_results", 0) == 0:
+            logger.info(f"URL {url} не знайдено в індексі Google (нуль результатів)")
+            return False
+            
+        logger.info(f"URL {url} не знайдено в індексі Google")
+        return False
+
+
 def check_google_indexing(url, api_key):
     """
     Перевіряє індексацію URL в Google за допомогою ValueSerp API.
@@ -80,6 +135,9 @@ def check_google_indexing(url, api_key):
         
     Returns:
         tuple: (bool, str) - (True/False - URL проіндексований чи ні, пошуковий запит)
+
+    Raises:
+        RowDeadlineExceeded: ліміт часу рядка вичерпано до відповіді ValueSerp (результат невідомий, а не "не проіндексовано")
     """
     # Формуємо пошуковий запит
     query = format_search_query(url)
@@ -88,40 +146,19 @@ def check_google_indexing(url, api_key):
     logger.info(f"Пошуковий запит: {query}")
     
     # Параметри запиту до ValueSerp API
-    params = {
-        "api_key": api_key,
-        "q": query,
-        "google_domain": "google.com",
-        "gl": "us",
-        "hl": "en",
-        "num": 1  # Нам потрібен лише факт індексації, тому обмежуємо кількість результатів
-    }
+    params = build_indexing_params(query, api_key)
     
     try:
-        response = requests.get("https://api.valueserp.com/search", params=params)
+        response = get_session().get(VALUESERP_SEARCH_URL, params=params, timeout=request_timeout("api"))
         response.raise_for_status()
         
         data = response.json()
         
-        # Перевіряємо, чи є органічні результати в відповіді
-        if "organic_results" in data and len(data["organic_results"]) > 0:
-            logger.info(f"URL {url} знайдено в індексі Google")
-            return True, query
-        else:
-            # Перевіряємо, чи є повідомлення про відсутність результатів
-            if "search_information" in data and data["search_information"].get("original_query_yields_zero_results", False):
-                logger.info(f"URL {url} не знайдено в індексі Google")
-                return False, query
-                
-            # На всяк випадок перевіряємо загальну кількість результатів
-            if "search_information" in data and data["search_information"].get("total_results", 0) == 0:
-                logger.info(f"URL {url} не знайдено в індексі Google (нуль результатів)")
-                return False, query
-                
-            logger.info(f"URL {url} не знайдено в індексі Google")
-            return False, query
+        return parse_indexing_response(data, url), query
             
     except Exception as e:
+        if is_deadline_error(e):
+            raise RowDeadlineExceeded(DEADLINE_MESSAGE) from e
         logger.error(f"Помилка при перевірці індексації URL {url}: {str(e)}")
         # У випадку помилки вважаємо, що URL не проіндексований
-        return False, query 
\ No newline at end of file
+        return False, query
\ No newline at end of file
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from run_context import run_component
+
+#
+# 2.2 КЕШ РЕЗУЛЬТАТІВ ПЕРЕВІРКИ СТОРІНОК (між запусками)
+#
+
+# Поля результату, що залежать лише від вмісту сторінки та пар Урл/Анкор рядка
+PAGE_RESULT_FIELDS = (
+    "indexing_directives", "canonical_url",
+    "url1_found", "anchor1_match", "url1_rel",
+    "url2_found", "anchor2_match", "url2_rel",
+    "url3_found", "anchor3_match", "url3_rel",
+    "page_truncated",
+)
+
+def page_inputs_key(pairs_list):
+    """Ключ вхідних даних сторінки: пари Анкор/Урл усіх рядків з цим донором (у порядку рядків)."""
+    # NaN з pandas не дорівнює сам собі - вважаємо його порожнім значенням
+    values = [[str(value) if value is not None and value == value else None for value in pairs] for pairs in pairs_list]
+    return hashlib.sha256(json.dumps(values, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def content_hash(html_content, headers):
+    """Хеш вмісту сторінки разом з X-Robots-Tag, що теж впливає на директиви індексації."""
+    digest = hashlib.sha256(html_content.encode("utf-8", errors="replace"))
+    digest.update((headers.get("X-Robots-Tag") or "").encode("utf-8", errors="replace"))
+    return digest.hexdigest()
+
+class PageCache:
+    """SQLite-кеш сторінок донорів: ETag, Last-Modified, хеш вмісту та результати перевірок для фінального URL.
+
+    Запис використовується лише для тих самих пар Анкор/Урл (inputs_key): при відповіді 304 на умовний GET
+    або при тому самому хеші вмісту результати canonical, директив та посилань беруться з запису без парсингу.
+    Результати зберігаються списком - окремо для кожного рядка з цим донором.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Одне з'єднання на всі потоки та asyncio-рушій; доступ серіалізується через _lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS page_checks ("
+                " final_url TEXT PRIMARY KEY,"
+                " inputs_key TEXT NOT NULL,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " body_hash TEXT NOT NULL,"
+                " results TEXT NOT NULL,"
+                " checked_at REAL NOT NULL)"
+            )
+        self.not_modified = 0
+        self.same_content = 0
+        self.parsed = 0
+
+    def lookup(self, final_url, inputs_key):
+        """Запис для final_url, якщо він збережений для тих самих пар Анкор/Урл, інакше None."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM page_checks WHERE final_url = ?", (final_url,)).fetchone()
+        if row is None or row["inputs_key"] != inputs_key:
+            return None
+        record = dict(row)
+        record["results"] = json.loads(record["results"])
+        return record
+
+    @staticmethod
+    def conditional_headers(record):
+        """Заголовки умовного GET для запису або порожній словник."""
+        headers = {}
+        if record and record.get("etag"):
+            headers["If-None-Match"] = record["etag"]
+        if record and record.get("last_modified"):
+            headers["If-Modified-Since"] = record["last_modified"]
+        return headers
+
+    def save(self, final_url, inputs_key, headers, body_hash, row_results):
+        """Зберігає валідатори, хеш вмісту та результати перевірок сторінки для кожного рядка."""
+        stored = [{field: result.get(field) for field in PAGE_RESULT_FIELDS} for result in row_results]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO page_checks (final_url, inputs_key, etag, last_modified, body_hash, results, checked_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (final_url, inputs_key, headers.get("ETag"), headers.get("Last-Modified"), body_hash,
+                 json.dumps(stored, ensure_ascii=False), time.time())
+            )
+
+    def count(self, outcome):
+        """Враховує результат для статистики: "not_modified", "same_content" або "parsed"."""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self):
+        """Лічильники за час роботи: відповіді 304, незмінений вміст та сторінки, розібрані заново."""
+        with self._lock:
+            return {"not_modified": self.not_modified, "same_content": self.same_content, "parsed": self.parsed}
+
+    def close(self):
+        """Закриває з'єднання з базою."""
+        with self._lock:
+            self._conn.close()
+
+def get_page_cache():
+    """Кеш сторінок активного запуску або None."""
+    return run_component("page_cache")
@@ -0,0 +1,265 @@
+import asyncio
+import importlib.util
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from host_scheduler import host_key
+from timeouts import RowDeadlineExceeded
+from run_context import run_component
+
+#
+# 3.11 ПУЛ ПРОКСІ (власний ліміт, оцінка стану, закріплення хостів)
+#
+
+# Скільки запитів одночасно йде через один проксі
+DEFAULT_MAX_PER_PROXY = 4
+# Проксі виводиться з ротації після стількох помилок самого проксі поспіль (ProxyError, 407, збій SOCKS)
+DEFAULT_MAX_PROXY_FAILURES = 3
+# ... або якщо помилки з'єднання, таймаути чи статуси блокування поспіль прийшли від стількох різних хостів
+# (від одного хоста це, найімовірніше, проблема донора, а не проксі)
+DEFAULT_PROXY_BAN_HOSTS = 3
+# ... або якщо його згладжена затримка відповіді більша за стільки секунд
+DEFAULT_MAX_PROXY_LATENCY = 10
+# Через скільки секунд виведений проксі повертається в ротацію
+DEFAULT_PROXY_COOL_DOWN = 300
+LATENCY_SMOOTHING = 0.3 # Вага нової затримки в експоненційному згладжуванні
+MIN_LATENCY_SAMPLES = 3 # Скільки відповідей потрібно, щоб оцінювати проксі за затримкою
+
+# Статус, яким відповідає сам проксі (відхилив автентифікацію)
+PROXY_ERROR_STATUS_CODES = (407,)
+# Статуси, якими донор зазвичай блокує IP проксі (але й звичайні відповіді окремих донорів)
+PROXY_BAN_STATUS_CODES = (403, 429)
+# Винятки PySocks, що виникають до з'єднання з донором: проксі недоступний, обірвав рукостискання, відхилив автентифікацію
+SOCKS_PROXY_ERRORS = ("ProxyConnectionError", "GeneralProxyError", "SOCKS5AuthError")
+# Хости, запити до яких завжди йдуть напряму (ValueSerp API - не донор)
+DEFAULT_DIRECT_HOSTS = ("api.valueserp.com",)
+
+def _is_socks_failure(error):
+    # Шукає виняток PySocks у ланцюжку (requests → urllib3 → socks)
+    seen = set()
+    while isinstance(error, BaseException) and id(error) not in seen:
+        seen.add(id(error))
+        if type(error).__module__ == "socks" and type(error).__name__ in SOCKS_PROXY_ERRORS:
+            return True
+        error = error.__cause__ or error.__context__ or getattr(error, "reason", None) or (error.args[0] if error.args else None)
+    return False
+
+def is_proxy_failure(error):
+    """Чи означає виняток requests збій самого проксі: ProxyError або помилка SOCKS-рукостискання."""
+    return isinstance(error, requests.exceptions.ProxyError) or _is_socks_failure(error)
+
+def is_connection_failure(error):
+    """Чи є виняток requests помилкою з'єднання чи таймаутом, але не SSL донора і не лімітом часу рядка.
+
+    Через проксі така помилка може бути як збоєм проксі, так і недоступністю донора.
+    """
+    if isinstance(error, (requests.exceptions.SSLError, RowDeadlineExceeded)):
+        return False
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+def socks_available():
+    """Чи встановлено PySocks (requests[socks]), потрібний для SOCKS-проксі."""
+    return importlib.util.find_spec("socks") is not None
+
+def is_socks_proxy(proxy_url):
+    """Чи є адреса проксі SOCKS-проксі (socks4://, socks5://, socks5h://)."""
+    return urlsplit(proxy_url).scheme.lower().startswith("socks")
+
+class _Proxy:
+    # Стан одного проксі протягом запуску
+    def __init__(self, url, max_concurrency):
+        self.url = url
+        self.socks = is_socks_proxy(url)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.latency = None # Згладжена затримка, секунди
+        self.samples = 0
+        self.failures = 0 # Помилок самого проксі поспіль
+        self.failed_hosts = set() # Хости з помилками з'єднання чи статусами блокування поспіль
+        self.removed_until = None
+        self.requests = 0
+        self.slot = threading.BoundedSemaphore(max_concurrency)
+        self.async_slot = None # asyncio.Semaphore (створюється в циклі подій asyncio-рушія)
+
+class ProxyPool:
+    """Пул HTTP/SOCKS-проксі для запитів до донорів на один запуск.
+
+    Кожен хост закріплюється за одним проксі (донор бачить стабільну IP-адресу), новий хост отримує
+    найменш завантажений здоровий проксі з найменшою затримкою. Через проксі одночасно йде не більше
+    max_per_proxy запитів. Проксі виводиться з ротації на cool_down секунд, а його хости переходять на інші
+    проксі, якщо він дав max_failures власних помилок поспіль (ProxyError, 407, збій SOCKS), якщо помилки
+    з'єднання, таймаути чи 403/429 поспіль прийшли від ban_hosts різних хостів (недоступний донор чи його
+    403 не виводять проксі) або якщо він відповідає повільніше за max_latency секунд.
+    Якщо здорових проксі не залишилось, запити йдуть напряму.
+    SOCKS-проксі потребують PySocks (requests[socks]); asyncio-рушій використовує лише HTTP-проксі.
+    """
+
+    def __init__(self, proxies, max_per_proxy=DEFAULT_MAX_PER_PROXY, max_failures=DEFAULT_MAX_PROXY_FAILURES,
+                 max_latency=DEFAULT_MAX_PROXY_LATENCY, cool_down=DEFAULT_PROXY_COOL_DOWN, direct_hosts=DEFAULT_DIRECT_HOSTS,
+                 ban_hosts=DEFAULT_PROXY_BAN_HOSTS, clock=time.monotonic):
+        self.max_failures = max_failures
+        self.ban_hosts = ban_hosts
+        self.max_latency = max_latency
+        self.cool_down = cool_down
+        self.direct_hosts = frozenset(direct_hosts)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._proxies = {}
+        for proxy_url in proxies:
+            proxy_url = proxy_url.strip()
+            if not proxy_url or proxy_url in self._proxies:
+                continue
+            if is_socks_proxy(proxy_url) and not socks_available():
+                print(f"⚠️ SOCKS-проксі {proxy_url} потребує пакета requests[socks], пропускаємо.")
+                continue
+            self._proxies[proxy_url] = _Proxy(proxy_url, max(1, max_per_proxy))
+        self._hosts = {} # host -> адреса закріпленого проксі
+        self.removals = 0
+        self.direct = 0
+
+    def __len__(self):
+        return len(self._proxies)
+
+    def _healthy(self, proxy, now):
+        if proxy.removed_until is None:
+            return True
+        if now < proxy.removed_until:
+            return False
+        proxy.removed_until = None # Пауза закінчилась - проксі повертається в ротацію
+        return True
+
+    def proxy_for(self, url, allow_socks=True):
+        """Адреса проксі для запиту до хоста URL або None (запит напряму).
+
+        Хост залишається за своїм проксі, доки той здоровий; allow_socks=False - лише HTTP-проксі.
+        """
+        host = host_key(url)
+        if host is None or host in self.direct_hosts:
+            return None
+        with self._lock:
+            now = self._clock()
+            proxy = self._proxies.get(self._hosts.get(host))
+            if proxy is not None and self._healthy(proxy, now) and (allow_socks or not proxy.socks):
+                return proxy.url
+            candidates = [proxy for proxy in self._proxies.values() if self._healthy(proxy, now) and (allow_socks or not proxy.socks)]
+            if not candidates:
+                self.direct += 1
+                return None
+            proxy = min(candidates, key=lambda p: (p.in_flight / p.max_concurrency, p.latency or 0))
+            self._hosts[host] = proxy.url
+            return proxy.url
+
+    @contextmanager
+    def slot(self, proxy_url):
+        """Місце для запиту через проксі: чекає, доки через нього йде менше max_per_proxy запитів."""
+        proxy = self._proxies[proxy_url]
+        with proxy.slot:
+            self._started(proxy)
+            try:
+                yield
+            finally:
+                self._finished(proxy)
+
+    @asynccontextmanager
+    async def async_slot(self, proxy_url):
+        """Асинхронний аналог slot для asyncio-рушія."""
+        proxy = self._proxies[proxy_url]
+        if proxy.async_slot is None:
+            proxy.async_slot = asyncio.Semaphore(proxy.max_concurrency)
+        async with proxy.async_slot:
+            self._started(proxy)
+            try:
+                yield
+            finally:
+                self._finished(proxy)
+
+    def _started(self, proxy):
+        with self._lock:
+            proxy.in_flight += 1
+            proxy.requests += 1
+
+    def _finished(self, proxy):
+        with self._lock:
+            proxy.in_flight -= 1
+
+    def observe(self, proxy_url, latency=None, status_code=None, failed=False, url=None, proxy_error=False):
+        """Результат запиту до URL через проксі.
+
+        latency і status_code - затримка до заголовків і статус відповіді; failed=True - помилка з'єднання
+        чи таймаут; proxy_error=True - збій самого проксі (ProxyError, SOCKS).
+        """
+        with self._lock:
+            proxy = self._proxies[proxy_url]
+            if latency is not None:
+                proxy.latency = latency if proxy.latency is None else (
+                    LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * proxy.latency)
+                proxy.samples += 1
+            if proxy_error or status_code in PROXY_ERROR_STATUS_CODES:
+                proxy.failures += 1
+            elif failed or status_code in PROXY_BAN_STATUS_CODES:
+                proxy.failed_hosts.add(host_key(url) if url is not None else None)
+            else:
+                proxy.failures = 0
+                proxy.failed_hosts.clear()
+            if proxy.removed_until is not None:
+                return
+            if proxy.failures >= self.max_failures:
+                self._remove(proxy, f"помилок проксі поспіль: {proxy.failures}")
+            elif len(proxy.failed_hosts) >= self.ban_hosts:
+                self._remove(proxy, f"помилки чи блокування від {len(proxy.failed_hosts)} хостів поспіль")
+            elif proxy.samples >= MIN_LATENCY_SAMPLES and proxy.latency > self.max_latency:
+                self._remove(proxy, f"затримка {proxy.latency:.1f} с")
+
+    def _remove(self, proxy, reason):
+        # Викликається під self._lock
+        proxy.removed_until = self._clock() + self.cool_down
+        proxy.failures = 0
+        proxy.failed_hosts.clear()
+        proxy.latency, proxy.samples = None, 0
+        self.removals += 1
+        print(f"   🧦 Проксі {proxy.url} виведено з ротації на {self.cool_down} с ({reason})")
+
+    def stats(self):
+        """Кількість проксі, здорових зараз, виведень з ротації, запитів через проксі та напряму."""
+        with self._lock:
+            now = self._clock()
+            return {"proxies": len(self._proxies),
+                    "healthy": sum(1 for proxy in self._proxies.values() if proxy.removed_until is None or now >= proxy.removed_until),
+                    "removals": self.removals, "requests": sum(proxy.requests for proxy in self._proxies.values()),
+                    "direct": self.direct}
+
+def get_proxy_pool():
+    """Пул проксі активного запуску або None (і для порожнього пулу - запити напряму)."""
+    pool = run_component("proxy_pool")
+    return pool if pool else None
+
+class ProxyPoolAdapter(HTTPAdapter):
+    """HTTPAdapter, що надсилає запити через активний пул проксі (без пулу - звичайний HTTPAdapter).
+
+    Проксі обирається для кожного запиту окремо, тож і кожен крок редиректу йде через проксі свого хоста.
+    Місце в ліміті проксі займається до отримання заголовків відповіді.
+    """
+
+    def send(self, request, **kwargs):
+        pool = get_proxy_pool()
+        proxy_url = pool.proxy_for(request.url) if pool is not None else None
+        if proxy_url is None:
+            return super().send(request, **kwargs)
+        kwargs["proxies"] = {"http": proxy_url, "https": proxy_url}
+        with pool.slot(proxy_url):
+            started = time.monotonic()
+            try:
+                response = super().send(request, **kwargs)
+            except requests.exceptions.RequestException as e:
+                if is_proxy_failure(e):
+                    pool.observe(proxy_url, proxy_error=True)
+                elif is_connection_failure(e):
+                    pool.observe(proxy_url, failed=True, url=request.url)
+                raise
+        pool.observe(proxy_url, time.monotonic() - started, response.status_code, url=request.url)
+        return response
@@ -0,0 +1,176 @@
+import threading
+from collections import namedtuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import requests
+from requests.utils import requote_uri
+
+from run_context import run_component
+
+#
+# 3.12 РЕДИРЕКТИ: ПОКРОКОВЕ СЛІДУВАННЯ ТА КЕШ СТАЛИХ ПЕРЕХОДІВ
+#
+
+# Найбільша кількість редиректів до фінального URL (як у Googlebot)
+DEFAULT_MAX_HOPS = 10
+# Статуси редиректів, які слідуються, та сталі (постійні) з них, що кешуються на запуск
+REDIRECT_STATUS_CODES = (301, 302, 303, 307, 308)
+STABLE_REDIRECT_STATUS_CODES = (301, 308)
+# Скільки однакових переходів різних URL origin потрібно, щоб узагальнити їх у правило хоста
+DEFAULT_RULE_MIN_HOPS = 2
+
+# Крок ланцюжка редиректів в інтерфейсі елементів response.history (url, status_code)
+RedirectHop = namedtuple("RedirectHop", ["url", "status_code"])
+
+class RedirectLoopError(requests.exceptions.TooManyRedirects):
+    """Ланцюжок редиректів повертається до URL, який уже пройдено."""
+
+def _origin_key(url):
+    # (схема, хост) URL без явного порту або None - для таких URL правила хостів не застосовуються
+    try:
+        parts = urlsplit(url)
+        if parts.port is not None or not parts.hostname:
+            return None
+    except (ValueError, AttributeError, TypeError):
+        return None
+    return parts.scheme.lower(), parts.hostname
+
+def _origin_move(url, target):
+    """(схема, netloc) цілі, якщо редирект змінює лише схему та/або хост, а шлях і параметри ті самі; інакше None."""
+    if _origin_key(url) is None or _origin_key(target) is None:
+        return None
+    source, dest = urlsplit(url), urlsplit(target)
+    if ((source.path or "/"), source.query) != ((dest.path or "/"), dest.query):
+        return None
+    return dest.scheme.lower(), dest.netloc.lower()
+
+class RedirectCache:
+    """Кеш сталих редиректів (301/308) на один запуск.
+
+    Кожен такий перехід запам'ятовується для свого URL, тож наступні рядки з тим самим кроком ланцюжка
+    не надсилають для нього запит. Якщо щонайменше rule_min_hops різних URL одного origin переходять на
+    той самий інший origin з тим самим шляхом (http → https, домен → www), перехід узагальнюється в правило
+    хоста й застосовується до будь-якого URL цього origin. Правило ніколи не створюється (або скасовується),
+    якщо URL цього origin відповів без редиректу чи перейшов інакше.
+    """
+
+    def __init__(self, max_hops=DEFAULT_MAX_HOPS, generalize=True, rule_min_hops=DEFAULT_RULE_MIN_HOPS):
+        self.max_hops = max_hops
+        self.generalize = generalize
+        self.rule_min_hops = rule_min_hops
+        self._lock = threading.Lock()
+        self._hops = {} # URL запиту -> (url кроку для ланцюжка, статус, URL наступного кроку)
+        self._candidates = {} # origin -> (схема й netloc цілі, статус, шляхи, з яких спостерігався перехід)
+        self._rules = {} # origin -> (схема й netloc цілі, статус)
+        self._no_rule = set() # origin, для яких правило суперечить спостереженням
+        self.hits = 0
+        self.rule_hits = 0
+
+    def lookup(self, url):
+        """Відомий сталий перехід з URL: (url кроку, статус, URL наступного кроку) або None."""
+        with self._lock:
+            hop = self._hops.get(url)
+            if hop is not None:
+                self.hits += 1
+                return hop
+            origin = _origin_key(url)
+            rule = self._rules.get(origin) if origin is not None else None
+            if rule is None:
+                return None
+            (scheme, netloc), status = rule
+            parts = urlsplit(url)
+            self.hits += 1
+            self.rule_hits += 1
+            return url, status, urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+    def remember(self, url, hop_url, status_code, target):
+        """Запам'ятовує перехід з URL запиту (hop_url - URL відповіді для ланцюжка), якщо він сталий."""
+        with self._lock:
+            origin = _origin_key(url)
+            if status_code not in STABLE_REDIRECT_STATUS_CODES:
+                self._block_rule(origin) # Тимчасовий редирект - origin не переходить завжди однаково
+                return
+            self._hops[url] = (hop_url, status_code, target)
+            if not self.generalize or origin is None or origin in self._no_rule:
+                return
+            move = _origin_move(url, target)
+            candidate = self._candidates.get(origin)
+            if move is None or (candidate is not None and candidate[:2] != (move, status_code)):
+                self._block_rule(origin)
+                return
+            paths = candidate[2] if candidate is not None else set()
+            paths.add(urlsplit(url).path or "/")
+            self._candidates[origin] = (move, status_code, paths)
+            if len(paths) >= self.rule_min_hops:
+                self._rules[origin] = (move, status_code)
+
+    def observe_final(self, url):
+        """URL відповів без редиректу: його origin не переходить кудись для всіх URL."""
+        with self._lock:
+            self._block_rule(_origin_key(url))
+
+    def _block_rule(self, origin):
+        # Викликається під self._lock
+        if origin is None:
+            return
+        self._no_rule.add(origin)
+        self._candidates.pop(origin, None)
+        self._rules.pop(origin, None)
+
+    def stats(self):
+        """Кількість збережених переходів, правил хостів та кроків, для яких запит не надсилався."""
+        with self._lock:
+            return {"hops": len(self._hops), "rules": len(self._rules), "hits": self.hits, "rule_hits": self.rule_hits}
+
+def get_redirect_cache():
+    """Кеш редиректів активного запуску або None."""
+    return run_component("redirect_cache")
+
+class RedirectWalk:
+    """Ланцюжок редиректів одного запиту, що проходиться вручну, крок за кроком.
+
+    next_url() - URL наступного запиту (відомі сталі переходи з активного кешу пропускаються без запиту);
+    follow() - відповідь-редирект, finish() - фінальна відповідь. hops - кроки ланцюжка в порядку проходження,
+    у тому ж вигляді, що й response.history. Цикл редиректів і перевищення max_hops - TooManyRedirects.
+    """
+
+    def __init__(self, url):
+        self.cache = get_redirect_cache()
+        self.max_hops = self.cache.max_hops if self.cache is not None else DEFAULT_MAX_HOPS
+        self.url = url
+        self.hops = []
+        self._seen = {url}
+
+    def next_url(self):
+        """URL, на який треба надіслати запит."""
+        while self.cache is not None:
+            hop = self.cache.lookup(self.url)
+            if hop is None:
+                break
+            hop_url, status_code, target = hop
+            self._advance(hop_url, status_code, target)
+        return self.url
+
+    def follow(self, hop_url, status_code, location):
+        """Відповідь на запит до поточного URL - редирект на location (з заголовка Location).
+
+        Як і requests, символи поза ASCII в location (наприклад, кирилиця в шляху) кодуються у %XX.
+        """
+        target = requote_uri(urljoin(self.url, location))
+        if self.cache is not None:
+            self.cache.remember(self.url, hop_url, status_code, target)
+        self._advance(hop_url, status_code, target)
+
+    def finish(self):
+        """Поточний URL відповів без редиректу."""
+        if self.cache is not None:
+            self.cache.observe_final(self.url)
+
+    def _advance(self, hop_url, status_code, target):
+        self.hops.append(RedirectHop(hop_url, status_code))
+        if len(self.hops) > self.max_hops:
+            raise requests.exceptions.TooManyRedirects(f"Забагато редиректів: понад {self.max_hops}")
+        if target in self._seen:
+            raise RedirectLoopError(f"Цикл редиректів: {target}")
+        self._seen.add(target)
+        self.url = target
@@ -1,17 +1,36 @@
+import re
+import contextlib
+import contextvars
 import requests
 import warnings
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from urllib.parse import unquote
 
-from utils import normalize_url, detect_encoding, is_ssl_error
-from seo_checks import check_robots_txt, check_indexing_directives, check_canonical_tag, check_links_on_page
+from utils import normalize_url, detect_encoding, is_ssl_error, buffered_row_output, routed_stdout, row_key
+from seo_checks import check_robots_txt, prefetch_robots_txt, check_indexing_directives, check_canonical_tag, extract_links, check_links_on_page, PageCompletionTracker, RobotsCache
 from indexing_checks import check_google_indexing
+from http_client import get_session, request_timeout, read_body, accepts_byte_ranges, is_partial_content_truncated, prewarm_connections, response_protocol, protocol_stats
+from page_cache import PageCache, page_inputs_key, content_hash, get_page_cache
+from retry_policy import send_with_retries
+from host_scheduler import get_host_scheduler, interleave_by_host
+from adaptive_concurrency import get_concurrency_controller
+from single_flight import SingleFlight, coalesced
+from host_breaker import get_host_breaker
+from redirect_cache import RedirectCache, RedirectWalk, REDIRECT_STATUS_CODES
+from ssl_registry import SslHostRegistry, get_ssl_registry
+from dns_cache import get_dns_cache
+from timeouts import get_host_timeouts, row_deadline, check_deadline
+from run_context import RunContext, activate_run, run_component
+
+# Скільки груп на потік (чи одночасний рядок asyncio) подається наперед: потоки не простоюють між групами,
+# а черга поданих груп не залежить від розміру таблиці
+IN_FLIGHT_PER_WORKER = 2
 
 # --- НОВА ДОПОМІЖНА ФУНКЦІЯ для SEO та перевірки посилань ---
-def _perform_seo_and_link_checks(final_url, html_content, get_headers, anchor1, url1, anchor2, url2, anchor3, url3, verify_ssl=True):
-    """Виконує перевірки robots.txt, директив індексації, canonical та посилань на сторінці."""
-    print(f"   ├── Виконуємо SEO та перевірку посилань для: {final_url} (SSL Verify: {verify_ssl})")
-    seo_results = {
+def _new_seo_results():
+    """Початкові значення полів SEO та перевірки посилань."""
+    return {
         "robots_star_allowed": None,
         "robots_googlebot_allowed": None,
         "indexing_directives": None,
@@ -23,32 +42,62 @@ def _perform_seo_and_link_checks(final_url, html_content, get_headers, anchor1,
         "url3_found": "Н/Д", "anchor3_match": "Н/Д", "url3_rel": None,
         "link_check_error": None
     }
-    try:
-        # а. Перевірка robots.txt
-        seo_results["robots_star_allowed"] = check_robots_txt(final_url, '*', verify_ssl=verify_ssl)
-        seo_results["robots_googlebot_allowed"] = check_robots_txt(final_url, 'Googlebot', verify_ssl=verify_ssl)
 
-        # b. Перевірка Meta Robots / X-Robots-Tag
-        seo_results["indexing_directives"] = check_indexing_directives(final_url, get_headers, html_content)
+def _check_page_content(final_url, html_content, get_headers, pairs_list, seo_results, page_results=None):
+    """Перевірки вмісту сторінки після robots.txt. Повертає список результатів - по одному на кожні пари рядка.
 
-        # c. Перевірка Canonical
-        seo_results["canonical_url"] = check_canonical_tag(final_url, html_content)
+    Директиви індексації та canonical визначаються один раз, посилання витягуються один раз і звіряються
+    з парами Урл/Анкор кожного рядка. page_results - збережені результати рядків для незміненої сторінки.
+    """
+    if page_results is not None:
+        return [dict(seo_results, **{key: value for key, value in cached.items() if key in seo_results}) for cached in page_results]
+
+    # b. Перевірка Meta Robots / X-Robots-Tag
+    seo_results["indexing_directives"] = check_indexing_directives(final_url, get_headers, html_content)
 
-        # d. Перевірка посилань та анкорів
-        link_check_results = check_links_on_page(html_content, final_url, anchor1, url1, anchor2, url2, anchor3, url3)
-        # Оновлюємо seo_results полями з link_check_results
-        seo_results.update(link_check_results)
+    # c. Перевірка Canonical
+    seo_results["canonical_url"] = check_canonical_tag(final_url, html_content)
+
+    # d. Перевірка посилань та анкорів: HTML розбирається один раз для всіх рядків з цим донором
+    try:
+        links = extract_links(html_content, final_url)
+    except Exception:
+        links = None # check_links_on_page повторить розбір і запише помилку парсингу в результат рядка
+    row_results = []
+    for pairs in pairs_list:
+        link_check_results = check_links_on_page(html_content, final_url, *pairs, links=links)
+        # Оновлюємо результати рядка полями з link_check_results
+        row_seo_results = dict(seo_results)
+        row_seo_results.update(link_check_results)
         if "error" in link_check_results and link_check_results["error"]:
-             seo_results["link_check_error"] = link_check_results["error"]
+             row_seo_results["link_check_error"] = link_check_results["error"]
              # Усуваємо поле 'error' з link_check_results, щоб воно не перезаписало інші помилки
-             del seo_results["error"]
+             del row_seo_results["error"]
+        row_results.append(row_seo_results)
+    return row_results
+
+def _perform_seo_and_link_checks(final_url, html_content, get_headers, pairs_list, verify_ssl=True, page_results=None):
+    """Виконує перевірки robots.txt, директив індексації, canonical та посилань на сторінці.
+
+    pairs_list - пари (Анкор-1, Урл-1, ..., Урл-3) кожного рядка з цим донором; повертає список
+    результатів у тому ж порядку. page_results - збережені результати для незміненої сторінки:
+    директиви, canonical та посилання беруться з них без парсингу HTML.
+    """
+    print(f"   ├── Виконуємо SEO та перевірку посилань для: {final_url} (SSL Verify: {verify_ssl})")
+    seo_results = _new_seo_results()
+    try:
+        # а. Перевірка robots.txt
+        seo_results["robots_star_allowed"] = check_robots_txt(final_url, '*', verify_ssl=verify_ssl)
+        seo_results["robots_googlebot_allowed"] = check_robots_txt(final_url, 'Googlebot', verify_ssl=verify_ssl)
+
+        return _check_page_content(final_url, html_content, get_headers, pairs_list, seo_results, page_results)
 
     except Exception as seo_e:
         error_msg = f"Помилка під час SEO/Link перевірок: {seo_e}"
         print(f"   │   └── ⚠️ {error_msg}")
         seo_results["seo_check_error"] = error_msg # Записуємо як помилку SEO/Link
 
-    return seo_results
+    return [dict(seo_results) for _ in pairs_list]
 # --- КІНЕЦЬ НОВОЇ ДОПОМІЖНОЇ ФУНКЦІЇ ---
 
 
@@ -84,190 +133,615 @@ def _process_response(response, url, ssl_disabled=False):
 
     return redirect_chain, final_url, final_status_code, status_code
 
-def check_status_code_requests(rows_data, valueserp_api_key=None):
-    """Перевіряє статус-коди URL, редиректи та виконує SEO та перевірки посилань."""
-    print("\n\n🔍 ПЕРЕВІРКА СТАТУС-КОДІВ URL, SEO-ПАРАМЕТРІВ ТА ПОСИЛАНЬ...\n")
+def _new_row_result(row_info):
+    """Створює словник результатів рядка з початковими значеннями та вхідними даними рядка."""
+    url = row_info.get("Url")
+    # Ініціалізація результатів для поточного URL
+    current_result = {
+        "url": url, "status_code": 0, "redirect_chain": [],
+        "final_url": url, "final_status_code": 0, "error": None,
+        "ssl_disabled": False, "robots_star_allowed": None,
+        "robots_googlebot_allowed": None, "indexing_directives": None,
+        "canonical_url": None, "seo_check_error": None,
+        # Поля для результатів перевірки посилань
+        "url1_found": "Н/Д", "anchor1_match": "Н/Д", "url1_rel": None,
+        "url2_found": "Н/Д", "anchor2_match": "Н/Д", "url2_rel": None,
+        "url3_found": "Н/Д", "anchor3_match": "Н/Д", "url3_rel": None,
+        "link_check_error": None,
+        # Поле для результату перевірки індексації в Google
+        "google_indexing": None,
+        # Чи було тіло сторінки обрізано лімітом байтів (None - тіло не завантажувалось)
+        "page_truncated": None,
+        # Протокол відповіді на перший запит ("HTTP/2", "HTTP/1.1"; None - відповіді не було)
+        "http_version": None
+    }
 
-    results = []
-    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.6167.184 Safari/537.36'}
+    # Зберігаємо початкові дані для оновлення таблиці
+    current_result.update(row_info)
+    return current_result
 
-    for i, row_info in enumerate(rows_data, 1):
-        url = row_info.get("Url")
-        anchor1 = row_info.get("Анкор-1")
-        url1 = row_info.get("Урл-1")
-        anchor2 = row_info.get("Анкор-2")
-        url2 = row_info.get("Урл-2")
-        anchor3 = row_info.get("Анкор-3")
-        url3 = row_info.get("Урл-3")
-
-        # Ініціалізація результатів для поточного URL
-        current_result = {
-            "url": url, "status_code": 0, "redirect_chain": [],
-            "final_url": url, "final_status_code": 0, "error": None,
-            "ssl_disabled": False, "robots_star_allowed": None,
-            "robots_googlebot_allowed": None, "indexing_directives": None,
-            "canonical_url": None, "seo_check_error": None,
-            # Поля для результатів перевірки посилань
-            "url1_found": "Н/Д", "anchor1_match": "Н/Д", "url1_rel": None,
-            "url2_found": "Н/Д", "anchor2_match": "Н/Д", "url2_rel": None,
-            "url3_found": "Н/Д", "anchor3_match": "Н/Д", "url3_rel": None,
-            "link_check_error": None,
-            # Поле для результату перевірки індексації в Google
-            "google_indexing": None
-        }
-
-        # Зберігаємо початкові дані для оновлення таблиці
-        current_result.update(row_info)
+# Вхідні стовпці рядка з парами Анкор/Урл у порядку аргументів check_links_on_page
+ROW_PAIR_FIELDS = ("Анкор-1", "Урл-1", "Анкор-2", "Урл-2", "Анкор-3", "Урл-3")
 
+def _row_pairs(row_info):
+    """Пари Анкор/Урл рядка: (Анкор-1, Урл-1, Анкор-2, Урл-2, Анкор-3, Урл-3)."""
+    return tuple(row_info.get(key) for key in ROW_PAIR_FIELDS)
+
+def _group_rows_by_donor(rows_data):
+    """Групує рядки з однаковим нормалізованим Url донора, щоб сторінка перевірялась один раз.
+
+    Повертає список груп у порядку першої появи донора; група - список пар (позиція в rows_data, row_info).
+    Рядки з порожнім Url не групуються.
+    """
+    groups = {}
+    for position, row_info in enumerate(rows_data):
+        url = row_info.get("Url")
         if not url or pd.isna(url):
-            print(f"{i}. URL порожній, пропускаємо")
-            current_result["error"] = "URL порожній"
-            results.append(current_result)
-            continue
+            key = ("empty", position)
+        else:
+            key = normalize_url(url)
+        groups.setdefault(key, []).append((position, row_info))
+    return list(groups.values())
 
-        print(f"{i}. Перевіряємо: {url}")
-        ssl_verify = True # Починаємо з увімкненим SSL
+def _fan_out_results(rows_group, page_result, row_checks):
+    """Розносить результат перевірки сторінки по рядках групи.
+
+    Спільні поля сторінки (статус, редиректи, robots, індексація...) копіюються в кожен рядок,
+    результати перевірки посилань - свої для кожного рядка (row_checks у порядку rows_group).
+    """
+    page_fields = {key: value for key, value in page_result.items() if key != "url" and key not in rows_group[0]}
+    results = []
+    for row_info, checks in zip(rows_group, row_checks):
+        result = _new_row_result(row_info)
+        result.update(page_fields)
+        result.update(checks)
+        results.append(result)
+    return results
+
+def _is_html_response(headers):
+    """Чи містить відповідь HTML (за Content-Type; відсутній заголовок вважаємо HTML)."""
+    content_type = headers.get('Content-Type', '') or ''
+    return not content_type or 'html' in content_type.lower()
+
+def _decode_html(html_content_bytes):
+    """Декодує байти сторінки з автоматичним визначенням кодування."""
+    encoding = detect_encoding(html_content_bytes)
+    return html_content_bytes.decode(encoding, errors='replace')
+
+def _charset_from_headers(headers):
+    """Кодування з Content-Type (charset=...), або utf-8, якщо не вказано."""
+    match = re.search(r'charset=["\']?([\w.:-]+)', headers.get('Content-Type', '') or '', re.IGNORECASE)
+    return match.group(1) if match else 'utf-8'
+
+def _completion_tracker(final_url, pairs_list, headers):
+    """Трекер ранньої зупинки завантаження, що чекає на пари Урл/Анкор усіх рядків з цим донором."""
+    tracker = PageCompletionTracker(final_url, *pairs_list[0], encoding=_charset_from_headers(headers))
+    for pairs in pairs_list[1:]:
+        tracker.add_pairs(*pairs)
+    return tracker
+
+def _read_page(response, final_url, pairs_list, max_body_bytes=None):
+    """Потоково читає тіло відповіді, лише якщо це HTML. Повертає (html_content, headers, truncated).
+
+    Читання припиняється після max_body_bytes байт (truncated=True) або раніше - щойно закінчився <head>
+    і знайдено точні співпадіння для всіх заданих пар Урл/Анкор усіх рядків (решта сторінки результатів не змінить).
+    """
+    if not _is_html_response(response.headers):
+        print(f"   ├── ℹ️ Content-Type '{response.headers.get('Content-Type')}' не HTML, тіло сторінки не завантажуємо")
+        return "", response.headers, False
+
+    tracker = _completion_tracker(final_url, pairs_list, response.headers)
+    html_content_bytes, truncated, stopped_early = read_body(response, max_bytes=max_body_bytes, stop_when=tracker.feed_bytes)
+    truncated = truncated or is_partial_content_truncated(response.status_code, response.headers, len(html_content_bytes))
+
+    if stopped_early:
+        print(f"   ├── ⏹️ Завантаження зупинено після {len(html_content_bytes)} байт: head та всі пари Урл/Анкор уже знайдено")
+    if truncated:
+        print(f"   ├── ⚠️ Сторінку обрізано: прочитано {len(html_content_bytes)} байт (ліміт {max_body_bytes})")
+    return _decode_html(html_content_bytes), response.headers, truncated
+
+def _reuse_page_results(page_cache, page_record, html_content, get_headers):
+    """Перевіряє, чи змінилась сторінка з попереднього запуску. Повертає (cached_results, body_hash).
+
+    html_content None означає відповідь 304 на умовний GET. cached_results - збережені результати
+    перевірок, якщо сторінка не змінилась (304 або той самий хеш вмісту), інакше None.
+    """
+    if page_cache is None:
+        return None, None
+    if html_content is None:
+        print(f"   ├── ♻️ Сторінка не змінилась (304), використовуємо попередні результати перевірок")
+        page_cache.count("not_modified")
+        return page_record["results"], page_record["body_hash"]
+    body_hash = content_hash(html_content, get_headers)
+    if page_record is not None and page_record["body_hash"] == body_hash:
+        print(f"   ├── ♻️ Вміст сторінки не змінився, використовуємо попередні результати перевірок")
+        page_cache.count("same_content")
+        return page_record["results"], body_hash
+    page_cache.count("parsed")
+    return None, body_hash
+
+def _remember_page_results(page_cache, final_url, inputs_key, get_headers, body_hash, row_results):
+    """Зберігає результати перевірок сторінки для всіх рядків, якщо вони отримані без помилок."""
+    if page_cache is None or any(result.get("seo_check_error") or result.get("link_check_error") for result in row_results):
+        return
+    page_cache.save(final_url, inputs_key, get_headers, body_hash, row_results)
+
+def _start_in_background(fn, *args):
+    """Запускає fn(*args) у пулі активного запуску (RunContext.row_io_executor) для незалежних запитів рядка
+    (robots.txt, ValueSerp), що йдуть паралельно із завантаженням сторінки.
+
+    Задача отримує контекст рядка (запуск, ліміт часу, буфер виводу); без пулу повертає None.
+    """
+    executor = run_component("row_io_executor")
+    if executor is None:
+        return None
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+def _download_page(session, final_url, ssl_verify, head_response, page_record, pairs_list, max_body_bytes=None):
+    """GET фінального URL після HEAD. Повертає (html_content, headers, truncated); html_content None - відповідь 304.
+
+    Одночасні завантаження тієї самої сторінки з тими самими парами Урл/Анкор (різні донори з редиректом
+    на один URL) об'єднуються в один запит.
+    """
+    def download():
+        # Якщо сервер підтримує Range, просимо лише перші max_body_bytes байт, щоб з'єднання не доводилося обривати
+        request_headers = PageCache.conditional_headers(page_record)
+        if max_body_bytes and accepts_byte_ranges(head_response.headers):
+            request_headers['Range'] = f'bytes=0-{max_body_bytes - 1}'
+        with send_with_retries(lambda: session.get(final_url, timeout=request_timeout("get", final_url), verify=ssl_verify, stream=True, headers=request_headers or None), "GET", final_url) as response_get:
+            response_get.raise_for_status()
+            if response_get.status_code == 304 and page_record is not None:
+                return None, response_get.headers, page_record["results"][0].get("page_truncated")
+            return _read_page(response_get, final_url, pairs_list, max_body_bytes)
+
+    return coalesced(("page", final_url, ssl_verify, page_inputs_key(pairs_list), max_body_bytes), download)
+
+def _check_indexing(final_url, valueserp_api_key):
+    """check_google_indexing, у якому одночасні запити для того самого URL витрачають один запит до ValueSerp."""
+    return coalesced(("indexing", final_url), lambda: check_google_indexing(final_url, valueserp_api_key))
+
+def _open_with_redirects(session, send, url, label):
+    """Перший запит рядка з покроковим слідуванням редиректам; send(hop_url) надсилає запит без редиректів.
+
+    Сталі переходи, відомі з кешу редиректів, пропускаються без запиту; кожен крок окремо проходить
+    повтори, чергу хоста та запобіжник. Фінальна відповідь отримує history з усіма кроками ланцюжка.
+    Location читається як у requests (session.get_redirect_target): UTF-8 у заголовку не стає кракозябрами.
+    """
+    walk = RedirectWalk(url)
+    while True:
+        hop_url = walk.next_url()
+        response = send_with_retries(lambda: send(hop_url), label, hop_url)
+        location = session.get_redirect_target(response) if response.status_code in REDIRECT_STATUS_CODES else None
+        if location is None:
+            walk.finish()
+            if walk.hops:
+                response.history = walk.hops
+            return response
+        response.close() # Тіло редиректу не потрібне - з'єднання повертається в пул
+        walk.follow(response.url, response.status_code, location)
+
+def _fetch_and_check(page_result, url, pairs_list, valueserp_api_key, ssl_verify=True, ssl_error_text=None, fetch_mode="head_get", max_body_bytes=None):
+    """Запитує URL із заданим режимом SSL і для фінального статусу 200 виконує SEO, перевірку посилань та індексації.
+
+    Спільні для сторінки поля записуються в page_result; повертає список результатів SEO та перевірки посилань
+    для кожних пар з pairs_list (None, якщо сторінка не перевірялась).
+
+    fetch_mode="head_get" - HEAD з редиректами, потім потоковий GET фінального URL (з Range, якщо сервер
+    оголосив Accept-Ranges і задано max_body_bytes);
+    fetch_mode="get" - один потоковий GET: редиректи, статус і тіло (тільки для HTML) з однієї відповіді.
+    Якщо активний кеш сторінок, у режимі head_get GET надсилається умовним (If-None-Match/If-Modified-Since),
+    а для незміненої сторінки результати перевірок беруться з кешу.
+    Тимчасові збої (з'єднання, таймаути, 429/502/503/504) повторюються за активною політикою повторів.
+    Винятки першого запиту не перехоплюються - SSL-fallback для них виконує _check_rows.
+    """
+    session = get_session() # Спільна сесія: з'єднання з тим самим хостом перевикористовуються
+    ssl_disabled = not ssl_verify
+    indexing_future = None
+    ssl_suffix = '(SSL вимкнено)' if ssl_disabled else ''
+
+    if fetch_mode == "get":
+        response = _open_with_redirects(
+            session, lambda hop_url: session.get(hop_url, allow_redirects=False, timeout=request_timeout("get", hop_url), verify=ssl_verify, stream=True),
+            url, "GET")
+    else:
+        response = _open_with_redirects(
+            session, lambda hop_url: session.head(hop_url, allow_redirects=False, timeout=request_timeout("head", hop_url), verify=ssl_verify),
+            url, "HEAD")
+
+    try:
+        redirect_chain, final_url, final_status_code, status_code = _process_response(response, url, ssl_disabled=ssl_disabled)
+        page_result.update({
+            "status_code": status_code, "redirect_chain": redirect_chain,
+            "final_url": final_url, "final_status_code": final_status_code,
+            # Після SSL-fallback зберігаємо початкову помилку SSL
+            "error": "SSL вимкнено: " + ssl_error_text if ssl_disabled else None,
+            "ssl_disabled": ssl_disabled,
+            "http_version": response_protocol(response)
+        })
+
+        # Якщо фінальний статус 200, виконуємо SEO та перевірку посилань
+        if final_status_code != 200:
+            return None
+
+        # robots.txt і ValueSerp не залежать від сторінки - стартують паралельно з її завантаженням,
+        # тож час рядка наближається до найдовшого з трьох запитів, а не до їх суми
+        _start_in_background(prefetch_robots_txt, final_url, ssl_verify)
+        if valueserp_api_key:
+            indexing_future = _start_in_background(_check_indexing, final_url, valueserp_api_key)
+
+        page_cache = get_page_cache()
+        inputs_key = page_inputs_key(pairs_list)
+        page_record = page_cache.lookup(final_url, inputs_key) if page_cache is not None else None
 
         try:
-            # 1. Перша спроба запиту (з SSL або без, залежно від попередніх помилок)
-            response = requests.head(url, allow_redirects=True, timeout=10, headers=headers, verify=ssl_verify)
-            redirect_chain, final_url, final_status_code, status_code = _process_response(response, url)
-            current_result.update({
-                "status_code": status_code, "redirect_chain": redirect_chain,
-                "final_url": final_url, "final_status_code": final_status_code,
-                "error": None, "ssl_disabled": not ssl_verify
-            })
-
-            # 2. Якщо фінальний статус 200, виконуємо SEO та перевірку посилань
-            if final_status_code == 200:
+            if fetch_mode == "get":
+                # Тіло вже є в цій самій відповіді - другий запит не потрібен
+                html_content, get_headers, truncated = _read_page(response, final_url, pairs_list, max_body_bytes)
+            else:
+                # Робимо потоковий GET запит для отримання контенту
+                html_content, get_headers, truncated = _download_page(session, final_url, ssl_verify, response, page_record,
+                                                                      pairs_list, max_body_bytes)
+            page_result["page_truncated"] = truncated
+            cached_results, body_hash = _reuse_page_results(page_cache, page_record, html_content, get_headers)
+
+            # Викликаємо функцію для SEO та перевірки посилань - один раз для всіх рядків з цим донором
+            row_checks = _perform_seo_and_link_checks(
+                final_url, html_content, get_headers, pairs_list, verify_ssl=ssl_verify, page_results=cached_results
+            )
+            if html_content is not None:
+                _remember_page_results(page_cache, final_url, inputs_key, get_headers, body_hash,
+                                       [dict(page_result, **checks) for checks in row_checks])
+
+            # Перевірка індексації в Google
+            if valueserp_api_key:
+                # Використовуємо фінальний URL для перевірки індексації
+                print(f"   ├── Перевіряємо індексацію в Google для: {final_url}{' ' + ssl_suffix if ssl_suffix else ''}")
                 try:
-                    # Робимо GET запит для отримання контенту
-                    with requests.get(final_url, timeout=15, headers=headers, verify=ssl_verify) as response_get:
-                        response_get.raise_for_status()
-                        html_content_bytes = response_get.content
-                        encoding = detect_encoding(html_content_bytes)
-                        html_content = html_content_bytes.decode(encoding, errors='replace')
-                        get_headers = response_get.headers
-
-                        # Викликаємо нову функцію для SEO та перевірки посилань
-                        seo_link_results = _perform_seo_and_link_checks(
-                            final_url, html_content, get_headers,
-                            anchor1, url1, anchor2, url2, anchor3, url3, verify_ssl=ssl_verify
-                        )
-                        current_result.update(seo_link_results)
-
-                        # 3. Перевірка індексації в Google
-                        if valueserp_api_key:
-                            # Використовуємо фінальний URL для перевірки індексації
-                            print(f"   ├── Перевіряємо індексацію в Google для: {final_url}")
-                            try:
-                                is_indexed, search_query = check_google_indexing(final_url, valueserp_api_key)
-                                current_result["google_indexing"] = "Так" if is_indexed else "Ні"
-                                print(f"   │   ├── Пошуковий запит: {search_query}")
-                                print(f"   │   └── {'✅ URL проіндексований' if is_indexed else '❌ URL не проіндексований'}")
-                            except Exception as index_e:
-                                error_msg = f"Помилка при перевірці індексації: {str(index_e)}"
-                                print(f"   │   └── ⚠️ {error_msg}")
-                                current_result["google_indexing"] = "Помилка"
-                        else:
-                            print(f"   │   └── ℹ️ Пропускаємо перевірку індексації (API ключ не вказано)")
-
-                except requests.exceptions.RequestException as get_e:
-                    error_msg = f"Помилка GET-запиту {'(SSL вимкнено)' if not ssl_verify else ''}: {get_e}"
-                    print(f"   └── ⚠️ {error_msg}")
-                    # Записуємо помилку і в seo_check_error і в link_check_error, оскільки GET провалився для обох
-                    current_result["seo_check_error"] = error_msg
-                    current_result["link_check_error"] = error_msg
-                except Exception as general_e: # Загальна помилка під час обробки GET відповіді
-                    error_msg = f"Загальна помилка обробки контенту {'(SSL вимкнено)' if not ssl_verify else ''}: {general_e}"
-                    print(f"   └── ⚠️ {error_msg}")
-                    current_result["seo_check_error"] = error_msg
-                    current_result["link_check_error"] = error_msg
-
-        except requests.exceptions.RequestException as e:
-            error_text = str(e)
-            current_result["status_code"] = 0 # Встановлюємо тут, бо запит HEAD не вдався
+                    if indexing_future is not None:
+                        is_indexed, search_query = indexing_future.result()
+                    else:
+                        check_deadline() # Без часу на запит результат "не проіндексовано" був би хибним
+                        is_indexed, search_query = _check_indexing(final_url, valueserp_api_key)
+                    page_result["google_indexing"] = "Так" if is_indexed else "Ні"
+                    print(f"   │   ├── Пошуковий запит: {search_query}")
+                    print(f"   │   └── {'✅ URL проіндексований' if is_indexed else '❌ URL не проіндексований'}")
+                except Exception as index_e:
+                    error_msg = f"Помилка при перевірці індексації: {str(index_e)}"
+                    print(f"   │   └── ⚠️ {error_msg}")
+                    page_result["google_indexing"] = "Помилка"
+            else:
+                print(f"   │   └── ℹ️ Пропускаємо перевірку індексації (API ключ не вказано)")
+            return row_checks
+
+        except requests.exceptions.RequestException as get_e:
+            error_msg = f"Помилка GET-запиту {ssl_suffix}: {get_e}"
+            print(f"   └── ⚠️ {error_msg}")
+            # Записуємо помилку і в seo_check_error і в link_check_error, оскільки GET провалився для обох
+            page_result["seo_check_error"] = error_msg
+            page_result["link_check_error"] = error_msg
+        except Exception as general_e: # Загальна помилка під час обробки GET відповіді
+            error_msg = f"Загальна помилка обробки контенту {ssl_suffix}: {general_e}"
+            print(f"   └── ⚠️ {error_msg}")
+            page_result["seo_check_error"] = error_msg
+            page_result["link_check_error"] = error_msg
+    finally:
+        if fetch_mode == "get":
+            response.close() # Повертаємо з'єднання потокового GET у пул
+        if indexing_future is not None:
+            indexing_future.cancel() # Сторінку не перевірено - запит до ValueSerp, якщо ще не почався, не потрібен
+
+def _dns_failed(current_result, url):
+    """Позначає рядок помилкою, якщо хост не вдалося визначити на попередньому DNS-етапі; повертає True у такому разі."""
+    dns_cache = get_dns_cache()
+    dns_error = dns_cache.failure(url) if dns_cache is not None else None
+    if dns_error is None:
+        return False
+    current_result["status_code"] = 0
+    current_result["final_status_code"] = 0
+    current_result["error"] = f"Хост не знайдено (DNS): {dns_error}"
+    print(f"   ❌ {current_result['error']}")
+    return True
+
+def _host_unavailable(current_result, url):
+    """Позначає рядок помилкою, якщо запобіжник вважає хост недоступним; повертає True у такому разі."""
+    breaker = get_host_breaker()
+    rejection = breaker.rejection(url) if breaker is not None else None
+    if rejection is None:
+        return False
+    current_result["status_code"] = 0
+    current_result["final_status_code"] = 0
+    current_result["error"] = rejection
+    print(f"   ⛔ {rejection}")
+    return True
+
+def _fetch_without_ssl_verification(current_result, url, pairs_list, valueserp_api_key, ssl_error_text, fetch_mode="head_get", max_body_bytes=None):
+    """SSL-fallback: запит з вимкненою перевіркою SSL. ssl_error_text - помилка перевіреного запиту до цього хоста."""
+    current_result["ssl_disabled"] = True # Відмічаємо, що SSL вимкнено
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            return _fetch_and_check(current_result, url, pairs_list, valueserp_api_key, ssl_verify=False, ssl_error_text=ssl_error_text, fetch_mode=fetch_mode, max_body_bytes=max_body_bytes)
+        except requests.exceptions.RequestException as e2:
+            # Помилка навіть з вимкненим SSL
+            request_label = "GET" if fetch_mode == "get" else "HEAD"
+            final_error = f"Помилка {request_label} і з вимкненим SSL: {str(e2)}"
+            current_result["error"] = final_error # Перезаписуємо помилку
+            current_result["status_code"] = 0 # Статус невідомий
             current_result["final_status_code"] = 0
+            print(f"   ❌ {final_error}")
+            return None
+
+def _check_row(i, row_info, valueserp_api_key=None, fetch_mode="head_get", max_body_bytes=None):
+    """Перевіряє один рядок таблиці: статус-код, редиректи, SEO, посилання та індексацію."""
+    return _check_rows(i, [row_info], valueserp_api_key, fetch_mode, max_body_bytes)[0]
 
-            # Перевірка на SSL помилку ТІЛЬКИ при першій спробі (коли ssl_verify=True)
-            if ssl_verify and is_ssl_error(error_text):
-                print(f"   ⚠️ Виявлено помилку SSL: {error_text}")
-                print(f"   🔄 Повторюємо запит з вимкненою перевіркою SSL...")
-                ssl_verify = False # Вимикаємо SSL для наступної спроби
-                current_result["ssl_disabled"] = True # Відмічаємо, що SSL вимкнено
-
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore")
-                    try:
-                        # Повторюємо HEAD запит без SSL
-                        response_nossl = requests.head(url, allow_redirects=True, timeout=10, headers=headers, verify=ssl_verify)
-                        redirect_chain, final_url, final_status_code, status_code = _process_response(response_nossl, url, ssl_disabled=True)
-                        current_result.update({
-                            "status_code": status_code, "redirect_chain": redirect_chain,
-                            "final_url": final_url, "final_status_code": final_status_code,
-                            "error": "SSL вимкнено: " + error_text # Зберігаємо початкову помилку SSL
-                        })
-
-                        # Якщо фінальний статус 200 після SSL retry, виконуємо SEO та перевірку посилань
-                        if final_status_code == 200:
-                            try:
-                                # Робимо GET запит без SSL
-                                with requests.get(final_url, timeout=15, headers=headers, verify=ssl_verify) as response_get_nossl:
-                                    response_get_nossl.raise_for_status()
-                                    html_content_bytes = response_get_nossl.content
-                                    encoding = detect_encoding(html_content_bytes)
-                                    html_content = html_content_bytes.decode(encoding, errors='replace')
-                                    get_headers = response_get_nossl.headers
-
-                                    # Викликаємо нову функцію для SEO та перевірки посилань
-                                    seo_link_results = _perform_seo_and_link_checks(
-                                        final_url, html_content, get_headers,
-                                        anchor1, url1, anchor2, url2, anchor3, url3, verify_ssl=ssl_verify
-                                    )
-                                    current_result.update(seo_link_results)
-
-                                    # Перевірка індексації в Google
-                                    if valueserp_api_key:
-                                        print(f"   ├── Перевіряємо індексацію в Google для: {final_url} (SSL вимкнено)")
-                                        try:
-                                            is_indexed, search_query = check_google_indexing(final_url, valueserp_api_key)
-                                            current_result["google_indexing"] = "Так" if is_indexed else "Ні"
-                                            print(f"   │   ├── Пошуковий запит: {search_query}")
-                                            print(f"   │   └── {'✅ URL проіндексований' if is_indexed else '❌ URL не проіндексований'}")
-                                        except Exception as index_e:
-                                            error_msg = f"Помилка при перевірці індексації: {str(index_e)}"
-                                            print(f"   │   └── ⚠️ {error_msg}")
-                                            current_result["google_indexing"] = "Помилка"
-                                    else:
-                                        print(f"   │   └── ℹ️ Пропускаємо перевірку індексації (API ключ не вказано)")
-
-                            except requests.exceptions.RequestException as get_e:
-                                error_msg = f"Помилка GET-запиту (SSL вимкнено): {get_e}"
-                                print(f"   └── ⚠️ {error_msg}")
-                                current_result["seo_check_error"] = error_msg
-                                current_result["link_check_error"] = error_msg
-                            except Exception as general_e:
-                                error_msg = f"Загальна помилка обробки контенту (SSL вимкнено): {general_e}"
-                                print(f"   └── ⚠️ {error_msg}")
-                                current_result["seo_check_error"] = error_msg
-                                current_result["link_check_error"] = error_msg
-
-                    except requests.exceptions.RequestException as e2:
-                        # Помилка навіть з вимкненим SSL
-                        final_error = f"Помилка HEAD і з вимкненим SSL: {str(e2)}"
-                        current_result["error"] = final_error # Перезаписуємо помилку
-                        current_result["status_code"] = 0 # Статус невідомий
-                        current_result["final_status_code"] = 0
-                        print(f"   ❌ {final_error}")
-
-            else: # Якщо помилка не SSL, або це вже друга спроба (з вимкненим SSL)
-                current_result["error"] = error_text # Зберігаємо поточну помилку
-                print(f"   ❌ Помилка HEAD: {current_result['error']}")
-                # status_code та final_status_code вже встановлені на 0 на початку блоку except
-
-        results.append(current_result)
+def _check_rows(i, rows_group, valueserp_api_key=None, fetch_mode="head_get", max_body_bytes=None):
+    """Перевіряє рядки з одним донором: сторінка запитується, розбирається й перевіряється один раз,
+    а пари Урл/Анкор кожного рядка звіряються з одним списком посилань. Повертає результати в порядку rows_group.
+    """
+    url = rows_group[0].get("Url")
+    pairs_list = [_row_pairs(row_info) for row_info in rows_group]
+
+    # Спільні поля сторінки; результати посилань кожного рядка - в row_checks
+    current_result = _new_row_result(rows_group[0])
+    row_checks = None
+
+    if not url or pd.isna(url):
+        print(f"{i}. URL порожній, пропускаємо")
+        current_result["error"] = "URL порожній"
+        return _fan_out_results(rows_group, current_result, [{}] * len(rows_group))
+
+    print(f"{i}. Перевіряємо: {url}")
+    if len(rows_group) > 1:
+        print(f"   ℹ️ Донор у {len(rows_group)} рядках: сторінка перевіряється один раз для пар Урл/Анкор усіх рядків")
+    request_label = "GET" if fetch_mode == "get" else "HEAD"
+    if _dns_failed(current_result, url) or _host_unavailable(current_result, url):
+        print("---")
+        return _fan_out_results(rows_group, current_result, [{}] * len(rows_group))
+    ssl_registry = get_ssl_registry()
+    known_ssl_error = ssl_registry.known_error(url) if ssl_registry is not None else None
+
+    if known_ssl_error is not None:
+        # Хост уже дав помилку SSL у цьому (або збереженому) запуску - перевірена спроба приречена
+        print(f"   🔓 Хост має недійсний SSL ({known_ssl_error}), запит одразу з вимкненою перевіркою SSL...")
+        row_checks = _fetch_without_ssl_verification(current_result, url, pairs_list, valueserp_api_key, known_ssl_error, fetch_mode, max_body_bytes)
         print("---")
+        return _fan_out_results(rows_group, current_result, row_checks or [{}] * len(rows_group))
+
+    try:
+        # 1. Перша спроба запиту з увімкненою перевіркою SSL
+        row_checks = _fetch_and_check(current_result, url, pairs_list, valueserp_api_key, ssl_verify=True, fetch_mode=fetch_mode, max_body_bytes=max_body_bytes)
+
+    except requests.exceptions.RequestException as e:
+        error_text = str(e)
+        current_result["status_code"] = 0 # Встановлюємо тут, бо перший запит не вдався
+        current_result["final_status_code"] = 0
+
+        # Перевірка на SSL помилку - повторюємо запит з вимкненою перевіркою
+        if is_ssl_error(error_text):
+            print(f"   ⚠️ Виявлено помилку SSL: {error_text}")
+            print(f"   🔄 Повторюємо запит з вимкненою перевіркою SSL...")
+            if ssl_registry is not None:
+                ssl_registry.remember(url, error_text)
+            row_checks = _fetch_without_ssl_verification(current_result, url, pairs_list, valueserp_api_key, error_text, fetch_mode, max_body_bytes)
+
+        else: # Якщо помилка не SSL
+            current_result["error"] = error_text # Зберігаємо поточну помилку
+            print(f"   ❌ Помилка {request_label}: {current_result['error']}")
+            # status_code та final_status_code вже встановлені на 0 на початку блоку except
+
+    print("---")
+    return _fan_out_results(rows_group, current_result, row_checks or [{}] * len(rows_group))
+
+
+def _row_deadline_seconds():
+    """Ліміт часу на перевірку донора з активних адаптивних таймаутів (None - без ліміту)."""
+    host_timeouts = get_host_timeouts()
+    return host_timeouts.row_deadline if host_timeouts is not None else None
+
+def _host_slot(url):
+    """Місце для перевірки донора в активному планувальнику хостів (без планувальника - без обмежень)."""
+    scheduler = get_host_scheduler()
+    return scheduler.slot(url) if scheduler is not None and isinstance(url, str) else contextlib.nullcontext()
+
+def _adaptive_slot(url):
+    """Місце для перевірки донора в адаптивному ліміті одночасних перевірок (без контролера - без обмежень)."""
+    controller = get_concurrency_controller()
+    return controller.slot(url) if controller is not None and isinstance(url, str) else contextlib.nullcontext()
+
+def _check_order(groups):
+    """Порядок перевірки груп: з планувальником хостів сусідні групи належать різним хостам."""
+    scheduler = get_host_scheduler()
+    if scheduler is None:
+        return groups
+    return interleave_by_host(groups, lambda group: str(group[0][1].get("Url")), scheduler.window)
+
+def _check_group(i, rows_group, valueserp_api_key=None, fetch_mode="head_get", max_body_bytes=None):
+    """Перевіряє групу рядків з одним донором; окремий рядок - звичайною перевіркою рядка.
+
+    Усі запити групи (HEAD, GET, robots.txt, індексація) вкладаються в спільний ліміт часу; очікування
+    місця в планувальнику хостів і в адаптивному ліміті до ліміту часу не входить.
+    """
+    url = rows_group[0].get("Url")
+    with _host_slot(url), _adaptive_slot(url), row_deadline(_row_deadline_seconds()):
+        try:
+            if len(rows_group) == 1:
+                return [_check_row(i, rows_group[0], valueserp_api_key, fetch_mode, max_body_bytes)]
+            return _check_rows(i, rows_group, valueserp_api_key, fetch_mode, max_body_bytes)
+        except Exception as e:
+            return _unexpected_error_results(i, rows_group, e)
+
+def _unexpected_error_results(i, rows_group, error):
+    """Результати групи, перевірку якої перервав неочікуваний виняток (не помилка запиту), наприклад
+    UnicodeError чи ValueError на некоректному Location: помилка в кожному рядку групи, решта запуску триває.
+    """
+    error_text = f"Неочікувана помилка перевірки: {type(error).__name__}: {error}"
+    print(f"{i}. ❌ {rows_group[0].get('Url')}: {error_text}")
+    print("---")
+    current_result = _new_row_result(rows_group[0])
+    current_result["error"] = error_text
+    return _fan_out_results(rows_group, current_result, [{}] * len(rows_group))
+
+def _check_group_buffered(i, rows_group, valueserp_api_key=None, fetch_mode="head_get", max_body_bytes=None, on_result=None):
+    """Обгортка _check_group для пулу потоків: вивід групи збирається в буфер і друкується цілим блоком."""
+    with buffered_row_output():
+        results = _check_group(i, rows_group, valueserp_api_key, fetch_mode, max_body_bytes)
+    if on_result is not None:
+        for result in results:
+            on_result(result)
+    return results
+
+
+def check_status_code_requests(rows_data, valueserp_api_key=None, max_workers=1, engine="requests", fetch_mode="head_get", max_body_bytes=None,
+                               run_context=None, checkpoint=None, prewarm=False, on_result=None):
+    """Перевіряє статус-коди URL, редиректи та виконує SEO та перевірки посилань.
+
+    engine="requests" - блокуючі запити; при max_workers > 1 рядки обробляються паралельно в пулі потоків.
+    engine="asyncio" - aiohttp на одному циклі подій; max_workers задає кількість одночасних рядків.
+    fetch_mode="head_get" - HEAD, потім GET фінального URL; fetch_mode="get" - один GET на рядок
+    (тіло читається лише для HTML; підходить і для серверів, що відповідають на HEAD 405/403).
+    max_body_bytes - ліміт завантаження тіла сторінки (None - без ліміту); обрізані сторінки
+    позначаються полем page_truncated.
+    run_context - компоненти запуску (run_context.RunContext): сховище robots.txt, кеш сторінок, DNS-кеш,
+    планувальник хостів, адаптивна паралельність, пул проксі тощо. Відсутні реєстр SSL-хостів і кеш
+    редиректів створюються на цей запуск; без решти компонентів перевірка йде без них - зокрема без
+    повторів (retry_policy), ліміту часу рядка й адаптивних таймаутів (host_timeouts) та запобіжника
+    хостів (host_breaker): їх вмикає main(). Переданий об'єкт не змінюється, тож його можна використати
+    і для наступних запусків.
+    checkpoint - контрольна точка (checkpoint.RunCheckpoint): результат кожного рядка записується на диск
+    одразу після перевірки, а рядки, що вже є в контрольній точці, повторно не перевіряються.
+    prewarm - для engine="requests" заздалегідь відкрити по з'єднанню до кожного хоста в пулі сесії.
+    on_result(result) викликається для кожного перевіреного рядка одразу після перевірки (наприклад,
+    етап запису в таблицю); для рядків, відновлених з контрольної точки, не викликається.
+    В усіх випадках результати повертаються в початковому порядку рядків з тими самими полями,
+    а вивід кожного рядка друкується одним блоком.
+    """
+    print("\n\n🔍 ПЕРЕВІРКА СТАТУС-КОДІВ URL, SEO-ПАРАМЕТРІВ ТА ПОСИЛАНЬ...\n")
+
+    if fetch_mode not in ("head_get", "get"):
+        raise ValueError(f"Невідомий режим запитів: {fetch_mode}. Допустимі значення: 'head_get', 'get'")
 
+    run = _new_run(run_context if run_context is not None else RunContext(), engine, max_workers)
+    protocol_stats(reset=True)
+    try:
+        with activate_run(run):
+            if prewarm and engine == "requests":
+                urls = [row_info.get("Url") for row_info in rows_data if row_info.get("Url") and not pd.isna(row_info.get("Url"))]
+                if run.dns_cache is not None:
+                    urls = run.dns_cache.resolved_urls(urls)
+                print(f"🔥 Заздалегідь відкрито з'єднань: {prewarm_connections(urls)}")
+            if checkpoint is None:
+                results = _run_checks(rows_data, valueserp_api_key, max_workers, engine, fetch_mode, max_body_bytes, on_result)
+            else:
+                results = _run_checks_with_checkpoint(rows_data, valueserp_api_key, max_workers, engine, fetch_mode, max_body_bytes, checkpoint, on_result)
+    finally:
+        if run.row_io_executor is not None:
+            run.row_io_executor.shutdown(wait=True)
+
+    _print_check_stats(results, valueserp_api_key, run)
+    return results
+
+def _new_run(run_context, engine, max_workers):
+    """Компоненти цього запуску: переданий run_context, доповнений компонентами за замовчуванням.
+
+    Кеш robots.txt (кожен origin завантажується один раз за запуск), об'єднання однакових одночасних
+    запитів і пул запитів рядка для engine="requests" створюються заново для кожного запуску. Повтори,
+    ліміт часу рядка та запобіжник хостів змінюють результати рядків, тож за замовчуванням не вмикаються.
+    """
+    def or_default(component, default):
+        return component if component is not None else default()
+
+    return run_context.replace(
+        robots_cache=RobotsCache(store=run_context.robots_store),
+        ssl_registry=or_default(run_context.ssl_registry, SslHostRegistry),
+        redirect_cache=or_default(run_context.redirect_cache, RedirectCache),
+        # Однакові одночасні завантаження сторінки та запити до ValueSerp різних груп виконуються один раз
+        # (robots.txt об'єднує кеш robots.txt: один запит на origin, решта чекає на нього)
+        single_flight=SingleFlight(),
+        row_io_executor=ThreadPoolExecutor(max_workers=2 * max(1, max_workers), thread_name_prefix="row-io") if engine == "requests" else None,
+    )
+
+def _run_checks_with_checkpoint(rows_data, valueserp_api_key, max_workers, engine, fetch_mode, max_body_bytes, checkpoint, on_result=None):
+    """Перевіряє лише рядки, яких немає в контрольній точці, і об'єднує нові результати зі збереженими."""
+    completed = checkpoint.completed()
+    pending = [row_info for row_info in rows_data if row_key(row_info) not in completed]
+    if completed:
+        print(f"⏯️ Відновлення з контрольної точки: {len(rows_data) - len(pending)} рядків уже перевірено, залишилось {len(pending)}\n")
+
+    def save_result(result):
+        checkpoint.append(result) # Спершу на диск: результат не загубиться, навіть якщо наступний етап зупиниться
+        if on_result is not None:
+            on_result(result)
+
+    new_results = iter(_run_checks(pending, valueserp_api_key, max_workers, engine, fetch_mode, max_body_bytes, on_result=save_result))
+    # Зберігаємо початковий порядок рядків: збережений результат або наступний новий
+    return [completed[row_key(row_info)] if row_key(row_info) in completed else next(new_results) for row_info in rows_data]
+
+def _run_checks(rows_data, valueserp_api_key, max_workers, engine, fetch_mode, max_body_bytes, on_result=None):
+    """Обробляє всі рядки обраним рушієм і повертає результати в початковому порядку.
+
+    Рядки з однаковим донором перевіряються разом (одна сторінка - один запит і один розбір).
+    on_result(result) викликається для кожного рядка одразу після його перевірки.
+    """
+    if engine == "asyncio":
+        # Імпорт тут, бо async_engine сам імпортує допоміжні функції з цього модуля
+        from async_engine import run_async_checks
+        print(f"⚙️ Рушій asyncio: до {max_workers} одночасних рядків\n")
+        results = run_async_checks(rows_data, valueserp_api_key, concurrency=max_workers, fetch_mode=fetch_mode, max_body_bytes=max_body_bytes,
+                                   on_result=on_result)
+    elif engine != "requests":
+        raise ValueError(f"Невідомий рушій перевірки: {engine}. Допустимі значення: 'requests', 'asyncio'")
+    else:
+        groups = _check_order(_group_rows_by_donor(rows_data))
+        if len(groups) < len(rows_data):
+            print(f"🔗 Унікальних донорів: {len(groups)} на {len(rows_data)} рядків\n")
+        if max_workers and max_workers > 1:
+            print(f"⚙️ Паралельна обробка: {max_workers} потоків\n")
+            with routed_stdout(), ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # Кожна група - з контекстом запуску; результати збираються в порядку груп незалежно від порядку завершення
+                group_results = _run_groups_bounded(groups, IN_FLIGHT_PER_WORKER * max_workers, lambda group: executor.submit(
+                    contextvars.copy_context().run, _check_group_buffered, group[0][0] + 1,
+                    [row_info for _, row_info in group], valueserp_api_key, fetch_mode, max_body_bytes, on_result))
+        else:
+            group_results = []
+            for group in groups:
+                group_results.append(_check_group(group[0][0] + 1, [row_info for _, row_info in group], valueserp_api_key, fetch_mode, max_body_bytes))
+                if on_result is not None:
+                    for result in group_results[-1]:
+                        on_result(result)
+        results = _results_in_row_order(len(rows_data), groups, group_results)
+    return results
+
+def _run_groups_bounded(groups, window, submit_group):
+    """Запускає групи через submit_group(group) -> Future так, щоб одночасно було подано не більше window груп.
+
+    Наступна група подається, лише коли завершилась одна з поданих, тож черга пулу не росте з розміром
+    таблиці. Повертає результати в порядку groups.
+    """
+    group_results = [None] * len(groups)
+    pending = {} # Future -> номер групи
+    for index, group in enumerate(groups):
+        if len(pending) >= window:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                group_results[pending.pop(future)] = future.result()
+        pending[submit_group(group)] = index
+    for future, index in pending.items():
+        group_results[index] = future.result()
+    return group_results
+
+def _results_in_row_order(row_count, groups, group_results):
+    """Розкладає результати груп назад у початковий порядок рядків."""
+    results = [None] * row_count
+    for group, group_result in zip(groups, group_results):
+        for (position, _), result in zip(group, group_result):
+            results[position] = result
+    return results
+
+
+def _print_check_stats(results, valueserp_api_key=None, run=None):
+    """Підраховує та виводить підсумкову статистику перевірок і компонентів запуску run (run_context.RunContext)."""
+    run = run if run is not None else RunContext()
     # Статистика перевірок
     stats = {
         "всього": len(results),
@@ -289,6 +763,53 @@ def check_status_code_requests(rows_data, valueserp_api_key=None):
     print(f"❌ Помилки запиту: {stats['помилки_запиту']}")
     print(f"🔄 Запити з вимкненим SSL: {stats['ssl_вимкнено']}")
     print(f"ℹ️ Інші статус-коди: {stats['інші_коди']}")
+    if run.robots_cache is not None:
+        robots_stats = run.robots_cache.stats()
+        print(f"🤖 Кеш robots.txt: {robots_stats['origins']} origin, влучань {robots_stats['hits']}, промахів {robots_stats['misses']}")
+        if run.robots_cache.store is not None:
+            store_stats = run.robots_cache.store.stats()
+            print(f"💾 Сховище robots.txt: свіжих копій {store_stats['fresh']}, без змін (304) {store_stats['not_modified']}, завантажень {store_stats['downloads']}")
+    if run.page_cache is not None:
+        page_stats = run.page_cache.stats()
+        print(f"♻️ Кеш сторінок: без змін (304) {page_stats['not_modified']}, той самий вміст {page_stats['same_content']}, перевірено заново {page_stats['parsed']}")
+    if run.retry_policy is not None and run.retry_policy.stats()["retries"]:
+        retry_stats = run.retry_policy.stats()
+        print(f"🔁 Повторні спроби: {retry_stats['retries']} з бюджету {retry_stats['budget']}, відмовлено через вичерпаний бюджет {retry_stats['budget_exhausted']}")
+    if run.ssl_registry is not None and run.ssl_registry.stats()["hosts"]:
+        ssl_stats = run.ssl_registry.stats()
+        print(f"🔓 Хости з недійсним SSL: {ssl_stats['hosts']}, запитів одразу без перевірки SSL {ssl_stats['skipped']}")
+    if run.host_timeouts is not None:
+        timeout_stats = run.host_timeouts.stats()
+        print(f"⏱️ Ліміт часу на донора: {run.host_timeouts.row_deadline or '-'} с; скорочених адаптивних таймаутів {timeout_stats['shortened']} (хостів зі статистикою {timeout_stats['hosts']})")
+    if run.host_scheduler is not None:
+        scheduler_stats = run.host_scheduler.stats()
+        print(f"🚦 Ввічливість до хостів: запитів з паузою {scheduler_stats['delayed']} (разом {scheduler_stats['waited']} с), "
+              f"хостів з Crawl-delay {scheduler_stats['crawl_delay_hosts']}")
+    if run.concurrency_controller is not None:
+        concurrency_stats = run.concurrency_controller.stats()
+        print(f"📈 Адаптивна паралельність: ліміт наприкінці {concurrency_stats['limit']} (від {concurrency_stats['lowest']} "
+              f"до {concurrency_stats['highest']}), зменшень {concurrency_stats['decreases']}")
+    if run.host_breaker is not None and run.host_breaker.stats()["opened"]:
+        breaker_stats = run.host_breaker.stats()
+        print(f"⛔ Недоступні хости: {breaker_stats['opened']}, рядків з помилкою без запитів {breaker_stats['rejected']}, "
+              f"пробних запитів {breaker_stats['probes']}")
+    if run.proxy_pool:
+        proxy_stats = run.proxy_pool.stats()
+        print(f"🧦 Проксі: здорових {proxy_stats['healthy']} з {proxy_stats['proxies']}, запитів через проксі {proxy_stats['requests']}, "
+              f"напряму {proxy_stats['direct']}, виведень з ротації {proxy_stats['removals']}")
+    if run.redirect_cache is not None and run.redirect_cache.stats()["hits"]:
+        redirect_stats = run.redirect_cache.stats()
+        print(f"↪️ Кеш редиректів: сталих переходів {redirect_stats['hops']}, правил хостів {redirect_stats['rules']}, "
+              f"кроків без запиту {redirect_stats['hits']} (з них за правилами хостів {redirect_stats['rule_hits']})")
+    shared = run.single_flight.stats() if run.single_flight is not None else {}
+    if shared:
+        print(f"🔀 Об'єднано однакових одночасних запитів: сторінок {shared.get('page', 0)}, ValueSerp {shared.get('indexing', 0)}")
+    protocols = protocol_stats()
+    if protocols:
+        print("📡 Відповіді за протоколом: " + ", ".join(f"{protocol} - {count}" for protocol, count in sorted(protocols.items())))
+    if run.dns_cache is not None:
+        dns_stats = run.dns_cache.stats()
+        print(f"🌐 DNS-кеш: хостів {dns_stats['hosts']}, не знайдено {dns_stats['failed']}, з'єднань з адресою з кешу {dns_stats['hits']}")
     
     # Додаємо статистику індексації
     if valueserp_api_key:
@@ -297,5 +818,3 @@ def check_status_code_requests(rows_data, valueserp_api_key=None):
         print(f"❌ Не проіндексовані URL: {stats['не_проіндексовані']}")
         print(f"⚠️ Помилки перевірки індексації: {stats['помилки_індексації']}")
         print(f"ℹ️ Не перевірялися (немає 200 статусу): {stats['всього'] - stats['проіндексовані'] - stats['не_проіндексовані'] - stats['помилки_індексації']}")
-
-    return results 
\ No newline at end of file
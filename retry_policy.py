@@ -0,0 +1,145 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from timeouts import RowDeadlineExceeded, fits_deadline
+from host_scheduler import wait_for_host
+from adaptive_concurrency import get_concurrency_controller
+from host_breaker import record_host_result
+from run_context import run_component
+
+#
+# 3.2 ПОВТОРНІ СПРОБИ ЗАПИТІВ (тимчасові збої)
+#
+
+# Статус-коди тимчасової недоступності, після яких запит варто повторити
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF_BASE = 0.5 # Секунди перед першим повтором (до джитера)
+DEFAULT_BACKOFF_CAP = 10 # Максимальна пауза між спробами, секунди
+DEFAULT_RETRY_BUDGET = 100 # Максимум повторів за весь запуск
+
+def parse_retry_after(value, now=None):
+    """Секунди очікування із заголовка Retry-After (число секунд або HTTP-дата); None, якщо не вдалося розібрати."""
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+    return max(0.0, retry_at - (now if now is not None else time.time()))
+
+def is_transient_error(error):
+    """Чи є виняток requests тимчасовим збоєм: помилка з'єднання або таймаут (але не помилка SSL)."""
+    if isinstance(error, requests.exceptions.SSLError):
+        return False # Для SSL є окремий fallback з вимкненою перевіркою
+    if isinstance(error, RowDeadlineExceeded):
+        return False # Час рядка вичерпано - повтор однаково не встигне
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+class RetryPolicy:
+    """Політика повторів для ідемпотентних запитів (HEAD/GET) протягом одного запуску.
+
+    Пауза між спробами - експоненційна з обмеженням і повним джитером: випадкова в межах
+    [0, min(backoff_cap, backoff_base * 2^спроба)]. Retry-After з відповіді 429/503 має пріоритет,
+    але теж не довше backoff_cap. Загальний бюджет повторів на запуск не дає повторам затягнути перевірку.
+    """
+
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, backoff_base=DEFAULT_BACKOFF_BASE, backoff_cap=DEFAULT_BACKOFF_CAP,
+                 budget=DEFAULT_RETRY_BUDGET, retry_statuses=RETRY_STATUS_CODES, sleep=time.sleep, rng=random.random):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.budget = budget
+        self.retry_statuses = tuple(retry_statuses)
+        self.sleep = sleep
+        self._rng = rng
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.budget_exhausted = 0
+
+    def should_retry_status(self, status_code):
+        """Чи означає статус-код тимчасову недоступність."""
+        return status_code in self.retry_statuses
+
+    def acquire(self, attempt):
+        """Дозвіл на повтор після спроби номер attempt (з 0): враховує max_retries і бюджет запуску."""
+        if attempt >= self.max_retries:
+            return False
+        with self._lock:
+            if self.retries >= self.budget:
+                self.budget_exhausted += 1
+                return False
+            self.retries += 1
+            return True
+
+    def delay(self, attempt, retry_after=None):
+        """Пауза перед повтором після спроби attempt; retry_after - значення заголовка Retry-After."""
+        server_delay = parse_retry_after(retry_after)
+        if server_delay is not None:
+            return min(server_delay, self.backoff_cap)
+        return self._rng() * min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+
+    def stats(self):
+        """Лічильники за час роботи: виконані повтори та відмови через вичерпаний бюджет."""
+        with self._lock:
+            return {"retries": self.retries, "budget_exhausted": self.budget_exhausted, "budget": self.budget}
+
+def get_retry_policy():
+    """Політика повторів активного запуску або None."""
+    return run_component("retry_policy")
+
+def send_with_retries(send, label, url=None):
+    """Виконує запит send() з повторами тимчасових збоїв за активною політикою.
+
+    Повертає останню відповідь (і тоді, коли після всіх повторів статус залишився 429/5xx);
+    виняток останньої спроби пробрасується далі. Повтор, пауза перед яким не вкладається в ліміт часу
+    рядка, не виконується. url - адреса запиту: кожна спроба чекає на чергу хоста в планувальнику хостів,
+    а підсумок (відповідь чи помилка з'єднання/таймаут) враховує запобіжник хостів.
+    """
+    try:
+        response = _retry_loop(send, label, url)
+    except requests.exceptions.RequestException as e:
+        if is_transient_error(e):
+            record_host_result(url, str(e))
+        raise
+    record_host_result(url)
+    return response
+
+def _retry_loop(send, label, url=None):
+    policy = get_retry_policy()
+    controller = get_concurrency_controller()
+    attempt = 0
+    while True:
+        try:
+            wait_for_host(url)
+            started = time.monotonic()
+            response = send()
+        except requests.exceptions.RequestException as e:
+            if controller is not None and url is not None and is_transient_error(e):
+                controller.observe(url, failed=True)
+            if policy is None or not is_transient_error(e):
+                raise
+            wait = policy.delay(attempt)
+            if not fits_deadline(wait) or not policy.acquire(attempt):
+                raise
+            print(f"   🔁 {label}: {e} - повтор {attempt + 1} через {wait:.1f} с")
+        else:
+            if controller is not None and url is not None:
+                controller.observe(url, time.monotonic() - started, response.status_code)
+            if policy is None or not policy.should_retry_status(response.status_code):
+                return response
+            wait = policy.delay(attempt, response.headers.get('Retry-After'))
+            if not fits_deadline(wait) or not policy.acquire(attempt):
+                return response
+            response.close()
+            print(f"   🔁 {label}: статус {response.status_code} - повтор {attempt + 1} через {wait:.1f} с")
+        policy.sleep(wait)
+        attempt += 1
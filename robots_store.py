@@ -0,0 +1,94 @@
+import sqlite3
+import threading
+import time
+
+#
+# 2.1 ДИСКОВЕ СХОВИЩЕ ROBOTS.TXT (між запусками)
+#
+
+# Скільки секунд збережений robots.txt вважається свіжим і не перевіряється на сервері
+DEFAULT_ROBOTS_TTL = 7 * 24 * 3600
+
+# Зберігаємо лише остаточні відповіді; 5xx та помилки мережі - тимчасові
+STORED_STATUS_CODES = (200, 404)
+
+class RobotsStore:
+    """SQLite-сховище robots.txt: вміст, ETag, Last-Modified та час отримання для кожного robots_url.
+
+    Протягом ttl секунд запис використовується без запитів; після цього robots.txt перевіряється
+    умовним запитом (If-None-Match/If-Modified-Since), і відповідь 304 лише подовжує термін запису.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_ROBOTS_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Одне з'єднання на всі потоки та asyncio-рушій; доступ серіалізується через _lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS robots_txt ("
+                " robots_url TEXT PRIMARY KEY,"
+                " status_code INTEGER NOT NULL,"
+                " body TEXT,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " fetched_at REAL NOT NULL)"
+            )
+        self.fresh_hits = 0
+        self.not_modified = 0
+        self.downloads = 0
+
+    def get(self, robots_url):
+        """Збережений запис для robots_url (словник) або None."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM robots_txt WHERE robots_url = ?", (robots_url,)).fetchone()
+        return dict(row) if row else None
+
+    def is_fresh(self, record, now=None):
+        """Чи можна використати запис без звернення до сервера."""
+        return (now if now is not None else time.time()) - record["fetched_at"] < self.ttl
+
+    @staticmethod
+    def conditional_headers(record):
+        """Заголовки умовного запиту для запису або None, якщо валідаторів немає."""
+        headers = {}
+        if record.get("etag"):
+            headers["If-None-Match"] = record["etag"]
+        if record.get("last_modified"):
+            headers["If-Modified-Since"] = record["last_modified"]
+        return headers or None
+
+    def save(self, robots_url, status_code, body, headers):
+        """Зберігає відповідь на robots.txt разом з валідаторами з її заголовків."""
+        with self._lock, self._conn:
+            self.downloads += 1
+            if status_code not in STORED_STATUS_CODES:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO robots_txt (robots_url, status_code, body, etag, last_modified, fetched_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (robots_url, status_code, body, headers.get("ETag"), headers.get("Last-Modified"), time.time())
+            )
+
+    def touch(self, robots_url):
+        """Відповідь 304: запис не змінився, оновлюємо лише час отримання."""
+        with self._lock, self._conn:
+            self.not_modified += 1
+            self._conn.execute("UPDATE robots_txt SET fetched_at = ? WHERE robots_url = ?", (time.time(), robots_url))
+
+    def mark_fresh_hit(self):
+        """Запис використано без запиту до сервера."""
+        with self._lock:
+            self.fresh_hits += 1
+
+    def stats(self):
+        """Лічильники за час роботи: свіжі записи, відповіді 304 та повні завантаження."""
+        with self._lock:
+            return {"fresh": self.fresh_hits, "not_modified": self.not_modified, "downloads": self.downloads}
+
+    def close(self):
+        """Закриває з'єднання з базою."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,65 @@
+import contextlib
+import contextvars
+
+#
+# 3.13 КОНТЕКСТ ЗАПУСКУ (компоненти одного запуску перевірки)
+#
+
+class RunContext:
+    """Компоненти одного запуску перевірки, які використовують запити рядків.
+
+    Передається в check_status_code_requests одним об'єктом; на час запуску стає активним (activate_run),
+    і модулі отримують свій компонент через get_X() (наприклад, dns_cache.get_dns_cache()). Компонент None -
+    відповідна можливість вимкнена або береться значення за замовчуванням.
+
+    robots_store - дискове сховище robots.txt; page_cache - кеш сторінок; retry_policy - політика повторів;
+    ssl_registry - хости з недійсним SSL; dns_cache - заздалегідь визначені хости; host_timeouts - ліміт часу
+    рядка та адаптивні таймаути; host_scheduler - ліміти на хост; concurrency_controller - адаптивна
+    паралельність; host_breaker - запобіжник недоступних хостів; proxy_pool - пул проксі; redirect_cache -
+    кеш сталих редиректів. robots_cache, single_flight та row_io_executor створює сам запуск.
+    """
+
+    def __init__(self, robots_store=None, page_cache=None, retry_policy=None, ssl_registry=None, dns_cache=None, host_timeouts=None,
+                 host_scheduler=None, concurrency_controller=None, host_breaker=None, proxy_pool=None, redirect_cache=None,
+                 robots_cache=None, single_flight=None, row_io_executor=None):
+        self.robots_store = robots_store
+        self.page_cache = page_cache
+        self.retry_policy = retry_policy
+        self.ssl_registry = ssl_registry
+        self.dns_cache = dns_cache
+        self.host_timeouts = host_timeouts
+        self.host_scheduler = host_scheduler
+        self.concurrency_controller = concurrency_controller
+        self.host_breaker = host_breaker
+        self.proxy_pool = proxy_pool
+        self.redirect_cache = redirect_cache
+        self.robots_cache = robots_cache # Кеш robots.txt на запуск (поверх robots_store)
+        self.single_flight = single_flight # Об'єднання однакових одночасних запитів
+        self.row_io_executor = row_io_executor # Пул для запитів рядка, що йдуть паралельно із завантаженням сторінки
+
+    def replace(self, **components):
+        """Копія контексту, в якій вказані компоненти замінено."""
+        return RunContext(**dict(vars(self), **components))
+
+_current_run = contextvars.ContextVar("current_run", default=None)
+
+@contextlib.contextmanager
+def activate_run(run_context):
+    """Робить run_context активним для поточного потоку чи asyncio-задачі та всього, що запускається з їхнім контекстом.
+
+    Потоки пулів отримують активний контекст, лише якщо задачу запущено через contextvars.copy_context().run.
+    """
+    token = _current_run.set(run_context)
+    try:
+        yield run_context
+    finally:
+        _current_run.reset(token)
+
+def current_run():
+    """Активний RunContext або None (поза запуском перевірки)."""
+    return _current_run.get()
+
+def run_component(name):
+    """Компонент name активного запуску або None, якщо запуску немає чи компонент не заданий."""
+    run_context = _current_run.get()
+    return getattr(run_context, name) if run_context is not None else None
@@ -1,14 +1,169 @@
-import requests
-from urllib.parse import urljoin, unquote
+import asyncio
+import codecs
+import threading
+from html.parser import HTMLParser
+from urllib.parse import urljoin, unquote, urlsplit
 from urllib.robotparser import RobotFileParser
 from bs4 import BeautifulSoup
 
 from utils import normalize_text, normalize_url
+from http_client import get_session, request_timeout, default_headers
+from timeouts import check_deadline
+from host_scheduler import get_host_scheduler, wait_for_host
+from ssl_registry import get_ssl_registry
+from run_context import run_component
 
 #
 # 2. ФУНКЦІЇ SEO-ПЕРЕВІРОК
 #
 
+class RobotsCache:
+    """Кеш robots.txt на один запуск: результат завантаження для кожного origin (схема + хост).
+
+    Запис - словник {"robots_url", "status_code", "parser", "error"}: status_code None означає
+    помилку запиту (текст у "error"), parser - розібрані правила для відповіді 200.
+    store - необов'язкове дискове сховище (robots_store.RobotsStore), до якого звертаються при промаху.
+    """
+
+    def __init__(self, store=None):
+        self.store = store
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._origin_locks = {}
+        self._async_origin_locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def origin_key(url):
+        """Ключ кешу: схема та хост (з портом) у нижньому регістрі."""
+        parts = urlsplit(url)
+        return parts.scheme.lower(), parts.netloc.lower()
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+
+    def get_or_fetch(self, url, fetch):
+        """Повертає запис для origin URL; fetch() викликається лише один раз на origin."""
+        key = self.origin_key(url)
+        with self._lock:
+            origin_lock = self._origin_locks.setdefault(key, threading.Lock())
+        # Паралельні рядки з тим самим origin чекають на перше завантаження, а не роблять власне
+        with origin_lock:
+            entry = self._lookup(key)
+            if entry is None:
+                entry = fetch()
+                self._store(key, entry)
+            return entry
+
+    async def get_or_fetch_async(self, url, fetch):
+        """Асинхронний аналог get_or_fetch; fetch - корутинна функція."""
+        key = self.origin_key(url)
+        origin_lock = self._async_origin_locks.setdefault(key, asyncio.Lock())
+        async with origin_lock:
+            entry = self._lookup(key)
+            if entry is None:
+                entry = await fetch()
+                self._store(key, entry)
+            return entry
+
+    def stats(self):
+        """Лічильники кешу: влучання, промахи та кількість різних origin."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "origins": len(self._entries)}
+
+def get_robots_cache():
+    """Кеш robots.txt активного запуску або None."""
+    return run_component("robots_cache")
+
+def parse_robots_txt(robots_url, robots_text):
+    """Розбирає вміст robots.txt у RobotFileParser."""
+    rp = RobotFileParser()
+    rp.set_url(robots_url)
+    rp.parse(robots_text.splitlines())
+    return rp
+
+def robots_entry(robots_url, status_code=None, robots_text=None, error=None):
+    """Запис кешу robots.txt з результату запиту: статус-код і вміст або текст помилки."""
+    parser = parse_robots_txt(robots_url, robots_text) if status_code == 200 else None
+    scheduler = get_host_scheduler()
+    if parser is not None and scheduler is not None:
+        # Crawl-delay для нашого User-Agent (або для *) сповільнює всі подальші запити до хоста
+        scheduler.set_crawl_delay(robots_url, parser.crawl_delay(default_headers()['User-Agent']))
+    return {"robots_url": robots_url, "status_code": status_code, "parser": parser, "error": error}
+
+def stored_robots_lookup(store, robots_url):
+    """Звернення до дискового сховища перед запитом.
+
+    Повертає (entry, record, headers): entry - готовий запис, якщо збережена копія ще свіжа;
+    інакше record - збережена копія (або None) і headers - заголовки умовного запиту.
+    """
+    record = store.get(robots_url) if store is not None else None
+    if record is None:
+        return None, None, None
+    if store.is_fresh(record):
+        store.mark_fresh_hit()
+        return robots_entry(robots_url, record["status_code"], record["body"]), record, None
+    return None, record, store.conditional_headers(record)
+
+def robots_entry_from_response(store, robots_url, record, status_code, robots_text, headers):
+    """Запис з відповіді сервера; 304 повертає збережену копію, інші відповіді оновлюють сховище."""
+    if status_code == 304 and record is not None:
+        store.touch(robots_url)
+        return robots_entry(robots_url, record["status_code"], record["body"])
+    if store is not None:
+        store.save(robots_url, status_code, robots_text, headers)
+    return robots_entry(robots_url, status_code, robots_text)
+
+def robots_verify_ssl(robots_url, verify_ssl=True):
+    """Режим перевірки SSL для robots.txt: вимкнена, якщо хост уже відомий недійсним сертифікатом."""
+    registry = get_ssl_registry()
+    if verify_ssl and registry is not None and registry.known_error(robots_url) is not None:
+        return False
+    return verify_ssl
+
+def _fetch_robots_entry(robots_url, verify_ssl=True, store=None):
+    """Завантажує robots.txt через спільну сесію; помилка запиту зберігається в записі."""
+    entry, record, conditional_headers = stored_robots_lookup(store, robots_url)
+    if entry is not None:
+        return entry
+    verify_ssl = robots_verify_ssl(robots_url, verify_ssl)
+    try:
+        wait_for_host(robots_url)
+        # Спільна сесія задає стандартний User-Agent і перевикористовує з'єднання з хостом донора
+        with get_session().get(robots_url, timeout=request_timeout("robots", robots_url), verify=verify_ssl, headers=conditional_headers) as resp:
+            robots_text = resp.text if resp.status_code == 200 else None
+            return robots_entry_from_response(store, robots_url, record, resp.status_code, robots_text, resp.headers)
+    except Exception as e:
+        # Збій через вичерпаний ліміт часу рядка не кешується як помилка robots.txt для всього origin
+        check_deadline()
+        return robots_entry(robots_url, error=str(e))
+
+def prefetch_robots_txt(url_to_check, verify_ssl=True):
+    """Завантажує robots.txt для origin URL у кеш запуску без виводу.
+
+    Запускається паралельно із завантаженням сторінки; check_robots_txt потім бере запис з кешу
+    (або чекає на завантаження, що ще триває). Без активного кешу нічого не робить.
+    """
+    cache = get_robots_cache()
+    if cache is None:
+        return
+    try:
+        robots_url = urljoin(normalize_url(url_to_check), '/robots.txt')
+        cache.get_or_fetch(robots_url, lambda: _fetch_robots_entry(robots_url, verify_ssl, cache.store))
+    except Exception:
+        pass # Помилку покаже check_robots_txt, який повторить завантаження
+
 def check_robots_txt(url_to_check, user_agent='*', verify_ssl=True):
     """Перевіряє доступність URL в robots.txt для вказаного user-agent."""
     print(f"   ├── Перевірка robots.txt для User-agent: {user_agent}...")
@@ -18,25 +173,32 @@ def check_robots_txt(url_to_check, user_agent='*', verify_ssl=True):
     except Exception as e:
         print(f"   │   └── ⚠️ Помилка нормалізації URL: {e}, припускаємо, що дозволено")
         return True
-    rp = RobotFileParser()
-    rp.set_url(robots_url)
-    try:
-        # Використовуємо стандартний User-Agent для запиту robots.txt
-        with requests.get(robots_url, timeout=5, headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.6167.184 Safari/537.36'}, verify=verify_ssl) as resp:
-            if resp.status_code == 200:
-                rp.parse(resp.text.splitlines())
-                is_allowed = rp.can_fetch(user_agent, normalized_url)
-                print(f"   │   └── {'✅ Дозволено' if is_allowed else '❌ Заборонено'} в robots.txt для {user_agent}")
-                return is_allowed
-            elif resp.status_code == 404:
-                print(f"   │   └── ✅ robots.txt не знайдено (404), сканування дозволено")
-                return True # Якщо robots.txt немає, сканування дозволено
-            else:
-                print(f"   │   └── ⚠️ Не вдалося отримати robots.txt (Статус: {resp.status_code}), припускаємо, що дозволено")
-                return True # В разі помилки краще вважати, що дозволено
-    except Exception as e:
-        print(f"   │   └── ⚠️ Помилка при запиті до robots.txt: {e}, припускаємо, що дозволено")
+    cache = get_robots_cache()
+    if cache is None:
+        entry = _fetch_robots_entry(robots_url, verify_ssl)
+    else:
+        entry = cache.get_or_fetch(robots_url, lambda: _fetch_robots_entry(robots_url, verify_ssl, cache.store))
+    return evaluate_robots_entry(entry, normalized_url, user_agent)
+
+def evaluate_robots_entry(entry, normalized_url, user_agent='*'):
+    """Визначає дозвіл для URL за записом robots.txt (без мережевих запитів)."""
+    if entry["status_code"] is None:
+        print(f"   │   └── ⚠️ Помилка при запиті до robots.txt: {entry['error']}, припускаємо, що дозволено")
         return True
+    if entry["status_code"] == 200:
+        is_allowed = entry["parser"].can_fetch(user_agent, normalized_url)
+        print(f"   │   └── {'✅ Дозволено' if is_allowed else '❌ Заборонено'} в robots.txt для {user_agent}")
+        return is_allowed
+    elif entry["status_code"] == 404:
+        print(f"   │   └── ✅ robots.txt не знайдено (404), сканування дозволено")
+        return True # Якщо robots.txt немає, сканування дозволено
+    else:
+        print(f"   │   └── ⚠️ Не вдалося отримати robots.txt (Статус: {entry['status_code']}), припускаємо, що дозволено")
+        return True # В разі помилки краще вважати, що дозволено
+
+def evaluate_robots_txt(status_code, robots_text, robots_url, normalized_url, user_agent='*'):
+    """Визначає дозвіл для URL за статус-кодом і вмістом robots.txt (без мережевих запитів)."""
+    return evaluate_robots_entry(robots_entry(robots_url, status_code, robots_text), normalized_url, user_agent)
 
 def check_indexing_directives(url, headers, html_content):
     """Перевіряє наявність noindex/nofollow в X-Robots-Tag та мета-тегах."""
@@ -119,9 +281,43 @@ def check_canonical_tag(url, html_content):
         print(f"   │   └── ⚠️ Помилка парсингу HTML для Canonical: {e}")
     return canonical_url
 
+def extract_links(html_content, page_url):
+    """Розбирає HTML один раз і повертає посилання сторінки в порядку появи.
+
+    Кожне посилання - словник з абсолютним URL ("url"), нормалізованими URL та анкором, текстом
+    посилання та цікавими для нас атрибутами rel. Невалідні URL пропускаються.
+    """
+    rel_attrs_to_check = {"nofollow", "sponsored", "noindex"}
+    links = []
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for link in soup.find_all('a', href=True):
+        href = link.get('href')
+        try:
+            # Робимо URL абсолютним та нормалізуємо його
+            absolute_href = urljoin(page_url, href)
+            normalized_found_url = normalize_url(absolute_href)
+        except Exception:
+            continue # Пропускаємо невалідні URL
+
+        link_text = link.get_text(strip=True)
+        # Отримуємо значення rel як множину і перевіряємо цікаві для нас
+        rel_values = set(link.get('rel', []))
+        links.append({
+            "url": absolute_href,
+            "normalized_url": normalized_found_url,
+            "text": link_text,
+            "normalized_anchor": normalize_text(link_text),
+            "rel": ", ".join(sorted(list(rel_values.intersection(rel_attrs_to_check)))) or None,
+        })
+    return links
+
 # --- ОНОВЛЕНА ФУНКЦІЯ ---
-def check_links_on_page(html_content, page_url, anchor1, url1, anchor2, url2, anchor3, url3):
-    """Шукає вказані пари URL+Анкор на сторінці, пріоритезуючи точні співпадіння."""
+def check_links_on_page(html_content, page_url, anchor1, url1, anchor2, url2, anchor3, url3, links=None):
+    """Шукає вказані пари URL+Анкор на сторінці, пріоритезуючи точні співпадіння.
+
+    links - посилання, вже витягнуті extract_links з цієї сторінки (для кількох рядків з одним донором);
+    якщо не задано, HTML розбирається тут.
+    """
     print(f"   ├── Перевірка наявності посилань та анкорів на {page_url}...")
     results = {
         "url1_found": "Ні", "anchor1_match": "Ні", "url1_rel": None,
@@ -151,23 +347,15 @@ def check_links_on_page(html_content, page_url, anchor1, url1, anchor2, url2, an
     url3_mismatch_info = None # {'url': url, 'found_anchor': anchor, 'rel': rel, 'text': text, 'index': index}
 
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        links = soup.find_all('a', href=True)
+        if links is None:
+            links = extract_links(html_content, page_url)
 
         for index, link in enumerate(links):
-            href = link.get('href')
-            try:
-                # Робимо URL абсолютним та нормалізуємо його
-                absolute_href = urljoin(page_url, href)
-                normalized_found_url = normalize_url(absolute_href)
-            except Exception:
-                continue # Пропускаємо невалідні URL
-
-            link_text = link.get_text(strip=True)
-            normalized_found_anchor = normalize_text(link_text)
-            # Отримуємо значення rel як множину і перевіряємо цікаві для нас
-            rel_values = set(link.get('rel', []))
-            found_rel_str = ", ".join(sorted(list(rel_values.intersection(rel_attrs_to_check)))) or None
+            absolute_href = link["url"]
+            normalized_found_url = link["normalized_url"]
+            link_text = link["text"]
+            normalized_found_anchor = link["normalized_anchor"]
+            found_rel_str = link["rel"]
 
             # --- Перевірка для Пари 1 ---
             if not pair1_exact_match_found and normalized_url1 and normalized_found_url == normalized_url1:
@@ -343,4 +531,90 @@ def check_links_on_page(html_content, page_url, anchor1, url1, anchor2, url2, an
              pass # Нічого не виводити для пари 3
 
     return results
-# --- КІНЕЦЬ ОНОВЛЕНОЇ ФУНКЦІЇ --- 
\ No newline at end of file
+# --- КІНЕЦЬ ОНОВЛЕНОЇ ФУНКЦІЇ --- 
+
+
+class PageCompletionTracker(HTMLParser):
+    """Інкрементально розбирає HTML під час завантаження і визначає, коли решта сторінки вже не змінить результатів.
+
+    Сторінка вважається "вирішеною", коли закінчився <head> (мета-директиви та canonical) і для кожної
+    заданої пари Урл/Анкор знайдено точне співпадіння. Співпадіння шукаються так само, як у
+    check_links_on_page: посилання зараховується першій ще не знайденій парі (в порядку 1, 2, 3).
+    Пари інших рядків з тим самим донором додаються через add_pairs.
+    """
+
+    def __init__(self, page_url, anchor1, url1, anchor2, url2, anchor3, url3, encoding='utf-8'):
+        super().__init__(convert_charrefs=True)
+        self.page_url = page_url
+        # Незнайдені пари окремо для кожного рядка: в межах рядка посилання зараховується лише одній парі
+        self._pending_rows = []
+        self.add_pairs(anchor1, url1, anchor2, url2, anchor3, url3)
+        self._head_done = False
+        self._failed = False
+        self._link_href = None
+        self._link_texts = []
+        self._text_node = []
+        try:
+            self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def add_pairs(self, anchor1, url1, anchor2, url2, anchor3, url3):
+        """Додає пари Урл/Анкор ще одного рядка, що перевіряється на цій самій сторінці."""
+        # Пари без анкора не можуть мати точного співпадіння, тому на них не чекаємо
+        self._pending_rows.append([(normalize_url(u), normalize_text(a)) for a, u in ((anchor1, url1), (anchor2, url2), (anchor3, url3))
+                                   if u and normalize_text(a)])
+
+    @property
+    def is_complete(self):
+        return not self._failed and self._head_done and not any(self._pending_rows)
+
+    def feed_bytes(self, chunk):
+        """Додає наступну частину тіла сторінки. Повертає True, коли решту сторінки можна не завантажувати."""
+        if self._failed:
+            return False
+        try:
+            self.feed(self._decoder.decode(chunk))
+        except Exception:
+            self._failed = True # Трекер лише оптимізація: при помилці просто дочитуємо сторінку
+        return self.is_complete
+
+    def _flush_text_node(self):
+        # Як get_text(strip=True) в BeautifulSoup: кожен текстовий вузол обрізається окремо
+        if self._text_node:
+            self._link_texts.append("".join(self._text_node).strip())
+            self._text_node = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text_node()
+        if tag == 'body':
+            self._head_done = True
+        elif tag == 'a':
+            href = dict(attrs).get('href')
+            if href is not None:
+                self._link_href = href
+                self._link_texts = []
+
+    def handle_endtag(self, tag):
+        self._flush_text_node()
+        if tag == 'head':
+            self._head_done = True
+        elif tag == 'a' and self._link_href is not None:
+            self._match_link(self._link_href, "".join(self._link_texts))
+            self._link_href = None
+
+    def handle_data(self, data):
+        if self._link_href is not None:
+            self._text_node.append(data)
+
+    def _match_link(self, href, link_text):
+        try:
+            found_url = normalize_url(urljoin(self.page_url, href))
+        except Exception:
+            return
+        found_anchor = normalize_text(link_text)
+        for pending in self._pending_rows:
+            for index, (pair_url, pair_anchor) in enumerate(pending):
+                if found_url == pair_url and found_anchor == pair_anchor:
+                    del pending[index]
+                    break
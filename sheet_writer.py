@@ -0,0 +1,113 @@
+import json
+import threading
+
+from gsheet_utils import update_rows_with_results, try_update_rows
+from utils import row_key
+
+#
+# 6.3 ПОТОКОВИЙ ЗАПИС РЕЗУЛЬТАТІВ У ТАБЛИЦЮ (конвеєр перевірка → запис)
+#
+
+# Скільки рядків записується в таблицю одним пакетом
+DEFAULT_WRITE_BATCH_ROWS = 200
+# Максимальний обсяг результатів (JSON, байти), що чекають на запис; далі перевірка чекає на запис
+DEFAULT_MAX_PENDING_BYTES = 4 * 1024 * 1024
+# Неповний пакет записується не рідше ніж раз на стільки секунд
+DEFAULT_FLUSH_INTERVAL = 10
+
+def result_size(result):
+    """Приблизний розмір результату рядка в пам'яті (довжина JSON у байтах)."""
+    return len(json.dumps(result, ensure_ascii=False, default=str).encode("utf-8"))
+
+class SheetWriter:
+    """Етап запису конвеєра: результати рядків потрапляють у таблицю пакетами ще під час перевірки.
+
+    put() викликається для кожного перевіреного рядка (on_result рушія) і лише ставить результат у чергу;
+    фоновий потік записує чергу пакетами по batch_rows рядків через update_rows_with_results. Черга
+    обмежена обсягом max_pending_bytes: якщо запис відстає (ліміти Sheets API), put() чекає, тож
+    перевірка пригальмовує замість того, щоб накопичувати результати в пам'яті.
+    row_indices - пари (номер рядка в таблиці, дані рядка), з яких результат знаходить свій рядок.
+    """
+
+    def __init__(self, worksheet, headers, row_indices, batch_rows=DEFAULT_WRITE_BATCH_ROWS,
+                 max_pending_bytes=DEFAULT_MAX_PENDING_BYTES, flush_interval=DEFAULT_FLUSH_INTERVAL, write_rows=update_rows_with_results):
+        self.worksheet = worksheet
+        self.headers = list(headers)
+        self.batch_rows = max(1, batch_rows)
+        self.max_pending_bytes = max_pending_bytes
+        self.flush_interval = flush_interval
+        self._write_rows = write_rows
+        self._rows = {} # row_key -> номери рядків таблиці, ще не записаних
+        for row_idx, row_data in row_indices:
+            self._rows.setdefault(row_key(row_data), []).append(row_idx)
+        self._cond = threading.Condition()
+        self._pending = [] # (номер рядка, результат, розмір)
+        self._pending_bytes = 0 # Разом з пакетом, що записується зараз
+        self._closed = False
+        self._blocked = 0 # Скільки put() чекають на звільнення черги
+        self.failed = [] # (номер рядка, результат) пакетів, які не вдалося записати
+        self.written = 0
+        self.batches = 0
+        self.waits = 0
+        self._thread = threading.Thread(target=self._run, name="sheet-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, result):
+        """Ставить результат рядка в чергу запису; чекає, якщо черга вже заповнена."""
+        size = result_size(result)
+        with self._cond:
+            row_numbers = self._rows.get(row_key(result))
+            if not row_numbers:
+                return # Рядка немає в таблиці або його результат уже записано
+            row_idx = row_numbers.pop(0)
+            if self._pending_bytes and self._pending_bytes + size > self.max_pending_bytes:
+                self.waits += 1
+                self._blocked += 1
+                self._cond.notify_all() # Записуємо неповний пакет, не чекаючи flush_interval
+                self._cond.wait_for(lambda: not self._pending_bytes or self._pending_bytes + size <= self.max_pending_bytes)
+                self._blocked -= 1
+            self._pending.append((row_idx, result, size))
+            self._pending_bytes += size
+            if len(self._pending) >= self.batch_rows:
+                self._cond.notify_all()
+
+    def put_remaining(self, results):
+        """Ставить у чергу результати рядків, які ще не записано (наприклад, відновлені з контрольної точки)."""
+        for result in results:
+            if self._rows.get(row_key(result)):
+                self.put(result)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or (self._blocked and self._pending) or len(self._pending) >= self.batch_rows,
+                                    timeout=self.flush_interval)
+                if not self._pending:
+                    if self._closed:
+                        return
+                    continue
+                batch, self._pending = self._pending[:self.batch_rows], self._pending[self.batch_rows:]
+            self._write_batch(batch)
+            with self._cond:
+                self._pending_bytes -= sum(size for _, _, size in batch)
+                self._cond.notify_all()
+
+    def _write_batch(self, batch):
+        row_results = [(row_idx, result) for row_idx, result, _ in batch]
+        self.headers, failed = try_update_rows(self.worksheet, self.headers, row_results, self._write_rows)
+        self.failed.extend(failed)
+        if len(failed) < len(row_results):
+            self.written += len(row_results) - len(failed)
+            self.batches += 1
+
+    def close(self):
+        """Записує все, що залишилось у черзі, і зупиняє фоновий потік."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def stats(self):
+        """Кількість записаних рядків, пакетів, очікувань через заповнену чергу та рядків, які не вдалося записати."""
+        with self._cond:
+            return {"written": self.written, "batches": self.batches, "waits": self.waits, "failed": len(self.failed)}
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from collections import Counter
+
+from timeouts import RowDeadlineExceeded, DEADLINE_MESSAGE, time_left
+from run_context import run_component
+
+#
+# 3.9 ОБ'ЄДНАННЯ ОДНАКОВИХ ОДНОЧАСНИХ ЗАПИТІВ (single-flight)
+#
+
+class _Call:
+    # Виконання, на результат якого чекають інші потоки з тим самим ключем
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Одночасні однакові операції (той самий ключ) виконуються один раз.
+
+    Перший виклик з ключем виконує операцію, а виклики з тим самим ключем, що прийшли до її завершення,
+    чекають і отримують той самий результат або виняток. Це не кеш: після завершення операції наступний
+    виклик виконує її знову. Ключ - кортеж, перший елемент якого - вид операції ("page", "indexing") для статистики.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {} # key -> _Call (блокуючий шлях)
+        self._tasks = {} # key -> asyncio.Task (asyncio-рушій)
+        self._shared = Counter() # вид операції -> скільки викликів отримали чужий результат
+
+    def do(self, key, fn):
+        """Виконує fn() або чекає на вже запущене виконання з тим самим ключем.
+
+        Очікування обмежене лімітом часу рядка того, хто чекає (RowDeadlineExceeded).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self._shared[key[0]] += 1
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result
+        if not call.done.wait(time_left()):
+            raise RowDeadlineExceeded(DEADLINE_MESSAGE)
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def do_async(self, key, fn):
+        """Асинхронний аналог do: fn - корутинна функція; виконання не скасовується, якщо скасовано одного з тих, хто чекає."""
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._finish_task(key, done))
+        else:
+            with self._lock:
+                self._shared[key[0]] += 1
+        left = time_left()
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), left if left is None else max(0, left))
+        except asyncio.TimeoutError:
+            if task.done():
+                raise # Таймаут самої операції, а не очікування
+            raise RowDeadlineExceeded(DEADLINE_MESSAGE) from None
+
+    def _finish_task(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception() # Виняток отримують ті, хто чекав; якщо нікого не залишилось - не попереджаємо
+
+    def stats(self):
+        """Скільки викликів кожного виду отримали результат уже запущеної однакової операції."""
+        with self._lock:
+            return dict(self._shared)
+
+def get_single_flight():
+    """SingleFlight активного запуску або None."""
+    return run_component("single_flight")
+
+def coalesced(key, fn):
+    """fn() через активний SingleFlight (без нього - напряму)."""
+    single_flight = get_single_flight()
+    return fn() if single_flight is None else single_flight.do(key, fn)
+
+async def coalesced_async(key, fn):
+    """Асинхронний аналог coalesced."""
+    single_flight = get_single_flight()
+    return await fn() if single_flight is None else await single_flight.do_async(key, fn)
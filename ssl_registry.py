@@ -0,0 +1,86 @@
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+from run_context import run_component
+
+#
+# 3.3 ХОСТИ З НЕДІЙСНИМИ SSL-СЕРТИФІКАТАМИ
+#
+
+# Скільки секунд збережений запис про недійсний сертифікат діє в наступних запусках (сертифікати виправляють)
+DEFAULT_SSL_HOST_TTL = 7 * 24 * 3600
+
+def ssl_host_key(url):
+    """Ключ хоста для реєстру: host[:port] у нижньому регістрі або None для URL без хоста."""
+    try:
+        return urlsplit(url).netloc.lower() or None
+    except (ValueError, AttributeError):
+        return None
+
+class SslHostRegistry:
+    """Реєстр хостів, для яких перевірений TLS-запит уже завершився помилкою SSL.
+
+    Наступні запити до такого хоста одразу виконуються з вимкненою перевіркою SSL, без заздалегідь
+    приреченої спроби з перевіркою. Разом з хостом зберігається текст початкової помилки, щоб результати
+    рядків мали той самий ssl_disabled і текст помилки, що й після звичайного fallback.
+    Якщо задано path, записи зберігаються в SQLite і діють у наступних запусках протягом ttl секунд.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_SSL_HOST_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._hosts = {} # host -> текст помилки SSL
+        self._conn = None
+        self.skipped = 0
+        if path:
+            # Одне з'єднання на всі потоки та asyncio-рушій; доступ серіалізується через _lock
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS ssl_hosts ("
+                    " host TEXT PRIMARY KEY,"
+                    " error TEXT NOT NULL,"
+                    " recorded_at REAL NOT NULL)"
+                )
+                rows = self._conn.execute("SELECT host, error FROM ssl_hosts WHERE recorded_at > ?", (time.time() - ttl,))
+                self._hosts.update(dict(rows))
+
+    def known_error(self, url):
+        """Текст помилки SSL, якщо хост URL уже відомий як такий, що потребує вимкненої перевірки; інакше None."""
+        host = ssl_host_key(url)
+        with self._lock:
+            error = self._hosts.get(host)
+            if error is not None:
+                self.skipped += 1
+            return error
+
+    def remember(self, url, error_text):
+        """Запам'ятовує хост URL після помилки SSL на перевіреному запиті."""
+        host = ssl_host_key(url)
+        if host is None:
+            return
+        with self._lock:
+            self._hosts[host] = error_text
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("INSERT OR REPLACE INTO ssl_hosts (host, error, recorded_at) VALUES (?, ?, ?)",
+                                       (host, error_text, time.time()))
+
+    def stats(self):
+        """Кількість відомих хостів і запитів, що одразу пішли з вимкненою перевіркою SSL."""
+        with self._lock:
+            return {"hosts": len(self._hosts), "skipped": self.skipped}
+
+    def close(self):
+        """Закриває з'єднання з базою (якщо реєстр зберігається на диску)."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def get_ssl_registry():
+    """Реєстр SSL-хостів активного запуску або None."""
+    return run_component("ssl_registry")
@@ -0,0 +1,109 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import threading
+import time
+
+import adaptive_concurrency
+from adaptive_concurrency import AdaptiveLimit, ConcurrencyController
+
+def test_additive_increase_up_to_max():
+    limit = AdaptiveLimit(initial=2, max_limit=4)
+    for _ in range(3):
+        limit.on_success()
+    assert int(limit.limit) == 3 # 2 + 1/2 + 1/2.5 + 1/2.9
+    for _ in range(20):
+        limit.on_success()
+    assert limit.limit == 4
+
+def test_multiplicative_decrease_at_most_once_per_interval(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(adaptive_concurrency.time, "monotonic", lambda: now[0])
+    limit = AdaptiveLimit(initial=16, max_limit=16, decrease_interval=1.0)
+    limit.on_overload()
+    limit.on_overload() # Та сама хвиля помилок
+    assert limit.limit == 8
+    now[0] += 1.5
+    limit.on_overload()
+    assert limit.limit == 4
+    assert limit.decreases == 2
+    for _ in range(10):
+        now[0] += 2
+        limit.on_overload()
+    assert limit.limit == 1 # Не менше min_limit
+
+def test_overload_signals_lower_host_and_global_limits():
+    controller = ConcurrencyController(max_limit=8, initial_limit=8, initial_host_limit=4, decrease_interval=0)
+    controller.observe("http://slow.com/a", failed=True)
+    assert controller._host_limit("http://slow.com/").limit == 2
+    assert controller.stats()["limit"] == 8 # Збій одного хоста загального ліміту не стосується
+    controller.observe("http://slow.com/b", 0.1, 429)
+    assert controller._host_limit("http://slow.com/").limit == 1
+    assert controller.stats()["limit"] == 4
+    assert controller._host_limit("http://fast.com/").limit == 4 # Інших хостів не стосується
+    assert controller.stats()["decreases"] == 1
+
+def test_latency_spike_counts_as_host_overload():
+    controller = ConcurrencyController(max_limit=8, initial_limit=8, initial_host_limit=4, decrease_interval=0)
+    controller.observe("http://a.com/", 0.2, 200)
+    controller.observe("http://a.com/", 0.5, 200) # Повільніше, але нижче порогу в 1 с
+    assert controller._host_limit("http://a.com/").decreases == 0
+    controller.observe("http://a.com/", 2.0, 200) # У 10 разів повільніше за найшвидшу відповідь
+    assert controller._host_limit("http://a.com/").decreases == 1
+    assert controller.stats()["decreases"] == 0
+
+def test_dead_donors_lower_global_limit_only_at_high_error_rate():
+    controller = ConcurrencyController(max_limit=8, initial_limit=8, decrease_interval=0)
+    for n in range(40):
+        controller.observe(f"http://ok{n}.com/", 0.1, 200)
+        if n % 4 == 0:
+            controller.observe(f"http://dead{n}.com/", failed=True) # Кожна п'ята відповідь - мертвий донор
+    assert controller.stats()["decreases"] == 0
+    for n in range(20): # Дві третини відповідей - збої: перевантажено, найімовірніше, саме з'єднання
+        controller.observe(f"http://dead{n}.com/", failed=True)
+        controller.observe(f"http://dead{n}.com/", failed=True)
+        controller.observe(f"http://ok{n}.com/", 0.1, 200)
+    assert controller.stats()["decreases"] >= 1
+
+def test_slot_waits_for_lowered_limit():
+    controller = ConcurrencyController(max_limit=4, initial_limit=4, initial_host_limit=4)
+    active, peak, lock = [0], [0], threading.Lock()
+    controller.global_limit.limit = 2.0
+
+    def check(n):
+        with controller.slot(f"http://host{n}.com/"):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=check, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+
+def test_async_slot_grows_with_successes():
+    controller = ConcurrencyController(max_limit=8, initial_limit=1, initial_host_limit=8)
+    peak, active = [0], [0]
+
+    async def check(n):
+        async with controller.async_slot(f"http://host{n}.com/"):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.01)
+            controller.observe(f"http://host{n}.com/", 0.01, 200)
+            active[0] -= 1
+
+    async def run():
+        await asyncio.gather(*(check(n) for n in range(30)))
+
+    asyncio.run(run())
+    assert 1 < peak[0] <= 8
+    assert controller.stats()["highest"] > 1
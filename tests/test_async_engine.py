@@ -0,0 +1,626 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модулі
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import http.client
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, urlsplit
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import async_engine
+import request_processor
+from robots_store import RobotsStore
+from page_cache import PageCache
+from checkpoint import RunCheckpoint
+from retry_policy import RetryPolicy
+from timeouts import HostTimeouts, RowDeadlineExceeded, row_deadline
+from host_scheduler import HostScheduler
+from adaptive_concurrency import ConcurrencyController
+from host_breaker import HostCircuitBreaker
+from proxy_pool import ProxyPool
+from dns_cache import DnsCache
+from run_context import RunContext
+from utils import row_key
+
+PAGE = b'<html><head><link rel="canonical" href="/"></head><body><a href="http://target.com/">anchor</a></body></html>'
+ROBOTS_ETAG = '"robots-v1"'
+PAGE_ETAG = '"page-v1"'
+# Велика сторінка: потрібне посилання на початку, далі ~2 МБ заповнювача
+BIG_PAGE = b'<html><head></head><body><a href="http://target.com/">anchor</a>' + b'<p>padding</p>' * 150000 + b'</body></html>'
+
+CYRILLIC_PATH = "/сторінка"
+
+# Локальний сервер-донор: сторінка з посиланням, редирект, 404 та robots.txt
+class DonorHandler(BaseHTTPRequestHandler):
+    def _respond(self, with_body):
+        if self.path == "/big":
+            return self._send_big(with_body)
+        if self.path == "/trickle" and with_body:
+            return self._send_trickle()
+        if self.path == "/robots.txt" and self.headers.get("If-None-Match") == ROBOTS_ETAG:
+            status, headers, body = 304, {"ETag": ROBOTS_ETAG}, b""
+        elif self.path == "/robots.txt":
+            status, headers, body = 200, {"Content-Type": "text/plain", "ETag": ROBOTS_ETAG}, b"User-agent: Googlebot\nDisallow: /"
+        elif self.path == "/old":
+            status, headers, body = 301, {"Location": "/"}, b""
+        elif self.path == "/older":
+            status, headers, body = 301, {"Location": "/old"}, b""
+        elif self.path == "/cyrillic":
+            # Location з UTF-8 без %-кодування, як віддають деякі донори
+            status, headers, body = 301, {"Location": CYRILLIC_PATH.encode("utf-8").decode("latin-1")}, b""
+        elif self.path == quote(CYRILLIC_PATH):
+            status, headers, body = 200, {"Content-Type": "text/html; charset=utf-8"}, PAGE
+        elif self.path == "/bad-location":
+            status, headers, body = 301, {"Location": "http://[bad-host/"}, b""
+        elif self.path in ("/loop-a", "/loop-b"):
+            status, headers, body = 301, {"Location": "/loop-b" if self.path == "/loop-a" else "/loop-a"}, b""
+        elif self.path == "/" and self.headers.get("If-None-Match") == PAGE_ETAG:
+            status, headers, body = 304, {"ETag": PAGE_ETAG}, b""
+        elif self.path == "/":
+            status, headers, body = 200, {"Content-Type": "text/html; charset=utf-8", "ETag": PAGE_ETAG}, PAGE
+        elif self.path == "/nohead" and self.command == "HEAD":
+            status, headers, body = 405, {"Allow": "GET"}, b""
+        elif self.path == "/nohead":
+            status, headers, body = 200, {"Content-Type": "text/html"}, PAGE
+        elif self.path == "/flaky" and self.command == "HEAD" and not self.server.flaky_head_failed:
+            # Перший HEAD - тимчасова недоступність, далі сторінка доступна
+            self.server.flaky_head_failed = True
+            status, headers, body = 503, {"Retry-After": "0"}, b""
+        elif self.path == "/flaky":
+            status, headers, body = 200, {"Content-Type": "text/html"}, PAGE
+        elif self.path == "/trickle":
+            status, headers, body = 200, {"Content-Type": "text/html"}, b""
+        else:
+            status, headers, body = 404, {"Content-Type": "text/html"}, b"not found"
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if with_body and body:
+            self.wfile.write(body)
+
+    def _send_big(self, with_body):
+        # Підтримує Range: bytes=0-N, як справжні статичні сервери
+        body, status = BIG_PAGE, 200
+        range_header = self.headers.get("Range")
+        if range_header:
+            end = int(range_header.split("-")[1])
+            body, status = BIG_PAGE[:end + 1], 206
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes 0-{len(body) - 1}/{len(BIG_PAGE)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if with_body:
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass # Клієнт припинив читання раніше - це очікувано
+
+    def _send_trickle(self):
+        # Сторінка, що віддається повільно: частина по 32 КБ кожні 0.2 с, разом ~8 с
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        try:
+            for _ in range(40):
+                self.wfile.write(b"<p>" + b"x" * 32 * 1024 + b"</p>")
+                self.wfile.flush()
+                time.sleep(0.2)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # Клієнт припинив читання через ліміт часу рядка
+
+    def do_GET(self):
+        self.server.requests_log.append((self.path, self.headers.get("Range")))
+        time.sleep(self.server.get_delay)
+        self._respond(True)
+
+    def do_HEAD(self):
+        self.server.head_log.append(self.path)
+        self._respond(False)
+
+    def log_message(self, *args):
+        pass
+
+_SERVERS = {}
+
+def server_log(base):
+    # Список (шлях, Range) усіх GET-запитів до тестового сервера
+    return _SERVERS[base].requests_log
+
+@pytest.fixture
+def donor_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DonorHandler)
+    server.requests_log = []
+    server.head_log = [] # Шляхи HEAD-запитів
+    server.flaky_head_failed = False
+    server.get_delay = 0 # Затримка кожного GET, секунди
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    _SERVERS[base] = server
+    yield base
+    del _SERVERS[base]
+    server.shutdown()
+    server.server_close()
+
+# Локальний HTTP-проксі: пересилає запити з абсолютним URL на сервер-донор; banned - відповідає 407 на все
+class ForwardingProxyHandler(BaseHTTPRequestHandler):
+    def _forward(self):
+        self.server.requests_log.append((self.command, self.path))
+        if self.server.banned:
+            self.send_response(407)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        parts = urlsplit(self.path)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=10)
+        headers = {name: value for name, value in self.headers.items() if name.lower() not in ("proxy-connection", "connection")}
+        conn.request(self.command, parts.path + (f"?{parts.query}" if parts.query else ""), headers=headers)
+        response = conn.getresponse()
+        body = response.read()
+        conn.close()
+        self.send_response(response.status)
+        for name, value in response.getheaders():
+            if name.lower() not in ("connection", "content-length", "transfer-encoding"):
+                self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    do_GET = do_HEAD = _forward
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def proxy_servers():
+    # Два проксі: перший блокує всі запити, другий пересилає їх донору
+    servers = []
+    for banned in (True, False):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), ForwardingProxyHandler)
+        server.requests_log = []
+        server.banned = banned
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    yield [(f"http://127.0.0.1:{server.server_address[1]}", server) for server in servers]
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def _rows(base):
+    return [
+        {"Url": f"{base}/old", "Анкор-1": "anchor", "Урл-1": "http://target.com", "Анкор-2": None, "Урл-2": None, "Анкор-3": None, "Урл-3": None},
+        {"Url": f"{base}/", "Анкор-1": "other", "Урл-1": "http://target.com", "Анкор-2": None, "Урл-2": None, "Анкор-3": None, "Урл-3": None},
+        {"Url": f"{base}/gone", "Анкор-1": "anchor", "Урл-1": "http://target.com", "Анкор-2": None, "Урл-2": None, "Анкор-3": None, "Урл-3": None},
+    ]
+
+COMPARED_FIELDS = [
+    "url", "status_code", "redirect_chain", "final_url", "final_status_code", "error", "ssl_disabled",
+    "robots_star_allowed", "robots_googlebot_allowed", "canonical_url", "url1_found", "anchor1_match", "url1_rel",
+]
+
+def test_async_engine_matches_blocking_engine(donor_server):
+    # Обидва рушії мають повертати однакові результати для тих самих рядків
+    rows = _rows(donor_server)
+    blocking = request_processor.check_status_code_requests(rows)
+    async_results = request_processor.check_status_code_requests(rows, max_workers=10, engine="asyncio")
+
+    assert len(async_results) == len(blocking) == 3
+    for expected, actual in zip(blocking, async_results):
+        assert {k: actual[k] for k in COMPARED_FIELDS} == {k: expected[k] for k in COMPARED_FIELDS}
+    assert async_results[0]["redirect_chain"] == [{"url": f"{donor_server}/old", "status_code": 301}]
+    assert async_results[0]["anchor1_match"] == "Так"
+    assert async_results[1]["anchor1_match"] == "Ні"
+    assert async_results[2]["final_status_code"] == 404
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_single_get_mode_matches_head_get_mode(donor_server, engine):
+    # Режим одного GET не змінює полів, що записуються в таблицю
+    rows = _rows(donor_server)
+    head_get = request_processor.check_status_code_requests(rows, max_workers=3, engine=engine)
+    single_get = request_processor.check_status_code_requests(rows, max_workers=3, engine=engine, fetch_mode="get")
+    for expected, actual in zip(head_get, single_get):
+        assert {k: actual[k] for k in COMPARED_FIELDS} == {k: expected[k] for k in COMPARED_FIELDS}
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_single_get_mode_handles_head_405(donor_server, engine):
+    # Сервер, що відповідає на HEAD 405, перевіряється коректно лише в режимі get
+    rows = [{"Url": f"{donor_server}/nohead", "Анкор-1": "anchor", "Урл-1": "http://target.com"}]
+    assert request_processor.check_status_code_requests(rows, engine=engine)[0]["final_status_code"] == 405
+    result = request_processor.check_status_code_requests(rows, engine=engine, fetch_mode="get")[0]
+    assert result["final_status_code"] == 200
+    assert result["anchor1_match"] == "Так"
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+@pytest.mark.parametrize("fetch_mode", ["head_get", "get"])
+def test_big_page_stops_once_pairs_found(donor_server, engine, fetch_mode):
+    # Посилання знайдено на початку сторінки - решту не завантажуємо і сторінку не вважаємо обрізаною
+    rows = [{"Url": f"{donor_server}/big", "Анкор-1": "anchor", "Урл-1": "http://target.com"}]
+    result = request_processor.check_status_code_requests(rows, engine=engine, fetch_mode=fetch_mode)[0]
+    assert result["anchor1_match"] == "Так"
+    assert result["page_truncated"] is False
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_byte_cap_truncates_and_uses_range(donor_server, engine):
+    # Пару не знайдено (інший анкор) - читання обмежує ліміт; сервер з Accept-Ranges отримує Range-запит
+    rows = [{"Url": f"{donor_server}/big", "Анкор-1": "other", "Урл-1": "http://target.com"}]
+    result = request_processor.check_status_code_requests(rows, engine=engine, max_body_bytes=50000)[0]
+    assert result["page_truncated"] is True
+    assert result["anchor1_match"] == "Ні"
+    assert ("/big", "bytes=0-49999") in server_log(donor_server)
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_robots_txt_fetched_once_per_run(donor_server, engine):
+    # Три сторінки того самого хоста, по дві перевірки robots.txt на кожній - один запит за запуск
+    rows = [{"Url": f"{donor_server}{path}", "Анкор-1": "anchor", "Урл-1": "http://target.com"} for path in ("/", "/old", "/big")]
+    results = request_processor.check_status_code_requests(rows, max_workers=3, engine=engine)
+    assert [r["robots_googlebot_allowed"] for r in results] == [False, False, False]
+    assert [path for path, _ in server_log(donor_server)].count("/robots.txt") == 1
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_robots_store_revalidates_with_etag(donor_server, engine, tmp_path):
+    # Збережена копія прострочена (ttl=0): наступний запуск отримує 304 і використовує збережені правила
+    store = RobotsStore(str(tmp_path / "cache.sqlite"), ttl=0)
+    rows = [{"Url": f"{donor_server}/", "Анкор-1": "anchor", "Урл-1": "http://target.com"}]
+    first = request_processor.check_status_code_requests(rows, engine=engine, run_context=RunContext(robots_store=store))[0]
+    second = request_processor.check_status_code_requests(rows, engine=engine, run_context=RunContext(robots_store=store))[0]
+    store.close()
+    assert first["robots_googlebot_allowed"] is False
+    assert second["robots_googlebot_allowed"] is False
+    assert store.stats() == {"fresh": 0, "not_modified": 1, "downloads": 1}
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_page_cache_reuses_results_for_unchanged_pages(donor_server, engine, tmp_path):
+    # "/" віддає ETag - повторний запуск отримує 304; "/nohead" без валідаторів - збігається хеш вмісту
+    cache = PageCache(str(tmp_path / "cache.sqlite"))
+    rows = [
+        {"Url": f"{donor_server}/", "Анкор-1": "anchor", "Урл-1": "http://target.com"},
+        {"Url": f"{donor_server}/nohead", "Анкор-1": "anchor", "Урл-1": "http://target.com"},
+    ]
+    run_context = RunContext(page_cache=cache)
+    first = request_processor.check_status_code_requests(rows, engine=engine, fetch_mode="get", run_context=run_context)
+    first_head_get = request_processor.check_status_code_requests(rows[:1], engine=engine, run_context=run_context)
+    second = request_processor.check_status_code_requests(rows, engine=engine, fetch_mode="get", run_context=run_context)
+    cache.close()
+
+    for expected, actual in zip(first, second):
+        assert {k: actual[k] for k in COMPARED_FIELDS} == {k: expected[k] for k in COMPARED_FIELDS}
+    assert first_head_get[0]["anchor1_match"] == "Так"
+    assert first_head_get[0]["canonical_url"] == first[0]["canonical_url"]
+    assert cache.stats() == {"not_modified": 1, "same_content": 2, "parsed": 2}
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+@pytest.mark.parametrize("fetch_mode", ["head_get", "get"])
+def test_rows_with_same_donor_fetch_page_once(donor_server, engine, fetch_mode):
+    # Три рядки з одним донором (з кінцевим слешем і без) - один GET сторінки, пари кожного рядка окремо
+    rows = [
+        {"Url": f"{donor_server}/", "Анкор-1": "anchor", "Урл-1": "http://target.com"},
+        {"Url": f"{donor_server}/gone", "Анкор-1": "anchor", "Урл-1": "http://target.com"},
+        {"Url": donor_server, "Анкор-1": "other", "Урл-1": "http://target.com"},
+        {"Url": f"{donor_server}/", "Анкор-1": None, "Урл-1": None, "Анкор-2": "anchor", "Урл-2": "http://target.com"},
+    ]
+    results = request_processor.check_status_code_requests(rows, max_workers=2, engine=engine, fetch_mode=fetch_mode)
+
+    assert [path for path, _ in server_log(donor_server)].count("/") == 1
+    assert [r["url"] for r in results] == [row["Url"] for row in rows]
+    assert [r["final_status_code"] for r in results] == [200, 404, 200, 200]
+    assert [r["anchor1_match"] for r in results] == ["Так", "Н/Д", "Ні", "Ні"]
+    assert results[3]["url2_found"] == "Так" and results[3]["anchor2_match"] == "Так"
+    assert results[0]["canonical_url"] == results[2]["canonical_url"] == results[3]["canonical_url"]
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_transient_503_is_retried(donor_server, engine):
+    # 503 з Retry-After: 0 на першому HEAD - повтор отримує 200 і сторінка перевіряється як зазвичай
+    policy = RetryPolicy(rng=lambda: 0)
+    rows = [{"Url": f"{donor_server}/flaky", "Анкор-1": "anchor", "Урл-1": "http://target.com"}]
+    result = request_processor.check_status_code_requests(rows, engine=engine, run_context=RunContext(retry_policy=policy))[0]
+    assert result["final_status_code"] == 200
+    assert result["anchor1_match"] == "Так"
+    assert policy.stats()["retries"] == 1
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_row_deadline_stops_trickling_page(donor_server, engine):
+    # Повільна сторінка не тримає рядок довше за ліміт часу: читання зупиняється, статус зберігається
+    rows = [{"Url": f"{donor_server}/trickle", "Анкор-1": "anchor", "Урл-1": "http://target.com"}]
+    started = time.monotonic()
+    result = request_processor.check_status_code_requests(rows, engine=engine, run_context=RunContext(host_timeouts=HostTimeouts(row_deadline=1)))[0]
+    assert time.monotonic() - started < 3
+    assert result["final_status_code"] == 200
+    assert "Ліміт часу на перевірку рядка вичерпано" in result["seo_check_error"]
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_robots_and_indexing_run_alongside_page_get(donor_server, engine, monkeypatch):
+    # GET сторінки, robots.txt і ValueSerp займають по 0.5 с - разом ~0.5 с замість 1.5 с послідовно
+    _SERVERS[donor_server].get_delay = 0.5
+
+    def slow_indexing(url, api_key):
+        time.sleep(0.5)
+        return True, f"site:{url}"
+
+    async def slow_indexing_async(session, url, api_key):
+        await asyncio.sleep(0.5)
+        return True, f"site:{url}"
+
+    monkeypatch.setattr(request_processor, "check_google_indexing", slow_indexing)
+    monkeypatch.setattr(async_engine, "_check_google_indexing_async", slow_indexing_async)
+    rows = [{"Url": f"{donor_server}/", "Анкор-1": "anchor", "Урл-1": "http://target.com"}]
+    started = time.monotonic()
+    result = request_processor.check_status_code_requests(rows, valueserp_api_key="key", engine=engine)[0]
+    assert time.monotonic() - started < 1.2
+    assert result["google_indexing"] == "Так"
+    assert result["robots_googlebot_allowed"] is False
+    assert result["anchor1_match"] == "Так"
+    assert [path for path, _ in server_log(donor_server)].count("/robots.txt") == 1
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_same_final_page_fetched_once_while_in_flight(donor_server, engine, monkeypatch):
+    # /old і / - різні донори з редиректом на ту саму сторінку: один GET і один запит до ValueSerp на двох
+    _SERVERS[donor_server].get_delay = 0.5
+    indexing_calls = []
+
+    def slow_indexing(url, api_key):
+        indexing_calls.append(url)
+        time.sleep(0.5)
+        return True, f"site:{url}"
+
+    async def slow_indexing_async(session, url, api_key):
+        indexing_calls.append(url)
+        await asyncio.sleep(0.5)
+        return True, f"site:{url}"
+
+    monkeypatch.setattr(request_processor, "check_google_indexing", slow_indexing)
+    monkeypatch.setattr(async_engine, "_check_google_indexing_async", slow_indexing_async)
+    rows = [{"Url": f"{donor_server}{path}", "Анкор-1": "anchor", "Урл-1": "http://target.com"} for path in ("/old", "/")]
+    results = request_processor.check_status_code_requests(rows, max_workers=2, valueserp_api_key="key", engine=engine)
+    assert [r["anchor1_match"] for r in results] == ["Так", "Так"]
+    assert [r["google_indexing"] for r in results] == ["Так", "Так"]
+    assert [path for path, _ in server_log(donor_server)].count("/") == 1
+    assert len(indexing_calls) == 1
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_host_scheduler_paces_requests_to_one_host(donor_server, engine):
+    # 5 запитів на секунду без запасу: robots.txt, HEAD (з повтором для /flaky) і GET кожної сторінки - щонайменше 1.2 с
+    scheduler = HostScheduler(max_per_host=1, rate=5, burst=1)
+    rows = [{"Url": f"{donor_server}{path}", "Анкор-1": "anchor", "Урл-1": "http://target.com"} for path in ("/", "/old", "/flaky")]
+    started = time.monotonic()
+    run_context = RunContext(host_scheduler=scheduler, retry_policy=RetryPolicy(rng=lambda: 0))
+    results = request_processor.check_status_code_requests(rows, max_workers=3, engine=engine, run_context=run_context)
+    assert time.monotonic() - started >= 1.1
+    assert [r["anchor1_match"] for r in results] == ["Так", "Так", "Так"]
+    assert scheduler.stats()["delayed"] >= 6
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_concurrency_controller_grows_on_healthy_host(donor_server, engine):
+    # Усі відповіді швидкі й успішні - ліміт з 1 лише зростає, результати ті самі
+    controller = ConcurrencyController(max_limit=4, initial_limit=1)
+    rows = [{"Url": f"{donor_server}{path}", "Анкор-1": "anchor", "Урл-1": "http://target.com"} for path in ("/", "/old", "/nohead")]
+    results = request_processor.check_status_code_requests(rows, max_workers=4, engine=engine, run_context=RunContext(concurrency_controller=controller))
+    assert [r["final_status_code"] for r in results] == [200, 200, 405]
+    assert controller.stats()["highest"] > 1
+    assert controller.stats()["decreases"] == 0
+
+def test_async_engine_writes_checkpoint_per_row(donor_server, tmp_path):
+    checkpoint = RunCheckpoint(str(tmp_path / "run.jsonl"))
+    results = request_processor.check_status_code_requests(_rows(donor_server), max_workers=3, engine="asyncio", checkpoint=checkpoint)
+    saved = checkpoint.completed()
+    assert len(saved) == 3
+    # Порядок у файлі - порядок завершення рядків, тому порівнюємо за ключем рядка
+    assert all(saved[row_key(r)]["final_status_code"] == r["final_status_code"] for r in results)
+
+def test_run_async_checks_inside_running_loop(donor_server):
+    # Як у Colab: виклик з коду, що вже виконується всередині циклу подій
+    async def caller():
+        return async_engine.run_async_checks(_rows(donor_server)[1:2], concurrency=2)
+
+    results = asyncio.run(caller())
+    assert results[0]["final_status_code"] == 200
+    assert results[0]["robots_googlebot_allowed"] is False
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_banned_proxy_leaves_rotation_and_host_moves_to_healthy_proxy(donor_server, proxy_servers, engine):
+    # Донор закріплюється за першим проксі; після трьох 407 поспіль той виводиться з ротації
+    (banned_url, banned_server), (healthy_url, healthy_server) = proxy_servers
+    pool = ProxyPool([banned_url, healthy_url], max_per_proxy=2)
+    paths = ("/a1", "/a2", "/a3", "/", "/old")
+    rows = [{"Url": f"{donor_server}{path}", "Анкор-1": "anchor", "Урл-1": "http://target.com"} for path in paths]
+    results = request_processor.check_status_code_requests(rows, engine=engine, run_context=RunContext(proxy_pool=pool))
+    assert [r["final_status_code"] for r in results] == [407, 407, 407, 200, 200]
+    assert [r["anchor1_match"] for r in results[3:]] == ["Так", "Так"]
+    assert len(banned_server.requests_log) == 3
+    assert ("GET", f"{donor_server}/robots.txt") in healthy_server.requests_log
+    # Кожен GET, що дійшов до донора, пройшов через здоровий проксі
+    assert len(server_log(donor_server)) == sum(1 for method, _ in healthy_server.requests_log if method == "GET")
+    proxy_stats = pool.stats()
+    assert (proxy_stats["healthy"], proxy_stats["removals"], proxy_stats["direct"]) == (1, 1, 0)
+
+def test_indexing_timeout_at_row_deadline_is_an_error():
+    # Таймаут ValueSerp через вичерпаний ліміт часу рядка - не "не проіндексовано"
+    class TimingOutSession:
+        def get(self, *args, **kwargs):
+            raise asyncio.TimeoutError()
+
+    async def check():
+        with row_deadline(0.01):
+            await asyncio.sleep(0.02)
+            return await async_engine._check_google_indexing_async(TimingOutSession(), "https://example.com/", "key")
+
+    with pytest.raises(RowDeadlineExceeded):
+        asyncio.run(check())
+
+def test_blocked_on_result_does_not_stop_event_loop(donor_server):
+    # Перший on_result чекає (як put() при заповненій черзі запису), доки почнеться перевірка іншого рядка:
+    # з concurrency=1 вона можлива лише тоді, коли цикл подій не зупинено очікуванням on_result
+    head_log = _SERVERS[donor_server].head_log
+    rows = [{"Url": f"{donor_server}{path}", "Анкор-1": "anchor", "Урл-1": "http://target.com"} for path in ("/old", "/loop-a")]
+    other_row_started = []
+    def on_result(result):
+        if not other_row_started:
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline and not {"/old", "/loop-a"} <= set(head_log):
+                time.sleep(0.01)
+            other_row_started.append({"/old", "/loop-a"} <= set(head_log))
+    results = request_processor.check_status_code_requests(rows, max_workers=1, engine="asyncio", on_result=on_result)
+    assert other_row_started == [True]
+    assert len(results) == 2
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_known_redirect_hops_skipped_for_later_rows(donor_server, engine):
+    # /older → /old → /: крок /old → / уже відомий з першого рядка, тож для нього запит не надсилається
+    rows = [{"Url": f"{donor_server}{path}", "Анкор-1": "anchor", "Урл-1": "http://target.com"} for path in ("/old", "/older")]
+    results = request_processor.check_status_code_requests(rows, engine=engine)
+    assert _SERVERS[donor_server].head_log == ["/old", "/", "/older", "/"]
+    assert [hop["status_code"] for hop in results[1]["redirect_chain"]] == [301, 301]
+    assert [hop["url"].rstrip("/").rsplit("/", 1)[-1] for hop in results[1]["redirect_chain"]] == ["older", "old"]
+    assert [r["final_url"] for r in results] == [f"{donor_server}/"] * 2
+    assert [r["anchor1_match"] for r in results] == ["Так", "Так"]
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_utf8_location_followed_as_percent_encoded_url(donor_server, engine):
+    rows = [{"Url": f"{donor_server}/cyrillic", "Анкор-1": "anchor", "Урл-1": "http://target.com"}]
+    result = request_processor.check_status_code_requests(rows, engine=engine)[0]
+    assert result["final_url"] == f"{donor_server}{quote(CYRILLIC_PATH)}"
+    assert result["final_status_code"] == 200
+    assert result["anchor1_match"] == "Так"
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_malformed_location_fails_only_its_row(donor_server, engine):
+    # ValueError на некоректному Location - помилка рядка, а не всього запуску
+    rows = [{"Url": f"{donor_server}/bad-location", "Анкор-1": "anchor", "Урл-1": "http://target.com"},
+            {"Url": f"{donor_server}/", "Анкор-1": "anchor", "Урл-1": "http://target.com"}]
+    results = request_processor.check_status_code_requests(rows, max_workers=2, engine=engine)
+    assert results[0]["final_status_code"] == 0
+    assert results[0]["error"]
+    assert results[1]["final_status_code"] == 200
+    assert results[1]["anchor1_match"] == "Так"
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_redirect_loop_detected(donor_server, engine):
+    rows = [{"Url": f"{donor_server}/loop-a", "Анкор-1": "anchor", "Урл-1": "http://target.com"}]
+    result = request_processor.check_status_code_requests(rows, engine=engine)[0]
+    assert result["final_status_code"] == 0
+    assert result["error"].startswith("Цикл редиректів")
+    assert _SERVERS[donor_server].head_log == ["/loop-a", "/loop-b"]
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_dns_cache_serves_only_session_connections(donor_server, engine):
+    # Хост .invalid не існує для системного DNS, але з'єднання сесії беруть адресу з кешу запуску
+    dns_cache = DnsCache(resolver=lambda host, port, family=0, type=0, proto=0, flags=0: [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', 0))])
+    dns_cache.resolve_hosts(["http://donor.invalid/"])
+    base = donor_server.replace("127.0.0.1", "donor.invalid")
+    rows = [{"Url": f"{base}/old", "Анкор-1": "anchor", "Урл-1": "http://target.com"}]
+    observed = []
+
+    def on_result(result):
+        try:
+            socket.getaddrinfo("donor.invalid", 80)
+        except socket.gaierror:
+            observed.append("system dns")
+
+    result = request_processor.check_status_code_requests(rows, engine=engine, run_context=RunContext(dns_cache=dns_cache), on_result=on_result)[0]
+    assert result["final_url"] == f"{base}/"
+    assert result["anchor1_match"] == "Так"
+    assert dns_cache.stats()["hits"] >= 1
+    assert observed == ["system dns"] # Під час запуску socket.getaddrinfo процесу не змінено
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_concurrent_runs_keep_their_own_components(donor_server, engine):
+    # Два одночасні запуски з різними DNS-кешами: для одного хост є, для іншого - не існує
+    def resolver(found):
+        def resolve(host, port, family=0, type=0, proto=0, flags=0):
+            if not found:
+                raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', 0))]
+        return resolve
+
+    base = donor_server.replace("127.0.0.1", "donor.invalid")
+    rows = [{"Url": f"{base}/", "Анкор-1": "anchor", "Урл-1": "http://target.com"}]
+    results = {}
+
+    def run(name, found):
+        dns_cache = DnsCache(resolver=resolver(found))
+        dns_cache.resolve_hosts([base])
+        results[name] = request_processor.check_status_code_requests(rows, max_workers=2, engine=engine,
+                                                                     run_context=RunContext(dns_cache=dns_cache))[0]
+
+    threads = [threading.Thread(target=run, args=(name, name == "found")) for name in ("found", "missing")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results["found"]["final_status_code"] == 200
+    assert results["missing"]["error"].startswith("Хост не знайдено (DNS)")
+
+@pytest.mark.parametrize("engine", ["requests", "asyncio"])
+def test_unreachable_host_rows_fail_fast_after_breaker_opens(engine):
+    # Закритий порт: після двох помилок з'єднання решта рядків хоста завершується без запитів
+    breaker = HostCircuitBreaker(failure_threshold=2, cool_down=60)
+    rows = [{"Url": f"http://127.0.0.1:9/page{n}", "Анкор-1": None, "Урл-1": None} for n in range(4)]
+    results = request_processor.check_status_code_requests(rows, engine=engine,
+                                                           run_context=RunContext(retry_policy=RetryPolicy(max_retries=0), host_breaker=breaker))
+    assert all(r["final_status_code"] == 0 for r in results)
+    assert not any(r["error"].startswith("Хост недоступний") for r in results[:2])
+    assert all(r["error"].startswith("Хост недоступний: 2 помилок з'єднання поспіль") for r in results[2:])
+    assert breaker.stats() == {"open": 1, "opened": 1, "rejected": 2, "probes": 0}
+
+def test_async_engine_connection_error():
+    # Закритий порт: помилка HEAD без SSL-fallback
+    rows = [{"Url": "http://127.0.0.1:9/", "Анкор-1": None, "Урл-1": None}]
+    results = async_engine.run_async_checks(rows)
+    assert results[0]["final_status_code"] == 0
+    assert results[0]["error"]
+    assert results[0]["ssl_disabled"] is False
+
+def test_unknown_engine_rejected():
+    with pytest.raises(ValueError):
+        request_processor.check_status_code_requests([], engine="curl")
+
+def test_async_bounded_window_limits_group_tasks():
+    # Задач груп одночасно не більше window, результати - в порядку груп
+    state = {"running": 0, "peak": 0}
+
+    async def check(group):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(0.001 * (group % 3))
+        state["running"] -= 1
+        return group * 10
+
+    results = asyncio.run(async_engine._run_groups_bounded(list(range(20)), 4, check))
+    assert results == [group * 10 for group in range(20)]
+    assert state["peak"] <= 4
+
+def test_blocking_work_runs_off_event_loop(donor_server, monkeypatch, tmp_path):
+    # SQLite-сховища, визначення кодування та розбір сторінки не виконуються в потоці циклу подій
+    calls = []
+
+    def off_loop(name, fn):
+        def wrapper(*args, **kwargs):
+            calls.append((name, threading.current_thread() is threading.main_thread()))
+            return fn(*args, **kwargs)
+        return wrapper
+
+    for name in ("_decode_html", "_check_page_content", "_reuse_page_results", "_remember_page_results", "stored_robots_lookup"):
+        monkeypatch.setattr(async_engine, name, off_loop(name, getattr(async_engine, name)))
+    store = RobotsStore(str(tmp_path / "cache.sqlite"))
+    cache = PageCache(str(tmp_path / "cache.sqlite"))
+    rows = [{"Url": f"{donor_server}/", "Анкор-1": "anchor", "Урл-1": "http://target.com"}]
+    result = request_processor.check_status_code_requests(rows, engine="asyncio", run_context=RunContext(robots_store=store, page_cache=cache))[0]
+    store.close()
+    cache.close()
+
+    assert result["anchor1_match"] == "Так"
+    assert {name for name, _ in calls} == {"_decode_html", "_check_page_content", "_reuse_page_results", "_remember_page_results", "stored_robots_lookup"}
+    assert not any(on_loop for _, on_loop in calls)
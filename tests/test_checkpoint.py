@@ -0,0 +1,62 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+import request_processor
+from checkpoint import RunCheckpoint
+from utils import row_key
+
+def _row(n):
+    return {"Url": f"http://example.com/{n}", "Анкор-1": "anchor", "Урл-1": "http://target.com"}
+
+def _fake_result(row_info):
+    result = dict(row_info)
+    result.update({"url": row_info["Url"], "final_status_code": 200, "error": None, "ssl_disabled": False,
+                   "redirect_chain": [], "indexing_directives": {"noindex": False}})
+    return result
+
+def test_append_and_reload(tmp_path):
+    checkpoint = RunCheckpoint(str(tmp_path / "run.jsonl"))
+    assert checkpoint.completed() == {}
+    checkpoint.append(_fake_result(_row(1)))
+    checkpoint.append(_fake_result(_row(2)))
+
+    completed = RunCheckpoint(checkpoint.path).completed()
+    assert set(completed) == {row_key(_row(1)), row_key(_row(2))}
+    assert completed[row_key(_row(1))]["indexing_directives"] == {"noindex": False}
+
+    checkpoint.clear()
+    assert not os.path.exists(checkpoint.path)
+
+def test_partial_last_line_ignored(tmp_path):
+    # Збій під час запису: останній рядок файлу обірваний
+    checkpoint = RunCheckpoint(str(tmp_path / "run.jsonl"))
+    checkpoint.append(_fake_result(_row(1)))
+    with open(checkpoint.path, "a", encoding="utf-8") as f:
+        f.write('{"Url": "http://example.com/2", "url')
+    assert list(checkpoint.completed()) == [row_key(_row(1))]
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_resume_checks_only_remaining_rows(monkeypatch, tmp_path, max_workers):
+    checked = []
+    def fake_check_row(i, row_info, *args, **kwargs):
+        checked.append(row_info["Url"])
+        return _fake_result(row_info)
+    monkeypatch.setattr(request_processor, '_check_row', fake_check_row)
+
+    rows = [_row(n) for n in range(1, 5)]
+    checkpoint = RunCheckpoint(str(tmp_path / "run.jsonl"))
+    # Перерваний запуск встиг перевірити рядки 1 і 3
+    checkpoint.append(dict(_fake_result(rows[0]), final_status_code=301))
+    checkpoint.append(_fake_result(rows[2]))
+
+    results = request_processor.check_status_code_requests(rows, max_workers=max_workers, checkpoint=checkpoint)
+
+    assert sorted(checked) == [rows[1]["Url"], rows[3]["Url"]]
+    assert [r["url"] for r in results] == [row["Url"] for row in rows]
+    assert results[0]["final_status_code"] == 301  # збережений результат, а не новий
+    # Нові результати теж записані в контрольну точку
+    assert set(checkpoint.completed()) == {row_key(row) for row in rows}
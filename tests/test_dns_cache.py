@@ -0,0 +1,70 @@
+import os
+import sys
+import socket
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+import dns_cache
+from dns_cache import DnsCache, url_hostname
+from run_context import RunContext, activate_run
+
+def fake_resolver(calls):
+    def resolve(host, port, family=0, type=0, proto=0, flags=0):
+        calls.append(host)
+        if host == "missing.test":
+            raise socket.gaierror(-2, "Name or service not known")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.1', 0)),
+                (socket.AF_INET6, socket.SOCK_STREAM, 6, '', ('::1', 0, 0, 0))]
+    return resolve
+
+def test_url_hostname():
+    assert url_hostname("https://Example.COM:8443/page") == "example.com"
+    assert url_hostname(None) is None
+
+def test_resolve_hosts_once_per_host():
+    calls = []
+    cache = DnsCache(resolver=fake_resolver(calls))
+    assert cache.resolve_hosts(["http://a.test/1", "https://a.test/2", "http://missing.test/", None]) == 2
+    # Вже визначені хости (і з помилкою теж) повторно не запитуються
+    assert cache.resolve_hosts(["http://a.test/3", "http://missing.test/x"]) == 0
+    assert sorted(calls) == ["a.test", "missing.test"]
+    assert cache.failure("http://missing.test/page") == "[Errno -2] Name or service not known"
+    assert cache.failure("http://a.test/") is None
+    assert cache.resolved_urls(["http://a.test/1", "http://missing.test/"]) == ["http://a.test/1"]
+
+def test_lookup_fills_port_and_filters_family():
+    cache = DnsCache(resolver=fake_resolver([]))
+    cache.resolve_hosts(["http://a.test/"])
+    assert cache.lookup("a.test", 443, socket.AF_INET) == [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.1', 443))]
+    assert cache.lookup("A.test", "80")[1][4] == ('::1', 80, 0, 0)
+    assert cache.lookup("a.test", 53, type=socket.SOCK_DGRAM) is None
+    assert cache.lookup("other.test", 80) is None
+    assert cache.stats() == {"hosts": 1, "failed": 0, "transient": 0, "hits": 2}
+
+def test_transient_dns_error_not_cached_as_failure():
+    attempts = []
+
+    def flaky_resolver(host, port, family=0, type=0, proto=0, flags=0):
+        attempts.append(host)
+        if len(attempts) == 1:
+            raise socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('10.0.0.1', 0))]
+
+    cache = DnsCache(resolver=flaky_resolver)
+    cache.resolve_hosts(["http://a.test/"])
+    assert cache.failure("http://a.test/") is None # Рядок не завершується помилкою, з'єднання визначить хост саме
+    assert cache.stats() == {"hosts": 0, "failed": 0, "transient": 1, "hits": 0}
+    # Наступне визначення (наприклад, нове опитування) запитує хост знову
+    assert cache.resolve_hosts(["http://a.test/"]) == 1
+    assert cache.lookup("a.test", 80)[0][4] == ('10.0.0.1', 80)
+
+def test_active_cache_leaves_socket_getaddrinfo_alone():
+    original = socket.getaddrinfo
+    cache = DnsCache(resolver=fake_resolver([]))
+    cache.resolve_hosts(["http://a.test/"])
+    with activate_run(RunContext(dns_cache=cache)):
+        assert socket.getaddrinfo is original
+        assert dns_cache.get_dns_cache() is cache
+    assert dns_cache.get_dns_cache() is None
@@ -0,0 +1,72 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from freshness import RowFreshness, is_healthy_result
+
+HOUR = 3600
+
+def _row(url, anchor="anchor", target="http://target.com"):
+    return {"Url": url, "Анкор-1": anchor, "Урл-1": target, "Анкор-2": None, "Урл-2": None, "Анкор-3": None, "Урл-3": None}
+
+def _result(row, status=200, found="Так", match="Так", error=None):
+    result = dict(row)
+    result.update({"final_status_code": status, "error": error, "seo_check_error": None, "link_check_error": None,
+                   "url1_found": found, "anchor1_match": match})
+    return result
+
+@pytest.fixture
+def freshness(tmp_path):
+    store = RowFreshness(str(tmp_path / "cache.sqlite"), healthy_window=7 * 24 * HOUR, unhealthy_window=24 * HOUR)
+    yield store
+    store.close()
+
+@pytest.mark.parametrize("kwargs, expected", [
+    ({}, True),
+    ({"status": 404}, False),
+    ({"found": "Ні"}, False),
+    ({"match": "Ні"}, False),
+    ({"error": "SSL вимкнено: ..."}, False),
+])
+def test_is_healthy_result(kwargs, expected):
+    assert is_healthy_result(_result(_row("http://a.com/"), **kwargs)) is expected
+
+def test_select_rows_uses_separate_windows(freshness):
+    healthy, broken, new = _row("http://a.com/"), _row("http://b.com/"), _row("http://c.com/")
+    freshness.record([_result(healthy), _result(broken, found="Ні")], now=0)
+
+    # Через 2 години обидва рядки ще актуальні
+    to_check, skipped = freshness.select_rows([healthy, broken, new], now=2 * HOUR)
+    assert to_check == [new]
+    assert skipped == [healthy, broken]
+
+    # Через 2 дні проблемний рядок знову перевіряється, успішний - ні
+    to_check, skipped = freshness.select_rows([healthy, broken, new], now=48 * HOUR)
+    assert to_check == [new, broken]
+    assert skipped == [healthy]
+
+    # Через 8 днів перевіряються всі: нові, потім проблемні, потім успішні
+    to_check, _ = freshness.select_rows([healthy, broken, new], now=8 * 24 * HOUR)
+    assert to_check == [new, broken, healthy]
+
+def test_changed_pairs_make_row_due(freshness):
+    row = _row("http://a.com/")
+    freshness.record([_result(row)], now=0)
+    changed = _row("http://a.com/", anchor="new anchor")
+    to_check, _ = freshness.select_rows([changed], now=HOUR)
+    assert to_check == [changed]
+
+def test_row_key_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    row = _row("http://a.com")
+    store = RowFreshness(path)
+    store.record([_result(row)], now=0)
+    store.close()
+
+    reopened = RowFreshness(path)
+    # Url без завершального слеша та з ним - той самий рядок
+    assert reopened.select_rows([_row("http://a.com/")], now=HOUR)[0] == []
+    reopened.close()
@@ -6,6 +6,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 import pytest
 import pandas as pd
 import gspread
+import requests
 import re
 import ast
 
@@ -13,6 +14,8 @@ import gsheet_utils
 from gsheet_utils import (
     check_sheet_structure,
     update_sheet_with_results,
+    update_rows_with_results,
+    SheetUpdateError,
     handle_header_error,
     handle_missing_data_error,
     display_sheet_validation_results
@@ -156,6 +159,35 @@ def test_empty_table_for_update(capsys):
     assert ws.updated_ranges == []
     assert ws.batches == []
 
+def test_rows_sharing_donor_each_get_their_result():
+    # Два рядки з одним Url донора: кожен результат записується у свій рядок, а не обидва в останній
+    headers = ["Url", "Анкор-1", "Урл-1"]
+    ws = StubWorksheet(sheet_data=[headers.copy(), ["http://ex.com", "a1", "http://t1.com"], ["http://ex.com", "a2", "http://t2.com"]])
+    results = [
+        {"url": "http://ex.com", "Url": "http://ex.com", "Анкор-1": "a1", "Урл-1": "http://t1.com", "status_code": 200, "final_status_code": 200,
+         "redirect_chain": [], "url1_found": "Так", "anchor1_match": "Так"},
+        {"url": "http://ex.com", "Url": "http://ex.com", "Анкор-1": "a2", "Урл-1": "http://t2.com", "status_code": 200, "final_status_code": 200,
+         "redirect_chain": [], "url1_found": "Ні", "anchor1_match": "Ні"},
+    ]
+
+    update_sheet_with_results(ws, list(reversed(results)))
+
+    found_col = ws.sheet_data[0].index("Урл-1 наявність")
+    assert ws.sheet_data[1][found_col] == "Так"
+    assert ws.sheet_data[2][found_col] == "Ні"
+
+def test_identical_rows_each_get_a_result():
+    headers = ["Url", "Анкор-1", "Урл-1"]
+    row = ["http://ex.com", "a1", "http://t1.com"]
+    ws = StubWorksheet(sheet_data=[headers.copy(), row.copy(), row.copy()])
+    result = {"url": "http://ex.com", "Url": "http://ex.com", "Анкор-1": "a1", "Урл-1": "http://t1.com", "status_code": 200, "final_status_code": 200,
+              "redirect_chain": [], "url1_found": "Так", "anchor1_match": "Так"}
+
+    update_sheet_with_results(ws, [dict(result), dict(result)])
+
+    found_col = ws.sheet_data[0].index("Урл-1 наявність")
+    assert [ws.sheet_data[1][found_col], ws.sheet_data[2][found_col]] == ["Так", "Так"]
+
 def test_missing_url_column_update(capsys):
     headers = ["Анкор-1", "Урл-1", "Extra"]
     data = [headers, ["a1", "u1", "x"]]
@@ -201,6 +233,41 @@ def test_successful_update_with_new_headers():
     mapping = {upd['range']: upd['values'][0][0] for upd in first_batch}
     assert mapping == {"D2": "200"}
 
+def test_update_rows_with_results_writes_only_given_rows():
+    headers = ["Анкор-1", "Урл-1", "Url"]
+    data = [headers.copy(), ["a1", "u1", "http://old.com"], ["a1", "u1", "http://new.com"]]
+    ws = StubWorksheet(sheet_data=[list(r) for r in data])
+
+    new_headers = update_rows_with_results(ws, headers, [(3, {"url": "http://new.com", "status_code": 200})])
+
+    assert new_headers == ws.sheet_data[0]
+    assert "Status Code" in new_headers
+    mapping = {upd['range']: upd['values'][0][0] for batch in ws.batches for upd in batch}
+    assert mapping["D3"] == "200"
+    assert all(cell.endswith("3") for cell in mapping)
+    # Попередній рядок не змінюється
+    assert ws.sheet_data[1] == data[1]
+
+    # Повторний виклик з оновленими заголовками не змінює заголовки вдруге
+    update_rows_with_results(ws, new_headers, [(4, {"url": "http://newer.com", "status_code": 404})])
+    assert len(ws.updated_ranges) == 1
+
+def test_update_rows_with_results_raises_for_failed_batch():
+    headers = ["Анкор-1", "Урл-1", "Url"]
+    ws = StubWorksheet(sheet_data=[headers.copy(), ["a1", "u1", "http://a.com"], ["a1", "u1", "http://b.com"]])
+    def failing_batch_update(batch):
+        response = requests.Response()
+        response.status_code = 503
+        response._content = b'{"error": {"code": 503, "message": "Backend error", "status": "UNAVAILABLE"}}'
+        raise gspread.exceptions.APIError(response)
+    ws.batch_update = failing_batch_update
+
+    with pytest.raises(SheetUpdateError) as excinfo:
+        update_rows_with_results(ws, headers, [(2, {"url": "http://a.com", "status_code": 200}),
+                                               (3, {"url": "http://b.com", "status_code": 404})])
+    assert excinfo.value.rows == [2, 3]
+    assert "Status Code" in excinfo.value.headers
+
 # ---------- Тести для handle_header_error ----------
 
 def test_handle_header_error_wrong_order(capsys):
@@ -0,0 +1,69 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import host_breaker
+from host_breaker import HostCircuitBreaker, record_host_result
+from run_context import RunContext, activate_run
+
+URL = "https://down.example/page"
+
+def _breaker(now, **kwargs):
+    return HostCircuitBreaker(clock=lambda: now[0], **kwargs)
+
+def test_opens_after_consecutive_failures():
+    breaker = _breaker([0.0], failure_threshold=3, cool_down=60)
+    for _ in range(2):
+        breaker.record_failure(URL, "Connection refused")
+    assert breaker.rejection(URL) is None
+    breaker.record_failure("https://down.example/other", "Connection refused")
+    rejection = breaker.rejection(URL)
+    assert rejection.startswith("Хост недоступний: 3 помилок з'єднання поспіль (остання: Connection refused)")
+    assert breaker.rejection("https://up.example/") is None
+    assert breaker.stats() == {"open": 1, "opened": 1, "rejected": 1, "probes": 0}
+
+def test_success_resets_failure_count():
+    breaker = _breaker([0.0], failure_threshold=2)
+    breaker.record_failure(URL, "timeout")
+    breaker.record_success(URL)
+    breaker.record_failure(URL, "timeout")
+    assert breaker.rejection(URL) is None
+
+def test_one_probe_after_cool_down():
+    now = [0.0]
+    breaker = _breaker(now, failure_threshold=1, cool_down=60)
+    breaker.record_failure(URL, "timeout")
+    now[0] = 61
+    assert breaker.rejection(URL) is None # Пробний запит
+    assert breaker.rejection(URL) is not None # Решта чекає на його результат
+    breaker.record_success(URL)
+    assert breaker.rejection(URL) is None
+    assert breaker.stats()["probes"] == 1
+
+def test_failed_probe_reopens_for_another_cool_down():
+    now = [0.0]
+    breaker = _breaker(now, failure_threshold=1, cool_down=60)
+    breaker.record_failure(URL, "timeout")
+    now[0] = 61
+    assert breaker.rejection(URL) is None
+    breaker.record_failure(URL, "timeout")
+    now[0] = 100
+    assert breaker.rejection(URL) is not None
+    now[0] = 122
+    assert breaker.rejection(URL) is None
+    assert breaker.stats()["opened"] == 1
+
+def test_zero_threshold_disables_breaker():
+    breaker = _breaker([0.0], failure_threshold=0)
+    for _ in range(10):
+        breaker.record_failure(URL, "timeout")
+    assert breaker.rejection(URL) is None
+
+def test_record_host_result_uses_active_breaker():
+    breaker = _breaker([0.0], failure_threshold=1)
+    with activate_run(RunContext(host_breaker=breaker)):
+        record_host_result(URL, "Connection refused")
+    record_host_result(URL, "Connection refused") # Без активного запобіжника - нічого не відбувається
+    assert host_breaker.get_host_breaker() is None
+    assert breaker.rejection(URL) is not None
@@ -0,0 +1,97 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import host_scheduler
+from host_scheduler import HostScheduler, interleave_by_host, host_delay
+from run_context import RunContext, activate_run
+from timeouts import RowDeadlineExceeded, row_deadline
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Керований час замість time.monotonic
+    now = [1000.0]
+    monkeypatch.setattr(host_scheduler.time, "monotonic", lambda: now[0])
+    return now
+
+def test_interleave_alternates_hosts_and_keeps_host_order():
+    urls = ["http://a.com/1", "http://a.com/2", "http://a.com/3", "http://b.com/1", "http://c.com/1", "http://b.com/2"]
+    assert interleave_by_host(urls, lambda url: url) == [
+        "http://a.com/1", "http://b.com/1", "http://c.com/1", "http://a.com/2", "http://b.com/2", "http://a.com/3"]
+
+def test_interleave_window_limits_hosts_in_rotation():
+    # Лише два хости чергуються одночасно; c.com починається, коли b.com вичерпано
+    urls = ["http://a.com/1", "http://a.com/2", "http://a.com/3", "http://b.com/1", "http://c.com/1"]
+    assert interleave_by_host(urls, lambda url: url, window=2) == [
+        "http://a.com/1", "http://b.com/1", "http://a.com/2", "http://c.com/1", "http://a.com/3"]
+
+def test_token_bucket_allows_burst_then_paces_requests(clock):
+    scheduler = HostScheduler(rate=2, burst=3)
+    assert [scheduler.reserve("http://a.com/") for _ in range(3)] == [0, 0, 0]
+    assert scheduler.reserve("http://a.com/x") == pytest.approx(0.5)
+    assert scheduler.reserve("http://a.com/y") == pytest.approx(1.0)
+    assert scheduler.reserve("http://b.com/") == 0 # Інший хост має власне відро
+    clock[0] += 10
+    assert scheduler.reserve("http://a.com/") == 0
+    assert scheduler.stats() == {"crawl_delay_hosts": 0, "delayed": 2, "waited": 1.5}
+
+def test_crawl_delay_spaces_every_request_and_is_capped(clock):
+    scheduler = HostScheduler(rate=2, burst=3, max_crawl_delay=5)
+    scheduler.set_crawl_delay("https://a.com/robots.txt", 3)
+    scheduler.set_crawl_delay("https://b.com/robots.txt", 60)
+    assert [scheduler.reserve("https://a.com/page") for _ in range(3)] == [0, 3, 6]
+    assert [scheduler.reserve("https://b.com/page") for _ in range(2)] == [0, 5]
+    assert scheduler.stats()["crawl_delay_hosts"] == 2
+
+def test_wait_longer_than_row_deadline_is_not_reserved(clock):
+    scheduler = HostScheduler(rate=1, burst=1)
+    with activate_run(RunContext(host_scheduler=scheduler)):
+        assert host_delay("http://a.com/") == 0
+        with row_deadline(0.5):
+            with pytest.raises(RowDeadlineExceeded):
+                host_delay("http://a.com/")
+        assert host_delay("http://a.com/") == pytest.approx(1.0) # Невдала спроба нічого не забронювала
+
+def test_slot_limits_concurrent_checks_per_host():
+    scheduler = HostScheduler(max_per_host=2, rate=0)
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def check(url):
+        with scheduler.slot(url):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=check, args=(f"http://a.com/{n}",)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+
+def test_async_slot_limits_concurrent_checks_per_host():
+    scheduler = HostScheduler(max_per_host=1, rate=0)
+    active, peak = [0], [0]
+
+    async def check(url):
+        async with scheduler.async_slot(url):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.01)
+            active[0] -= 1
+
+    async def run():
+        await asyncio.gather(*(check(f"http://a.com/{n}") for n in range(4)), check("http://b.com/"))
+
+    asyncio.run(run())
+    assert peak[0] == 2 # По одному на a.com і b.com
@@ -0,0 +1,128 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import ssl
+
+import pytest
+import requests
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("h2")
+
+import http_client
+from http2_adapter import Http2Adapter
+from http_client import read_body, response_protocol
+
+def make_session(handler):
+    session = requests.Session()
+    session.mount("https://", Http2Adapter(transport=httpx.MockTransport(handler)))
+    return session
+
+def http2_response(status, **kwargs):
+    return httpx.Response(status, extensions={"http_version": b"HTTP/2"}, **kwargs)
+
+def test_response_built_from_http2_reply():
+    seen_headers = []
+    def handler(request):
+        seen_headers.append(request.headers)
+        return http2_response(200, headers={"Content-Type": "text/html; charset=utf-8", "Set-Cookie": "a=1"},
+                              content=b"<html>ok</html>")
+    response = make_session(handler).get("https://example.com/page", timeout=5)
+
+    assert response.status_code == 200
+    assert response.text == "<html>ok</html>"
+    assert response.encoding == "utf-8"
+    assert response.headers["content-type"] == "text/html; charset=utf-8"
+    assert response.http_version == "HTTP/2" and response_protocol(response) == "HTTP/2"
+    # Заголовки з'єднання HTTP/1.1 в HTTP/2 не надсилаються
+    assert "connection" not in seen_headers[0]
+    assert seen_headers[0]["user-agent"]
+
+def test_streamed_body_read_in_chunks():
+    body = b"x" * 100
+    response = make_session(lambda request: http2_response(200, content=body)).get("https://example.com/", stream=True, timeout=5)
+    assert read_body(response, max_bytes=40, chunk_size=16) == (body[:40], True, False)
+    response.close()
+
+def test_redirects_followed_by_session():
+    def handler(request):
+        if request.url.path == "/old":
+            return http2_response(301, headers={"Location": "https://example.com/new"})
+        return http2_response(200, content=b"new")
+    response = make_session(handler).head("https://example.com/old", allow_redirects=True, timeout=5)
+    assert [r.status_code for r in response.history] == [301]
+    assert response.url == "https://example.com/new"
+
+def test_ssl_error_mapped_for_fallback():
+    def handler(request):
+        try:
+            raise ssl.SSLCertVerificationError(1, "[SSL: CERTIFICATE_VERIFY_FAILED] certificate verify failed")
+        except ssl.SSLError as e:
+            raise httpx.ConnectError(str(e)) from e
+    with pytest.raises(requests.exceptions.SSLError):
+        make_session(handler).head("https://bad.example/", timeout=5)
+
+def test_ssl_in_message_without_ssl_cause_is_connection_error():
+    # Текст зі словом SSL без ssl.SSLError у ланцюжку - звичайна помилка з'єднання, без SSL-fallback
+    def handler(request):
+        raise httpx.ConnectError("Connection reset by peer (SSL port 443)")
+    with pytest.raises(requests.exceptions.ConnectionError) as excinfo:
+        make_session(handler).head("https://example.com/", timeout=5)
+    assert not isinstance(excinfo.value, requests.exceptions.SSLError)
+
+def test_utf8_location_kept_as_latin1_for_redirects():
+    # Сирий UTF-8 у Location: requests перекодовує його сам (як для http.client), без UnicodeEncodeError
+    def handler(request):
+        if request.url.path == "/old":
+            return http2_response(301, headers=[(b"Location", "/статья".encode("utf-8"))])
+        return http2_response(200, content=b"new")
+    session = make_session(handler)
+    response = session.head("https://example.com/old", allow_redirects=False, timeout=5)
+    assert session.get_redirect_target(response) == "/статья"
+    response = session.head("https://example.com/old", allow_redirects=True, timeout=5)
+    assert response.url == "https://example.com/%D1%81%D1%82%D0%B0%D1%82%D1%8C%D1%8F"
+
+def test_timeout_mapped():
+    def handler(request):
+        raise httpx.ReadTimeout("timed out")
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        make_session(handler).get("https://slow.example/", timeout=5)
+
+def test_protocol_error_falls_back_to_http1(monkeypatch):
+    calls = []
+    def handler(request):
+        calls.append(request.url.host)
+        raise httpx.RemoteProtocolError("GOAWAY")
+    adapter = Http2Adapter(transport=httpx.MockTransport(handler))
+    fallback_calls = []
+    def fallback_send(request, **kwargs):
+        fallback_calls.append(request.url)
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        return response
+    monkeypatch.setattr(adapter._fallback, "send", fallback_send)
+    session = requests.Session()
+    session.mount("https://", adapter)
+
+    assert session.head("https://h1.example/a", timeout=5).status_code == 200
+    assert session.head("https://h1.example/b", timeout=5).status_code == 200
+    # Після помилки протоколу origin більше не пробується через HTTP/2
+    assert calls == ["h1.example"]
+    assert fallback_calls == ["https://h1.example/a", "https://h1.example/b"]
+
+def test_configure_session_mounts_http2_and_counts_protocols(monkeypatch):
+    monkeypatch.setattr(http_client, "Http2Adapter", lambda **kwargs: Http2Adapter(
+        transport=httpx.MockTransport(lambda request: http2_response(200)), **kwargs))
+    http_client.configure_session(http2=True)
+    try:
+        session = http_client.get_session()
+        assert isinstance(session.get_adapter("https://example.com/"), Http2Adapter)
+        assert not isinstance(session.get_adapter("http://example.com/"), Http2Adapter)
+        http_client.protocol_stats(reset=True)
+        session.get("https://example.com/", timeout=5)
+        assert http_client.protocol_stats() == {"HTTP/2": 1}
+    finally:
+        http_client.configure_session(http2=False)
@@ -0,0 +1,125 @@
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+import http_client
+
+@pytest.fixture(autouse=True)
+def restore_settings():
+    # Кожен тест починає з налаштувань за замовчуванням
+    yield
+    http_client.configure_session(
+        pool_connections=http_client.DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize=http_client.DEFAULT_POOL_MAXSIZE,
+        user_agent=http_client.DEFAULT_USER_AGENT,
+        timeouts=http_client.DEFAULT_TIMEOUTS,
+    )
+
+# ------------------------ ТЕСТИ ДЛЯ get_session ------------------------
+
+def test_get_session_is_shared():
+    # Усі підсистеми отримують ту саму сесію, поки її не переналаштовано
+    assert http_client.get_session() is http_client.get_session()
+
+def test_session_uses_configured_pools_and_user_agent():
+    http_client.configure_session(pool_connections=7, pool_maxsize=3, user_agent="TestAgent/1.0")
+    session = http_client.get_session()
+    adapter = session.get_adapter("https://example.com")
+    assert adapter._pool_connections == 7
+    assert adapter._pool_maxsize == 3
+    assert session.headers["User-Agent"] == "TestAgent/1.0"
+    assert http_client.default_headers() == {"User-Agent": "TestAgent/1.0"}
+
+def test_configure_session_recreates_session():
+    first = http_client.get_session()
+    http_client.configure_session(pool_maxsize=20)
+    assert http_client.get_session() is not first
+    assert http_client.get_pool_maxsize() == 20
+
+# ------------------------ ТЕСТИ ДЛЯ get_timeout ------------------------
+
+def test_default_timeouts():
+    assert http_client.get_timeout("head") == 10
+    assert http_client.get_timeout("get") == 15
+    assert http_client.get_timeout("robots") == 5
+
+def test_configure_timeouts_partial_update():
+    http_client.configure_session(timeouts={"robots": 2})
+    assert http_client.get_timeout("robots") == 2
+    assert http_client.get_timeout("head") == 10
+
+# ------------------------ ТЕСТИ ДЛЯ read_body ------------------------
+
+class ChunkedResponse:
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self.consumed = 0
+    def iter_content(self, chunk_size=1):
+        for chunk in self._chunks:
+            self.consumed += 1
+            yield chunk
+
+def test_read_body_reads_everything_without_limits():
+    body, truncated, stopped = http_client.read_body(ChunkedResponse([b"ab", b"cd"]))
+    assert (body, truncated, stopped) == (b"abcd", False, False)
+
+def test_read_body_respects_byte_cap():
+    response = ChunkedResponse([b"abc", b"def", b"ghi"])
+    body, truncated, stopped = http_client.read_body(response, max_bytes=5)
+    assert (body, truncated, stopped) == (b"abcde", True, False)
+    assert response.consumed == 2
+
+def test_read_body_exact_cap_is_not_truncated():
+    body, truncated, _ = http_client.read_body(ChunkedResponse([b"abc"]), max_bytes=3)
+    assert (body, truncated) == (b"abc", False)
+
+def test_read_body_stops_early():
+    response = ChunkedResponse([b"<head>", b"</head>", b"rest"])
+    body, truncated, stopped = http_client.read_body(response, stop_when=lambda chunk: b"</head>" in chunk)
+    assert (body, truncated, stopped) == (b"<head></head>", False, True)
+    assert response.consumed == 2
+
+@pytest.mark.parametrize("status, content_range, received, expected", [
+    (200, None, 10, False),
+    (206, "bytes 0-9/100", 10, True),
+    (206, "bytes 0-9/10", 10, False),
+    (206, "bytes 0-9/*", 10, True),
+])
+def test_is_partial_content_truncated(status, content_range, received, expected):
+    headers = {"Content-Range": content_range} if content_range else {}
+    assert http_client.is_partial_content_truncated(status, headers, received) is expected
+
+def test_accepts_byte_ranges():
+    assert http_client.accepts_byte_ranges({"Accept-Ranges": "bytes"}) is True
+    assert http_client.accepts_byte_ranges({"Accept-Ranges": "none"}) is False
+    assert http_client.accepts_byte_ranges({}) is False
+
+def test_prewarmed_connection_is_reused_by_session():
+    # Попередньо відкрите з'єднання лежить у тому ж пулі, що й запити сесії: сервер бачить одне з'єднання
+    connections = []
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        def setup(self):
+            connections.append(self.client_address)
+            super().setup()
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        def log_message(self, *args):
+            pass
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/page"
+        assert http_client.prewarm_connections([url, url + "?x=1", "not a url"]) == 1
+        assert http_client.get_session().head(url, timeout=5).status_code == 200
+        assert len(connections) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -4,6 +4,7 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import pytest
+import time
 import types
 from unittest.mock import patch, MagicMock
 import requests
@@ -11,6 +12,7 @@ from urllib.parse import urlparse
 
 # Імпортуємо модуль, який тестуємо
 import indexing_checks
+from timeouts import RowDeadlineExceeded, row_deadline
 
 # --- ТЕСТИ ДЛЯ clean_url_for_indexing_check ---
 
@@ -134,7 +136,7 @@ def test_check_google_indexing_indexed(monkeypatch, mock_valueserp_indexed_respo
     def mock_get(*args, **kwargs):
         return mock_response
     
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
     
     result, query = indexing_checks.check_google_indexing('https://example.com', 'test_api_key')
     assert result is True
@@ -149,7 +151,7 @@ def test_check_google_indexing_not_indexed(monkeypatch, mock_valueserp_not_index
     def mock_get(*args, **kwargs):
         return mock_response
     
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
     
     result, query = indexing_checks.check_google_indexing('https://example.com', 'test_api_key')
     assert result is False
@@ -164,7 +166,7 @@ def test_check_google_indexing_no_search_information(monkeypatch):
     def mock_get(*args, **kwargs):
         return mock_response
     
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
     
     result, query = indexing_checks.check_google_indexing('https://example.com', 'test_api_key')
     assert result is False
@@ -175,7 +177,7 @@ def test_check_google_indexing_http_error(monkeypatch):
     def mock_get(*args, **kwargs):
         raise requests.exceptions.HTTPError("HTTP Error")
     
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
     
     result, query = indexing_checks.check_google_indexing('https://example.com', 'test_api_key')
     assert result is False
@@ -186,7 +188,7 @@ def test_check_google_indexing_connection_error(monkeypatch):
     def mock_get(*args, **kwargs):
         raise requests.exceptions.ConnectionError("Connection Error")
     
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
     
     result, query = indexing_checks.check_google_indexing('https://example.com', 'test_api_key')
     assert result is False
@@ -197,18 +199,32 @@ def test_check_google_indexing_timeout_error(monkeypatch):
     def mock_get(*args, **kwargs):
         raise requests.exceptions.Timeout("Timeout Error")
     
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
     
     result, query = indexing_checks.check_google_indexing('https://example.com', 'test_api_key')
     assert result is False
     assert query == 'site:example.com'
 
+def test_check_google_indexing_row_deadline_is_not_a_negative_result(monkeypatch):
+    # Таймаут, обрізаний до ліміту часу рядка, - невідомий результат, а не "не проіндексовано"
+    def mock_get(*args, **kwargs):
+        time.sleep(0.05)
+        raise requests.exceptions.ReadTimeout("Read timed out")
+
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
+
+    with row_deadline(0.02):
+        with pytest.raises(RowDeadlineExceeded):
+            indexing_checks.check_google_indexing('https://example.com', 'test_api_key')
+        with pytest.raises(RowDeadlineExceeded): # Часу вже немає - запит не надсилається
+            indexing_checks.check_google_indexing('https://example.com', 'test_api_key')
+
 def test_check_google_indexing_general_request_exception(monkeypatch):
     # Перевірка обробки загальних помилок запиту
     def mock_get(*args, **kwargs):
         raise requests.exceptions.RequestException("General Error")
     
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
     
     result, query = indexing_checks.check_google_indexing('https://example.com', 'test_api_key')
     assert result is False
@@ -223,7 +239,7 @@ def test_check_google_indexing_unexpected_response_format(monkeypatch):
     def mock_get(*args, **kwargs):
         return mock_response
     
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
     
     result, query = indexing_checks.check_google_indexing('https://example.com', 'test_api_key')
     assert result is False
@@ -238,7 +254,7 @@ def test_check_google_indexing_json_decode_error(monkeypatch):
     def mock_get(*args, **kwargs):
         return mock_response
     
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
     
     result, query = indexing_checks.check_google_indexing('https://example.com', 'test_api_key')
     assert result is False
@@ -307,7 +323,7 @@ def test_integration_format_and_check_indexed(monkeypatch, mock_valueserp_indexe
         assert actual_query == expected_query
         return mock_response
     
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
     
     # Перевіряємо результат
     result, query = indexing_checks.check_google_indexing(url, 'test_api_key')
@@ -328,7 +344,7 @@ def test_integration_format_and_check_not_indexed(monkeypatch, mock_valueserp_no
         assert actual_query == expected_query
         return mock_response
     
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
     
     result, query = indexing_checks.check_google_indexing(url, 'test_api_key')
     assert result is False
@@ -357,7 +373,7 @@ def test_integration_full_pipeline(monkeypatch, mock_valueserp_indexed_response)
         assert actual_query == search_query
         return mock_response
     
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(requests.Session, 'get', mock_get)
     
     # Перевіряємо результат повного циклу
     result, query = indexing_checks.check_google_indexing(url, 'test_api_key')
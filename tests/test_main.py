@@ -3,6 +3,17 @@ import pytest
 
 import main
 from main import main as run_main
+from dns_cache import DnsCache
+from sheet_writer import SheetWriter
+from gsheet_utils import SheetUpdateError
+
+def fake_resolver(host, port, family=0, type=0, proto=0, flags=0):
+    # Тести не роблять справжніх DNS-запитів
+    return [(2, 1, 6, '', ('127.0.0.1', port or 0))]
+
+@pytest.fixture(autouse=True)
+def offline_dns(monkeypatch):
+    monkeypatch.setattr(main, 'DnsCache', lambda: DnsCache(resolver=fake_resolver))
 
 # Допоміжний клас для результатів check_sheet_structure
 class DummyResult:
@@ -36,7 +47,7 @@ def test_main_success_flow(monkeypatch):
     monkeypatch.setattr(main, 'display_sheet_validation_results', lambda x: None)
     # Імітуємо, що перевірка URL повертає список результатів
     dummy_check_results = [{"Url": "http://example.com", "status": 200}]
-    monkeypatch.setattr(main, 'check_status_code_requests', lambda lst, api_key=None: dummy_check_results)
+    monkeypatch.setattr(main, 'check_status_code_requests', lambda lst, api_key=None, **kwargs: dummy_check_results)
     update_calls = []
     monkeypatch.setattr(main, 'update_sheet_with_results', lambda ws, res: update_calls.append((ws, res)))
     # Імітуємо auth без помилок
@@ -55,7 +66,7 @@ def test_main_skips_short_rows(monkeypatch, capsys):
 
     monkeypatch.setattr(main, 'check_sheet_structure', lambda x: dummy_result)
     monkeypatch.setattr(main, 'display_sheet_validation_results', lambda x: None)
-    monkeypatch.setattr(main, 'check_status_code_requests', lambda lst, api_key=None: [])
+    monkeypatch.setattr(main, 'check_status_code_requests', lambda lst, api_key=None, **kwargs: [])
     monkeypatch.setattr(main, 'update_sheet_with_results', lambda ws, res: None)
     # Імітуємо auth без помилок
     monkeypatch.setattr(main.auth, 'authenticate_user', lambda: None)
@@ -64,3 +75,185 @@ def test_main_skips_short_rows(monkeypatch, capsys):
     captured = capsys.readouterr()
     # Має бути попередження про пропуск короткого рядка
     assert "Пропускаємо короткий рядок" in captured.out
+
+# Тест для main: в інкрементальному режимі нещодавно перевірені рядки не перевіряються повторно
+def test_main_incremental_skips_fresh_rows(monkeypatch, tmp_path):
+    headers = ["Url", "Анкор-1", "Урл-1"]
+    rows = [["http://a.com/", "anchor", "http://target.com"], ["http://b.com/", "anchor", "http://target.com"]]
+    dummy_result = {"success": True, "data": [headers] + rows, "worksheet": object()}
+    monkeypatch.setattr(main, 'check_sheet_structure', lambda x: dummy_result)
+    monkeypatch.setattr(main, 'display_sheet_validation_results', lambda x: None)
+    monkeypatch.setattr(main.auth, 'authenticate_user', lambda: None)
+    monkeypatch.setattr(main, 'update_sheet_with_results', lambda ws, res: None)
+
+    checked = []
+    def fake_check(rows_to_check, api_key=None, **kwargs):
+        checked.append([r["Url"] for r in rows_to_check])
+        # Перший рядок успішний, у другого посилання не знайдено
+        return [dict(r, final_status_code=200, url1_found="Так" if r["Url"] == "http://a.com/" else "Ні", anchor1_match="Так")
+                for r in rows_to_check]
+    monkeypatch.setattr(main, 'check_status_code_requests', fake_check)
+
+    cache_db = str(tmp_path / "cache.sqlite")
+    run_main('test_sheet', cache_db_path=cache_db, incremental=True)
+    run_main('test_sheet', cache_db_path=cache_db, incremental=True, unhealthy_fresh_days=0)
+    assert checked == [["http://a.com/", "http://b.com/"], ["http://b.com/"]]
+
+# Тест для watch: опитується лише стовпець Url, перевіряються й записуються тільки нові рядки
+def test_watch_checks_only_new_rows(monkeypatch):
+    headers = ["Анкор-1", "Урл-1", "Url"]
+    rows = [["anchor", "http://target.com", "http://old.com/"]]
+
+    class FakeWorksheet:
+        def __init__(self):
+            self.appended = []
+            self.requested_ranges = []
+        def get(self, range_name):
+            self.requested_ranges.append(range_name)
+            start = int(range_name.split(":")[0][1:])
+            new_rows = [row for idx, row in enumerate(self.appended, start=len(rows) + 2) if idx >= start]
+            if range_name.startswith("C"):
+                return [[row[2]] for row in new_rows]
+            return new_rows
+
+    ws = FakeWorksheet()
+    monkeypatch.setattr(main, 'check_sheet_structure', lambda x: {"success": True, "data": [headers] + rows, "worksheet": ws})
+    monkeypatch.setattr(main, 'display_sheet_validation_results', lambda x: None)
+    monkeypatch.setattr(main.auth, 'authenticate_user', lambda: None)
+
+    # Між опитуваннями в таблицю дописується новий рядок
+    def fake_sleep(seconds):
+        if len(ws.appended) < 2:
+            ws.appended.append(["anchor", "http://target.com", f"http://new{len(ws.appended)}.com/"])
+    monkeypatch.setattr(main.time, 'sleep', fake_sleep)
+
+    checked = []
+    monkeypatch.setattr(main, 'check_status_code_requests',
+                        lambda lst, api_key=None, **kwargs: checked.append([r["Url"] for r in lst]) or [dict(r) for r in lst])
+    written = []
+    monkeypatch.setattr(main, 'update_rows_with_results',
+                        lambda worksheet, hdrs, row_results: written.append([(idx, r["Url"]) for idx, r in row_results]) or hdrs)
+
+    main.watch('test_sheet', poll_interval=0, max_polls=4)
+
+    assert checked == [["http://new0.com/"], ["http://new1.com/"]]
+    assert written == [[(3, "http://new0.com/")], [(4, "http://new1.com/")]]
+    assert ws.requested_ranges[0] == "C3:C"
+    assert "A3:C3" in ws.requested_ranges
+
+# Тест для main: хости донорів визначаються заздалегідь, кеш передається в перевірку
+def test_main_resolves_donor_hosts_before_checks(monkeypatch):
+    headers = ["Url", "Анкор-1", "Урл-1"]
+    rows = [["http://a.com/1", "anchor", "http://target.com"], ["http://a.com/2", "anchor", "http://target.com"],
+            ["http://b.com/", "anchor", "http://target.com"]]
+    monkeypatch.setattr(main, 'check_sheet_structure', lambda x: {"success": True, "data": [headers] + rows, "worksheet": object()})
+    monkeypatch.setattr(main, 'display_sheet_validation_results', lambda x: None)
+    monkeypatch.setattr(main.auth, 'authenticate_user', lambda: None)
+    monkeypatch.setattr(main, 'update_sheet_with_results', lambda ws, res: None)
+
+    resolved = []
+    def resolver(host, port, family=0, type=0, proto=0, flags=0):
+        resolved.append(host)
+        return fake_resolver(host, port)
+    monkeypatch.setattr(main, 'DnsCache', lambda: DnsCache(resolver=resolver))
+    passed = {}
+    monkeypatch.setattr(main, 'check_status_code_requests', lambda lst, api_key=None, **kwargs: passed.update(kwargs) or [])
+
+    run_main('test_sheet')
+    assert sorted(resolved) == ["a.com", "b.com"]
+    assert passed["run_context"].dns_cache.stats()["hosts"] == 2
+    assert passed["prewarm"] is False
+
+# Тест для main: через проксі хости визначає проксі, попереднього етапу DNS немає
+def test_main_skips_dns_preflight_with_proxies(monkeypatch):
+    headers = ["Url", "Анкор-1", "Урл-1"]
+    rows = [["http://a.com/1", "anchor", "http://target.com"]]
+    monkeypatch.setattr(main, 'check_sheet_structure', lambda x: {"success": True, "data": [headers] + rows, "worksheet": object()})
+    monkeypatch.setattr(main, 'display_sheet_validation_results', lambda x: None)
+    monkeypatch.setattr(main.auth, 'authenticate_user', lambda: None)
+    monkeypatch.setattr(main, 'update_sheet_with_results', lambda ws, res: None)
+    monkeypatch.setattr(main, 'DnsCache', lambda: pytest.fail("DNS не має визначатися локально"))
+    passed = {}
+    monkeypatch.setattr(main, 'check_status_code_requests', lambda lst, api_key=None, **kwargs: passed.update(kwargs) or [])
+
+    run_main('test_sheet', proxies=["http://127.0.0.1:3128"])
+    assert passed["run_context"].dns_cache is None
+    assert passed["run_context"].proxy_pool is not None
+
+# Тест для main: з write_batch_rows результати записуються етапом запису під час перевірки, а не після
+def test_main_streams_results_to_sheet(monkeypatch):
+    headers = ["Url", "Анкор-1", "Урл-1"]
+    rows = [["http://a.com/", "anchor", "http://target.com"], ["", "anchor", "http://target.com"],
+            ["http://b.com/", "anchor", "http://target.com"], ["http://c.com/", "anchor", "http://target.com"]]
+    monkeypatch.setattr(main, 'check_sheet_structure', lambda x: {"success": True, "data": [headers] + rows, "worksheet": object()})
+    monkeypatch.setattr(main, 'display_sheet_validation_results', lambda x: None)
+    monkeypatch.setattr(main.auth, 'authenticate_user', lambda: None)
+    monkeypatch.setattr(main, 'update_sheet_with_results', lambda ws, res: (_ for _ in ()).throw(Exception("Should not be called")))
+    written = []
+    fake_write = lambda ws, hdrs, row_results: written.append([(idx, r["Url"]) for idx, r in row_results]) or hdrs
+    monkeypatch.setattr(main, 'SheetWriter', lambda *args, **kwargs: SheetWriter(*args, write_rows=fake_write, **kwargs))
+
+    def fake_check(rows_to_check, api_key=None, on_result=None, **kwargs):
+        results = [dict(r, url=r["Url"]) for r in rows_to_check]
+        on_result(results[0]) # c.com "відновлено з контрольної точки" - on_result для нього не викликається
+        on_result(results[1])
+        return results
+    monkeypatch.setattr(main, 'check_status_code_requests', fake_check)
+
+    run_main('test_sheet', write_batch_rows=2)
+    assert written == [[(2, "http://a.com/"), (4, "http://b.com/")], [(5, "http://c.com/")]]
+
+# Тест для main: контрольна точка видаляється лише після успішного запису всіх результатів у таблицю
+@pytest.mark.parametrize("write_batch_rows", [0, 2])
+@pytest.mark.parametrize("write_fails", [False, True])
+def test_main_keeps_checkpoint_when_sheet_write_fails(monkeypatch, tmp_path, write_batch_rows, write_fails):
+    headers = ["Url", "Анкор-1", "Урл-1"]
+    rows = [["http://a.com/", "anchor", "http://target.com"], ["http://b.com/", "anchor", "http://target.com"]]
+    monkeypatch.setattr(main, 'check_sheet_structure', lambda x: {"success": True, "data": [headers] + rows, "worksheet": object()})
+    monkeypatch.setattr(main, 'display_sheet_validation_results', lambda x: None)
+    monkeypatch.setattr(main.auth, 'authenticate_user', lambda: None)
+
+    def write(*args):
+        if write_fails:
+            raise SheetUpdateError("Не вдалося записати в таблицю рядки (1): 3", [3], headers)
+        return headers
+    monkeypatch.setattr(main, 'update_sheet_with_results', write)
+    monkeypatch.setattr(main, 'update_rows_with_results', write)
+    monkeypatch.setattr(main, 'SheetWriter', lambda *args, **kwargs: SheetWriter(*args, write_rows=write, **kwargs))
+
+    def fake_check(rows_to_check, api_key=None, checkpoint=None, on_result=None, **kwargs):
+        results = [dict(r, url=r["Url"]) for r in rows_to_check]
+        for check_result in results:
+            checkpoint.append(check_result)
+            if on_result is not None:
+                on_result(check_result)
+        return results
+    monkeypatch.setattr(main, 'check_status_code_requests', fake_check)
+
+    checkpoint_path = tmp_path / "checkpoint.jsonl"
+    run_main('test_sheet', checkpoint_path=str(checkpoint_path), write_batch_rows=write_batch_rows)
+    assert checkpoint_path.exists() == write_fails
+
+# Тест для main: рядки, результати яких не записано в таблицю, не позначаються актуальними
+def test_main_incremental_rechecks_rows_not_written(monkeypatch, tmp_path):
+    headers = ["Url", "Анкор-1", "Урл-1"]
+    rows = [["http://a.com/", "anchor", "http://target.com"], ["http://b.com/", "anchor", "http://target.com"]]
+    monkeypatch.setattr(main, 'check_sheet_structure', lambda x: {"success": True, "data": [headers] + rows, "worksheet": object()})
+    monkeypatch.setattr(main, 'display_sheet_validation_results', lambda x: None)
+    monkeypatch.setattr(main.auth, 'authenticate_user', lambda: None)
+
+    write_failures = [SheetUpdateError("Не вдалося записати в таблицю рядки (1): 3", [3], headers)]
+    def write(ws, res):
+        if write_failures:
+            raise write_failures.pop()
+    monkeypatch.setattr(main, 'update_sheet_with_results', write)
+    checked = []
+    def fake_check(rows_to_check, api_key=None, **kwargs):
+        checked.append([r["Url"] for r in rows_to_check])
+        return [dict(r, final_status_code=200, url1_found="Так", anchor1_match="Так") for r in rows_to_check]
+    monkeypatch.setattr(main, 'check_status_code_requests', fake_check)
+
+    cache_db = str(tmp_path / "cache.sqlite")
+    run_main('test_sheet', cache_db_path=cache_db, incremental=True)
+    run_main('test_sheet', cache_db_path=cache_db, incremental=True)
+    assert checked == [["http://a.com/", "http://b.com/"], ["http://b.com/"]]
@@ -0,0 +1,73 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+import page_cache
+import request_processor
+from page_cache import PageCache, page_inputs_key, content_hash
+
+PAIRS = ("anchor", "http://target.com", None, None, None, None)
+RESULTS = {
+    "indexing_directives": {"noindex": False, "nofollow": False, "source": None},
+    "canonical_url": "http://example.com/",
+    "url1_found": "Так", "anchor1_match": "Так", "url1_rel": None,
+    "url2_found": "Н/Д", "anchor2_match": "Н/Д", "url2_rel": None,
+    "url3_found": "Н/Д", "anchor3_match": "Н/Д", "url3_rel": None,
+    "page_truncated": False,
+    "google_indexing": "Так",  # не залежить від вмісту сторінки - не зберігається
+}
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PageCache(str(tmp_path / "cache.sqlite"))
+    yield cache
+    cache.close()
+
+def test_inputs_key_treats_nan_as_empty():
+    assert page_inputs_key([("a", "u", float("nan"), None, None, None)]) == page_inputs_key([("a", "u", None, None, None, None)])
+    assert page_inputs_key([PAIRS]) != page_inputs_key([("other", "http://target.com", None, None, None, None)])
+    # Ключ залежить від пар усіх рядків донора та їхнього порядку
+    assert page_inputs_key([PAIRS]) != page_inputs_key([PAIRS, PAIRS])
+    assert page_inputs_key([PAIRS, ("b", "u", None, None, None, None)]) != page_inputs_key([("b", "u", None, None, None, None), PAIRS])
+
+def test_content_hash_includes_x_robots_tag():
+    assert content_hash("<html></html>", {}) == content_hash("<html></html>", {})
+    assert content_hash("<html></html>", {}) != content_hash("<html></html>", {"X-Robots-Tag": "noindex"})
+
+def test_lookup_requires_same_inputs(cache):
+    key = page_inputs_key([PAIRS])
+    cache.save("http://example.com/", key, {"ETag": '"v1"'}, "hash", [RESULTS])
+
+    record = cache.lookup("http://example.com/", key)
+    assert record["body_hash"] == "hash"
+    assert record["results"][0]["anchor1_match"] == "Так"
+    assert "google_indexing" not in record["results"][0]
+    assert PageCache.conditional_headers(record) == {"If-None-Match": '"v1"'}
+    assert cache.lookup("http://example.com/", page_inputs_key([("other", "http://target.com", None, None, None, None)])) is None
+    assert cache.lookup("http://example.com/other", key) is None
+
+def test_reuse_page_results(cache):
+    record = {"body_hash": content_hash("<html></html>", {}), "results": RESULTS}
+    assert request_processor._reuse_page_results(cache, record, None, {})[0] is RESULTS
+    assert request_processor._reuse_page_results(cache, record, "<html></html>", {})[0] is RESULTS
+    assert request_processor._reuse_page_results(cache, record, "<html>new</html>", {})[0] is None
+    assert request_processor._reuse_page_results(cache, None, "<html></html>", {})[0] is None
+    assert cache.stats() == {"not_modified": 1, "same_content": 1, "parsed": 2}
+
+def test_cached_page_results_skip_parsing(monkeypatch):
+    # Для незміненої сторінки HTML не парситься, robots.txt перевіряється як завжди
+    monkeypatch.setattr(request_processor, 'check_robots_txt', lambda *args, **kwargs: True)
+    fail = lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError("не має викликатися"))
+    monkeypatch.setattr(request_processor, 'check_indexing_directives', fail)
+    monkeypatch.setattr(request_processor, 'check_canonical_tag', fail)
+    monkeypatch.setattr(request_processor, 'check_links_on_page', fail)
+
+    result, = request_processor._perform_seo_and_link_checks("http://example.com/", None, {}, [PAIRS], page_results=[RESULTS])
+    assert result["robots_star_allowed"] is True
+    assert result["canonical_url"] == "http://example.com/"
+    assert result["anchor1_match"] == "Так"
+    assert result["seo_check_error"] is None
+    assert "google_indexing" not in result
@@ -0,0 +1,116 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+import time
+
+import requests
+
+import proxy_pool
+from proxy_pool import ProxyPool, is_proxy_failure, is_connection_failure
+from timeouts import RowDeadlineExceeded
+
+P1, P2 = "http://proxy1:8080", "http://proxy2:8080"
+
+def test_host_sticks_to_its_proxy():
+    pool = ProxyPool([P1, P2])
+    first = pool.proxy_for("https://a.example/page")
+    assert pool.proxy_for("https://a.example/other") == first
+    with pool.slot(first):
+        # Новий хост отримує менш завантажений проксі
+        assert pool.proxy_for("https://b.example/") != first
+
+def test_banned_proxy_removed_and_hosts_reassigned():
+    now = [0.0]
+    pool = ProxyPool([P1, P2], ban_hosts=3, cool_down=60, clock=lambda: now[0])
+    assert pool.proxy_for("https://a.example/") == P1
+    pool.observe(P1, 0.1, 429, url="https://b.example/")
+    pool.observe(P1, 0.1, 200, url="https://b.example/") # Успіх обнуляє лічильник помилок поспіль
+    for host in ("a", "b", "c"):
+        pool.observe(P1, 0.1, 403, url=f"https://{host}.example/")
+    assert pool.proxy_for("https://a.example/") == P2
+    assert pool.stats()["healthy"] == 1
+    now[0] = 61
+    assert pool.stats()["healthy"] == 2 # Після паузи проксі повертається в ротацію
+    assert pool.proxy_for("https://a.example/") == P2 # Хост не перескакує назад
+
+def test_failures_of_one_donor_keep_proxy_in_rotation():
+    # Недоступний донор чи його 403 - не привід виводити проксі разом з усіма його хостами
+    pool = ProxyPool([P1, P2], max_failures=3, ban_hosts=3)
+    assert pool.proxy_for("https://dead.example/") == P1
+    for _ in range(5):
+        pool.observe(P1, failed=True, url="https://dead.example/")
+        pool.observe(P1, 0.1, 403, url="https://dead.example/page")
+    assert pool.stats()["removals"] == 0
+    for _ in range(3):
+        pool.observe(P1, 0.1, 407, url="https://dead.example/") # А власні помилки проксі - привід
+    assert pool.stats()["removals"] == 1
+
+def test_slow_proxy_removed_by_smoothed_latency():
+    pool = ProxyPool([P1, P2], max_latency=2)
+    pool.proxy_for("https://a.example/")
+    for _ in range(2):
+        pool.observe(P1, 5, 200)
+    assert pool.stats()["removals"] == 0 # Замало відповідей для оцінки
+    pool.observe(P1, 5, 200)
+    assert pool.stats()["removals"] == 1
+    assert pool.proxy_for("https://a.example/") == P2
+
+def test_direct_when_no_healthy_proxy_or_direct_host():
+    pool = ProxyPool([P1], max_failures=1)
+    assert pool.proxy_for("https://api.valueserp.com/search") is None
+    pool.observe(P1, proxy_error=True)
+    assert pool.proxy_for("https://a.example/") is None
+    assert pool.stats()["direct"] == 1
+
+def test_socks_proxy_skipped_without_pysocks_and_for_asyncio(monkeypatch):
+    monkeypatch.setattr(proxy_pool, "socks_available", lambda: False)
+    assert len(ProxyPool(["socks5://proxy3:1080", P1])) == 1
+    monkeypatch.setattr(proxy_pool, "socks_available", lambda: True)
+    pool = ProxyPool(["socks5://proxy3:1080", P1])
+    assert pool.proxy_for("https://a.example/") == "socks5://proxy3:1080"
+    assert pool.proxy_for("https://a.example/", allow_socks=False) == P1
+
+def test_slot_limits_concurrency_per_proxy():
+    pool = ProxyPool([P1], max_per_proxy=2)
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def request():
+        with pool.slot(P1):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+    assert pool.stats()["requests"] == 6
+
+def test_proxy_failure_excludes_ssl_and_row_deadline():
+    assert is_proxy_failure(requests.exceptions.ProxyError("refused"))
+    assert not is_proxy_failure(requests.exceptions.ReadTimeout("slow"))
+    assert is_connection_failure(requests.exceptions.ReadTimeout("slow"))
+    assert not is_connection_failure(requests.exceptions.SSLError("bad cert"))
+    assert not is_connection_failure(RowDeadlineExceeded("deadline"))
+
+def test_socks_handshake_error_is_proxy_failure():
+    # Помилка PySocks загорнута в ConnectionError requests, як її віддає urllib3
+    socks_error = type("ProxyConnectionError", (Exception,), {"__module__": "socks"})("Error connecting to SOCKS5 proxy")
+    try:
+        try:
+            raise socks_error
+        except Exception:
+            raise OSError("Failed to establish a new connection")
+    except OSError as new_connection_error:
+        error = requests.exceptions.ConnectionError(new_connection_error)
+    assert is_proxy_failure(error)
+    host_unreachable = type("SOCKS5Error", (Exception,), {"__module__": "socks"})("0x04: Host unreachable")
+    assert not is_proxy_failure(requests.exceptions.ConnectionError(host_unreachable))
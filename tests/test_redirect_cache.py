@@ -0,0 +1,75 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+import requests
+
+from redirect_cache import RedirectCache, RedirectHop, RedirectLoopError, RedirectWalk
+from run_context import RunContext, activate_run
+
+@pytest.fixture
+def cache():
+    cache = RedirectCache()
+    with activate_run(RunContext(redirect_cache=cache)):
+        yield cache
+
+def test_only_permanent_redirects_cached():
+    cache = RedirectCache()
+    cache.remember("http://a.example/x", "http://a.example/x", 301, "http://a.example/x/")
+    cache.remember("http://b.example/x", "http://b.example/x", 302, "http://b.example/y")
+    assert cache.lookup("http://a.example/x") == ("http://a.example/x", 301, "http://a.example/x/")
+    assert cache.lookup("http://b.example/x") is None
+    assert cache.stats() == {"hops": 1, "rules": 0, "hits": 1, "rule_hits": 0}
+
+def test_origin_rule_learned_from_two_paths():
+    cache = RedirectCache()
+    cache.remember("http://a.example/one", "http://a.example/one", 301, "https://a.example/one")
+    assert cache.lookup("http://a.example/new?q=1") is None
+    cache.remember("http://a.example/two", "http://a.example/two", 301, "https://a.example/two")
+    assert cache.lookup("http://a.example/new?q=1") == ("http://a.example/new?q=1", 301, "https://a.example/new?q=1")
+    assert cache.lookup("http://a.example") == ("http://a.example", 301, "https://a.example/")
+    assert cache.stats()["rule_hits"] == 2
+
+def test_trailing_slash_redirects_stay_per_url():
+    cache = RedirectCache()
+    for path in ("/one", "/two"):
+        cache.remember(f"http://a.example{path}", f"http://a.example{path}", 301, f"http://a.example{path}/")
+    assert cache.lookup("http://a.example/three") is None
+    assert cache.stats()["rules"] == 0
+
+def test_final_response_blocks_origin_rule():
+    cache = RedirectCache()
+    cache.remember("http://a.example/one", "http://a.example/one", 301, "https://a.example/one")
+    cache.observe_final("http://a.example/robots-free")
+    cache.remember("http://a.example/two", "http://a.example/two", 301, "https://a.example/two")
+    assert cache.lookup("http://a.example/new") is None
+    assert cache.stats()["rules"] == 0
+
+def test_walk_skips_cached_hops(cache):
+    cache.remember("http://a.example/old", "http://a.example/old", 301, "https://a.example/")
+    walk = RedirectWalk("http://a.example/old")
+    assert walk.next_url() == "https://a.example/"
+    walk.finish()
+    assert walk.hops == [RedirectHop("http://a.example/old", 301)]
+
+def test_walk_follows_relative_location(cache):
+    walk = RedirectWalk("http://a.example/old")
+    walk.follow("http://a.example/old", 308, "/new")
+    assert walk.next_url() == "http://a.example/new"
+    assert cache.lookup("http://a.example/old")[2] == "http://a.example/new"
+
+def test_walk_detects_loop():
+    walk = RedirectWalk("http://a.example/a")
+    walk.follow("http://a.example/a", 302, "/b")
+    with pytest.raises(RedirectLoopError, match="Цикл редиректів"):
+        walk.follow("http://a.example/b", 302, "/a")
+
+def test_walk_limits_hops(cache):
+    cache.max_hops = 2
+    walk = RedirectWalk("http://a.example/0")
+    walk.follow("http://a.example/0", 302, "/1")
+    walk.follow("http://a.example/1", 302, "/2")
+    with pytest.raises(requests.exceptions.TooManyRedirects, match="понад 2"):
+        walk.follow("http://a.example/2", 302, "/3")
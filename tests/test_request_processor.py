@@ -1,10 +1,13 @@
 import os
 import sys
+import socket
 # Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модулі
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pytest
 import request_processor
+from dns_cache import DnsCache
+from run_context import RunContext
 from request_processor import (
     _perform_seo_and_link_checks,
     _process_response
@@ -21,7 +24,7 @@ def stub_check_indexing_directives(url, headers, html):
 def stub_check_canonical_tag(url, html):
     return url + '/canonical'
 
-def stub_check_links_on_page(html, page_url, a1, u1, a2, u2, a3, u3):
+def stub_check_links_on_page(html, page_url, a1, u1, a2, u2, a3, u3, **kwargs):
     return {
         'url1_found': 'Так', 'anchor1_match': 'Так', 'url1_rel': None,
         'url2_found': 'Ні', 'anchor2_match': 'Ні', 'url2_rel': None,
@@ -40,10 +43,9 @@ def patch_dependencies(monkeypatch):
 # ------------------ Тести для _perform_seo_and_link_checks ------------------
 
 def test_perform_seo_and_link_checks_success():
-    result = _perform_seo_and_link_checks(
+    result, = _perform_seo_and_link_checks(
         final_url='http://example.com', html_content='<html/>',
-        get_headers={'H': 'V'}, anchor1='a1', url1='u1',
-        anchor2='a2', url2='u2', anchor3='a3', url3='u3', verify_ssl=False
+        get_headers={'H': 'V'}, pairs_list=[('a1', 'u1', 'a2', 'u2', 'a3', 'u3')], verify_ssl=False
     )
     assert result['robots_star_allowed'] is True
     assert result['robots_googlebot_allowed'] is False
@@ -68,7 +70,7 @@ def test_indexing_directives_receives_headers(monkeypatch):
         'url2_found':'Ні','anchor2_match':'Ні','url2_rel':None,
         'url3_found':'Ні','anchor3_match':'Ні','url3_rel':None,'error':None
     })
-    _perform_seo_and_link_checks('url','html',{'X':'Y'},'','','','','','')
+    _perform_seo_and_link_checks('url','html',{'X':'Y'},[('','','','','','')])
     assert captured['headers'] == {'X': 'Y'}
 
 
@@ -79,7 +81,7 @@ def test_seo_check_exception(monkeypatch):
     monkeypatch.setattr(request_processor, 'check_indexing_directives', stub_check_indexing_directives)
     monkeypatch.setattr(request_processor, 'check_canonical_tag', stub_check_canonical_tag)
     monkeypatch.setattr(request_processor, 'check_links_on_page', stub_check_links_on_page)
-    result = _perform_seo_and_link_checks('u','h',{},'','','','','','')
+    result, = _perform_seo_and_link_checks('u','h',{},[('','','','','','')])
     assert 'seo_check_error' in result
     assert 'robots error' in result['seo_check_error']
 
@@ -91,7 +93,7 @@ def test_link_check_error_leads_to_link_check_error_field(monkeypatch):
     def fake_clop(*args, **kwargs):
         return {'error': 'link parse fail'}
     monkeypatch.setattr(request_processor, 'check_links_on_page', fake_clop)
-    result = _perform_seo_and_link_checks('u','h',{},'','','','','','')
+    result, = _perform_seo_and_link_checks('u','h',{},[('','','','','','')])
     assert result['link_check_error'] == 'link parse fail'
     assert result['seo_check_error'] is None
 
@@ -105,7 +107,7 @@ def test_verify_ssl_forwarded(monkeypatch):
     monkeypatch.setattr(request_processor, 'check_indexing_directives', stub_check_indexing_directives)
     monkeypatch.setattr(request_processor, 'check_canonical_tag', stub_check_canonical_tag)
     monkeypatch.setattr(request_processor, 'check_links_on_page', stub_check_links_on_page)
-    _perform_seo_and_link_checks('u','h',{},'','','','','','', verify_ssl=True)
+    _perform_seo_and_link_checks('u','h',{},[('','','','','','')], verify_ssl=True)
     assert calls[0] == ('*', True)
     assert calls[1] == ('Googlebot', True)
 
@@ -144,6 +146,12 @@ def test_process_response_with_redirects(monkeypatch):
 
 # ------------------ Тести для check_status_code_requests ------------------
 
+class FakeSession:
+    # Заглушка спільної сесії http_client з заданими методами head/get
+    def __init__(self, head=None, get=None):
+        self.head = head
+        self.get = get
+
 def test_empty_url_skipped():
     # Рядок з відсутнім URL має бути пропущений з помилкою
     rows = [
@@ -165,6 +173,8 @@ def test_successful_status_and_seo(monkeypatch):
             self.status_code = 200
             self.content = b'<html></html>'
             self.headers = {'H': 'V'}
+        def iter_content(self, chunk_size=1):
+            yield self.content
         def raise_for_status(self):
             pass
         def __enter__(self):
@@ -172,11 +182,12 @@ def test_successful_status_and_seo(monkeypatch):
         def __exit__(self, exc_type, exc_val, exc_tb):
             return False
 
-    # Патчимо HEAD, GET, detect_encoding та SEO-функцію
-    monkeypatch.setattr(request_processor.requests, 'head', lambda url, allow_redirects, timeout, headers, verify: HeadResp())
-    monkeypatch.setattr(request_processor.requests, 'get', lambda url, timeout, headers, verify: GetResp())
+    # Патчимо HEAD/GET спільної сесії, detect_encoding та SEO-функцію
+    monkeypatch.setattr(request_processor, 'get_session', lambda: FakeSession(
+        head=lambda url, allow_redirects, timeout, verify: HeadResp(),
+        get=lambda url, timeout, verify, **kwargs: GetResp()))
     monkeypatch.setattr(request_processor, 'detect_encoding', lambda b: 'utf-8')
-    monkeypatch.setattr(request_processor, '_perform_seo_and_link_checks', lambda final_url, html, get_headers, a1,u1,a2,u2,a3,u3, verify_ssl: {
+    monkeypatch.setattr(request_processor, '_perform_seo_and_link_checks', lambda final_url, html, get_headers, pairs_list, verify_ssl, **kwargs: [{
         'robots_star_allowed': True,
         'robots_googlebot_allowed': True,
         'indexing_directives': {'noindex': False, 'nofollow': False, 'source': 'stub'},
@@ -185,7 +196,7 @@ def test_successful_status_and_seo(monkeypatch):
         'url2_found': 'Ні', 'anchor2_match': 'Ні', 'url2_rel': None,
         'url3_found': 'Ні', 'anchor3_match': 'Ні', 'url3_rel': None,
         'error': None
-    })
+    }])
 
     rows = [{"Url": "http://example.com", "Анкор-1": "a1", "Урл-1": "u1",
              "Анкор-2": None, "Урл-2": None, "Анкор-3": None, "Урл-3": None}]
@@ -201,7 +212,8 @@ def test_successful_status_and_seo(monkeypatch):
 
 def test_head_request_exception_non_ssl(monkeypatch):
     # HEAD кине RequestException без SSL-помилки
-    monkeypatch.setattr(request_processor.requests, 'head', lambda *args, **kwargs: (_ for _ in ()).throw(request_processor.requests.exceptions.RequestException('conn fail')))
+    monkeypatch.setattr(request_processor, 'get_session', lambda: FakeSession(
+        head=lambda *args, **kwargs: (_ for _ in ()).throw(request_processor.requests.exceptions.RequestException('conn fail'))))
     monkeypatch.setattr(request_processor, 'is_ssl_error', lambda e: False)
 
     rows = [{"Url": "http://example.com", "Анкор-1": None, "Урл-1": None, "Анкор-2": None, "Урл-2": None, "Анкор-3": None, "Урл-3": None}]
@@ -211,3 +223,192 @@ def test_head_request_exception_non_ssl(monkeypatch):
     # При помилці HEAD і не-SSL, final_status_code має бути 0, error містить повідомлення
     assert r['final_status_code'] == 0
     assert r['error'] == 'conn fail'
+
+
+def test_group_rows_by_donor():
+    rows = [{"Url": "http://a.com"}, {"Url": "http://b.com/"}, {"Url": None}, {"Url": "http://a.com/"}, {"Url": None}]
+    groups = request_processor._group_rows_by_donor(rows)
+    assert [[position for position, _ in group] for group in groups] == [[0, 3], [1], [2], [4]]
+
+def test_rows_with_same_donor_checked_once(monkeypatch):
+    # Один HEAD і одна перевірка сторінки на донора; результати посилань - свої для кожного рядка
+    head_calls = []
+    class HeadResp:
+        status_code = 404
+        url = 'http://example.com/'
+        history = []
+    monkeypatch.setattr(request_processor, 'get_session', lambda: FakeSession(head=lambda url, **kwargs: head_calls.append(url) or HeadResp()))
+
+    rows = [{"Url": "http://example.com", "Анкор-1": "a1"}, {"Url": "http://other.com/"}, {"Url": "http://example.com/", "Анкор-1": "a2"}]
+    results = request_processor.check_status_code_requests(rows)
+
+    assert head_calls == ["http://example.com", "http://other.com/"]
+    assert [r["url"] for r in results] == [row["Url"] for row in rows]
+    assert [r.get("Анкор-1") for r in results] == ["a1", None, "a2"]
+    assert results[2]["final_status_code"] == 404
+
+# ------------------ Тести для паралельного режиму ------------------
+
+def test_concurrent_mode_preserves_row_order(monkeypatch):
+    # Рядки, що завершуються раніше, не повинні змінювати порядок результатів
+    import time
+    def fake_check_row(i, row_info, *args, **kwargs):
+        time.sleep(0.05 * (4 - i))
+        return {"url": row_info["Url"], "final_status_code": 200, "error": None, "ssl_disabled": False}
+    monkeypatch.setattr(request_processor, '_check_row', fake_check_row)
+
+    rows = [{"Url": f"http://example.com/{n}"} for n in range(1, 4)]
+    results = request_processor.check_status_code_requests(rows, max_workers=3)
+
+    assert [r["url"] for r in results] == [row["Url"] for row in rows]
+
+
+def test_concurrent_mode_output_not_interleaved(monkeypatch, capsys):
+    # Вивід кожного рядка має друкуватися суцільним блоком
+    import time
+    def fake_check_row(i, row_info, *args, **kwargs):
+        for step in range(3):
+            print(f"row{i}-step{step}")
+            time.sleep(0.01)
+        return {"url": row_info["Url"], "final_status_code": 0, "error": "x", "ssl_disabled": False}
+    monkeypatch.setattr(request_processor, '_check_row', fake_check_row)
+
+    rows = [{"Url": f"http://example.com/{n}"} for n in range(1, 5)]
+    request_processor.check_status_code_requests(rows, max_workers=4)
+
+    lines = [l for l in capsys.readouterr().out.splitlines() if l.startswith("row")]
+    assert len(lines) == 12
+    for start in range(0, 12, 3):
+        block = lines[start:start + 3]
+        row_prefix = block[0].split("-")[0]
+        assert block == [f"{row_prefix}-step{step}" for step in range(3)]
+
+
+# ------------------ Тести для режиму одного GET ------------------
+
+class StreamedGetResp:
+    # Відповідь потокового GET з редиректом; рахує читання тіла
+    def __init__(self, content_type='text/html; charset=utf-8'):
+        hop = type('Hop', (), {'status_code': 301, 'url': 'http://example.com/old'})()
+        self.status_code = 200
+        self.url = 'http://example.com/new'
+        self.history = [hop]
+        self.headers = {'Content-Type': content_type}
+        self.content_reads = 0
+        self.closed = False
+    def iter_content(self, chunk_size=1):
+        self.content_reads += 1
+        yield b'<html></html>'
+    def close(self):
+        self.closed = True
+
+def test_single_get_mode_uses_one_request(monkeypatch):
+    # Режим get: жодного HEAD, один GET зі stream=True, редиректи беруться з цієї ж відповіді
+    calls = []
+    response = StreamedGetResp()
+    def fake_get(url, **kwargs):
+        calls.append((url, kwargs))
+        return response
+    def fake_head(*args, **kwargs):
+        raise AssertionError("HEAD не повинен викликатися в режимі get")
+    monkeypatch.setattr(request_processor, 'get_session', lambda: FakeSession(head=fake_head, get=fake_get))
+    monkeypatch.setattr(request_processor, 'normalize_url', lambda u: u)
+    seen_html = []
+    monkeypatch.setattr(request_processor, '_perform_seo_and_link_checks', lambda final_url, html, *args, **kwargs: seen_html.append(html) or [{'url1_found': 'Так'}])
+
+    rows = [{"Url": "http://example.com/old", "Анкор-1": "a1", "Урл-1": "u1"}]
+    r = request_processor.check_status_code_requests(rows, fetch_mode="get")[0]
+
+    assert len(calls) == 1
+    # Редиректи проходяться вручну (redirect_cache.RedirectWalk): кожен крок - окремий запит без allow_redirects
+    assert calls[0][1]['stream'] is True and calls[0][1]['allow_redirects'] is False
+    assert r['redirect_chain'] == [{'url': 'http://example.com/old', 'status_code': 301}]
+    assert r['final_url'] == 'http://example.com/new'
+    assert r['status_code'] == 200 and r['final_status_code'] == 200
+    assert seen_html == ['<html></html>']
+    assert response.closed
+
+def test_single_get_mode_skips_non_html_body(monkeypatch):
+    # Для не-HTML відповіді тіло не читається, перевірки виконуються з порожнім HTML
+    response = StreamedGetResp(content_type='application/pdf')
+    monkeypatch.setattr(request_processor, 'get_session', lambda: FakeSession(get=lambda url, **kwargs: response))
+    seen_html = []
+    monkeypatch.setattr(request_processor, '_perform_seo_and_link_checks', lambda final_url, html, *args, **kwargs: seen_html.append(html) or [{}])
+
+    request_processor.check_status_code_requests([{"Url": "http://example.com/old"}], fetch_mode="get")
+
+    assert response.content_reads == 0
+    assert seen_html == [""]
+
+def test_unknown_fetch_mode_rejected():
+    with pytest.raises(ValueError):
+        request_processor.check_status_code_requests([], fetch_mode="options")
+
+def test_known_bad_ssl_host_skips_verified_attempt(monkeypatch):
+    # Після помилки SSL на першому донорі хоста другий донор одразу запитується з verify=False
+    calls = []
+    class HeadResp:
+        status_code = 404
+        history = []
+        def __init__(self, url):
+            self.url = url
+    def fake_head(url, allow_redirects, timeout, verify):
+        calls.append((url, verify))
+        if verify:
+            raise request_processor.requests.exceptions.SSLError("SSL: CERTIFICATE_VERIFY_FAILED")
+        return HeadResp(url)
+    monkeypatch.setattr(request_processor, 'get_session', lambda: FakeSession(head=fake_head))
+
+    rows = [{"Url": "https://bad.com/a"}, {"Url": "https://bad.com/b"}]
+    results = request_processor.check_status_code_requests(rows)
+
+    assert calls == [("https://bad.com/a", True), ("https://bad.com/a", False), ("https://bad.com/b", False)]
+    for r in results:
+        assert r['ssl_disabled'] is True
+        assert r['error'] == "SSL вимкнено: SSL: CERTIFICATE_VERIFY_FAILED"
+        assert r['final_status_code'] == 404
+
+def test_unresolved_host_fails_without_request(monkeypatch):
+    # Хост, який не знайдено на попередньому DNS-етапі, не запитується зовсім
+    from dns_cache import DnsCache
+    def resolver(host, *args):
+        raise socket.gaierror(-2, "Name or service not known")
+    dns = DnsCache(resolver=resolver)
+    dns.resolve_hosts(["http://gone.test/"])
+    monkeypatch.setattr(request_processor, 'get_session', lambda: FakeSession(
+        head=lambda *args, **kwargs: pytest.fail("запит до хоста без DNS-запису")))
+
+    r = request_processor.check_status_code_requests([{"Url": "http://gone.test/a"}], run_context=RunContext(dns_cache=dns))[0]
+    assert r['final_status_code'] == 0
+    assert r['error'] == "Хост не знайдено (DNS): [Errno -2] Name or service not known"
+
+def test_bounded_window_limits_submitted_groups():
+    # Подається не більше window груп одночасно, а результати - в порядку груп
+    from concurrent.futures import ThreadPoolExecutor
+    import threading
+    import time
+    lock = threading.Lock()
+    state = {"submitted": 0, "peak": 0}
+
+    def check(group):
+        time.sleep(0.005)
+        with lock:
+            state["submitted"] -= 1
+        return group * 10
+
+    def submit(group):
+        with lock:
+            state["submitted"] += 1
+            state["peak"] = max(state["peak"], state["submitted"])
+        return executor.submit(check, group)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = request_processor._run_groups_bounded(list(range(20)), 4, submit)
+    assert results == [group * 10 for group in range(20)]
+    assert state["peak"] <= 4
+
+def test_direct_run_has_no_retries_deadline_or_breaker():
+    # Повтори, ліміт часу рядка та запобіжник хостів вмикаються лише явно (як у main())
+    run = request_processor._new_run(RunContext(), "asyncio", 1)
+    assert run.retry_policy is None and run.host_timeouts is None and run.host_breaker is None
+    assert run.ssl_registry is not None and run.redirect_cache is not None
@@ -0,0 +1,94 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+import requests
+
+import retry_policy
+from retry_policy import RetryPolicy, parse_retry_after, is_transient_error, send_with_retries
+from run_context import RunContext, activate_run
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def policy():
+    sleeps = []
+    policy = RetryPolicy(max_retries=2, backoff_base=1, backoff_cap=5, budget=10, sleep=sleeps.append, rng=lambda: 0.5)
+    policy.sleeps = sleeps
+    with activate_run(RunContext(retry_policy=policy)):
+        yield policy
+
+def _sequence(*outcomes):
+    # send(), що по черзі повертає відповіді або кидає винятки
+    outcomes = list(outcomes)
+    calls = []
+    def send():
+        calls.append(1)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    send.calls = calls
+    return send
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:10 GMT", now=1445412480) == 10
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=1445412490) == 0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+def test_transient_errors_exclude_ssl():
+    assert is_transient_error(requests.exceptions.ConnectionError("refused"))
+    assert is_transient_error(requests.exceptions.ReadTimeout("slow"))
+    assert not is_transient_error(requests.exceptions.SSLError("bad cert"))
+    assert not is_transient_error(requests.exceptions.InvalidURL("bad url"))
+
+def test_delay_is_capped_exponential_with_jitter(policy):
+    assert [policy.delay(attempt) for attempt in range(5)] == [0.5, 1, 2, 2.5, 2.5]
+    # Retry-After має пріоритет, але не довше backoff_cap
+    assert policy.delay(0, "3") == 3
+    assert policy.delay(0, "120") == 5
+
+def test_connection_error_retried_until_success(policy):
+    send = _sequence(requests.exceptions.ConnectionError("refused"), requests.exceptions.ReadTimeout("slow"), FakeResponse(200))
+    assert send_with_retries(send, "HEAD").status_code == 200
+    assert len(send.calls) == 3
+    assert policy.sleeps == [0.5, 1]
+
+def test_retry_status_closes_response_and_honours_retry_after(policy):
+    busy = FakeResponse(429, {"Retry-After": "2"})
+    send = _sequence(busy, FakeResponse(200))
+    assert send_with_retries(send, "GET").status_code == 200
+    assert busy.closed
+    assert policy.sleeps == [2]
+
+def test_last_response_returned_after_max_retries(policy):
+    send = _sequence(FakeResponse(503), FakeResponse(503), FakeResponse(502))
+    assert send_with_retries(send, "GET").status_code == 502
+    assert policy.stats()["retries"] == 2
+
+def test_non_transient_error_not_retried(policy):
+    send = _sequence(requests.exceptions.SSLError("bad cert"))
+    with pytest.raises(requests.exceptions.SSLError):
+        send_with_retries(send, "HEAD")
+    assert len(send.calls) == 1
+
+def test_budget_limits_retries_across_requests(policy):
+    policy.budget = 1
+    assert send_with_retries(_sequence(FakeResponse(503), FakeResponse(200)), "GET").status_code == 200
+    assert send_with_retries(_sequence(FakeResponse(503), FakeResponse(200)), "GET").status_code == 503
+    assert policy.stats() == {"retries": 1, "budget_exhausted": 1, "budget": 1}
+
+def test_no_active_policy_means_single_attempt():
+    send = _sequence(requests.exceptions.ConnectionError("refused"))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        send_with_retries(send, "HEAD")
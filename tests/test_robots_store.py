@@ -0,0 +1,82 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from unittest.mock import patch, Mock
+
+import seo_checks
+from robots_store import RobotsStore
+from run_context import RunContext, activate_run
+
+ROBOTS_URL = "http://example.com/robots.txt"
+
+@pytest.fixture
+def store(tmp_path):
+    store = RobotsStore(str(tmp_path / "cache.sqlite"))
+    yield store
+    store.close()
+
+def _robots_response(status_code, text="", headers=None):
+    mock_resp = Mock()
+    mock_resp.status_code = status_code
+    mock_resp.text = text
+    mock_resp.headers = headers or {}
+    return mock_resp
+
+def _check_with_store(store, url, user_agent='*'):
+    # Кожен виклик - окремий запуск зі своїм кешем у пам'яті
+    with activate_run(RunContext(robots_cache=seo_checks.RobotsCache(store=store))):
+        return seo_checks.check_robots_txt(url, user_agent)
+
+def test_store_roundtrip_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    store = RobotsStore(path)
+    store.save(ROBOTS_URL, 200, "User-agent: *\nDisallow: /", {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+    store.close()
+
+    reopened = RobotsStore(path)
+    record = reopened.get(ROBOTS_URL)
+    reopened.close()
+    assert record["status_code"] == 200
+    assert record["body"] == "User-agent: *\nDisallow: /"
+    assert RobotsStore.conditional_headers(record) == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+def test_store_skips_transient_statuses(store):
+    store.save(ROBOTS_URL, 503, None, {})
+    assert store.get(ROBOTS_URL) is None
+
+def test_fresh_record_used_without_request(store):
+    store.save(ROBOTS_URL, 200, "User-agent: *\nDisallow: /", {})
+    with patch('requests.Session.get') as mock_get:
+        assert _check_with_store(store, "http://example.com/page") is False
+        mock_get.assert_not_called()
+    assert store.stats()["fresh"] == 1
+
+def test_stale_record_revalidated_with_304(store):
+    store.save(ROBOTS_URL, 200, "User-agent: *\nDisallow: /", {"ETag": '"v1"'})
+    store.ttl = 0
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value.__enter__.return_value = _robots_response(304)
+        assert _check_with_store(store, "http://example.com/page") is False
+        _, kwargs = mock_get.call_args
+        assert kwargs["headers"] == {"If-None-Match": '"v1"'}
+    assert store.stats()["not_modified"] == 1
+
+def test_stale_record_replaced_on_200(store):
+    store.save(ROBOTS_URL, 200, "User-agent: *\nDisallow: /", {"ETag": '"v1"'})
+    store.ttl = 0
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value.__enter__.return_value = _robots_response(200, "User-agent: *\nDisallow:", {"ETag": '"v2"'})
+        assert _check_with_store(store, "http://example.com/page") is True
+    record = store.get(ROBOTS_URL)
+    assert record["etag"] == '"v2"'
+    assert record["body"] == "User-agent: *\nDisallow:"
+
+def test_request_error_keeps_stored_record(store):
+    store.save(ROBOTS_URL, 404, None, {})
+    store.ttl = 0
+    with patch('requests.Session.get', side_effect=Exception("Connection error")):
+        assert _check_with_store(store, "http://example.com/page") is True
+    assert store.get(ROBOTS_URL)["status_code"] == 404
@@ -0,0 +1,55 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import contextvars
+import threading
+
+from run_context import RunContext, activate_run, current_run, run_component
+from retry_policy import RetryPolicy, get_retry_policy
+
+def test_activate_run_nests_and_restores():
+    outer = RunContext(retry_policy=RetryPolicy())
+    inner = RunContext()
+    assert current_run() is None
+    with activate_run(outer):
+        assert get_retry_policy() is outer.retry_policy
+        with activate_run(inner):
+            assert current_run() is inner
+            assert get_retry_policy() is None
+        assert current_run() is outer
+    assert run_component("retry_policy") is None
+
+def test_replace_copies_without_changing_original():
+    policy = RetryPolicy()
+    run = RunContext(retry_policy=policy)
+    copy = run.replace(single_flight="sf")
+    assert copy.retry_policy is policy and copy.single_flight == "sf"
+    assert run.single_flight is None
+
+def test_threads_see_run_only_with_copied_context():
+    run = RunContext(retry_policy=RetryPolicy())
+    seen = {}
+    with activate_run(run):
+        plain = threading.Thread(target=lambda: seen.update(plain=current_run()))
+        copied = threading.Thread(target=contextvars.copy_context().run, args=(lambda: seen.update(copied=current_run()),))
+        for thread in (plain, copied):
+            thread.start()
+            thread.join()
+    assert seen == {"plain": None, "copied": run}
+
+def test_concurrent_tasks_keep_their_own_run():
+    # Два запуски на одному циклі подій не бачать компонентів один одного
+    async def check(run):
+        with activate_run(run):
+            await asyncio.sleep(0.01)
+            return current_run()
+
+    async def main():
+        first, second = RunContext(), RunContext()
+        return await asyncio.gather(check(first), check(second)), (first, second)
+
+    seen, runs = asyncio.run(main())
+    assert tuple(seen) == runs
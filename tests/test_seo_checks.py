@@ -9,6 +9,7 @@ from bs4 import BeautifulSoup
 from unittest.mock import patch, Mock
 
 import seo_checks  # Імпортуємо модуль, який тестуємо
+from run_context import RunContext, activate_run
 
 # ------------------------ ТЕСТИ ДЛЯ check_robots_txt ------------------------
 
@@ -19,7 +20,7 @@ import seo_checks  # Імпортуємо модуль, який тестуєм
 ])
 def test_check_robots_txt_status_codes(status_code, expected):
     # Перевірка, як функція обробляє різні статус-коди відповіді на robots.txt
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_resp = Mock()
         mock_resp.status_code = status_code
         mock_resp.text = "User-agent: *\nDisallow:"
@@ -30,7 +31,7 @@ def test_check_robots_txt_status_codes(status_code, expected):
 
 def test_check_robots_txt_disallow():
     # Перевірка, коли robots.txt забороняє доступ
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_resp = Mock()
         mock_resp.status_code = 200
         mock_resp.text = "User-agent: *\nDisallow: /"
@@ -41,7 +42,7 @@ def test_check_robots_txt_disallow():
 
 def test_check_robots_txt_allow_specific_user_agent():
     # Перевірка для специфічного user-agent, який дозволено
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_resp = Mock()
         mock_resp.status_code = 200
         mock_resp.text = "User-agent: Googlebot\nDisallow:"
@@ -52,7 +53,7 @@ def test_check_robots_txt_allow_specific_user_agent():
 
 def test_check_robots_txt_disallow_specific_user_agent():
     # Перевірка для специфічного user-agent, якому заборонено
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_resp = Mock()
         mock_resp.status_code = 200
         mock_resp.text = "User-agent: Googlebot\nDisallow: /"
@@ -63,25 +64,25 @@ def test_check_robots_txt_disallow_specific_user_agent():
 
 def test_check_robots_txt_network_error():
     # Перевірка, що при винятку (наприклад, проблеми з мережею) повертається True
-    with patch('requests.get', side_effect=Exception("Connection error")):
+    with patch('requests.Session.get', side_effect=Exception("Connection error")):
         result = seo_checks.check_robots_txt("http://example.com")
         assert result is True
 
 def test_check_robots_txt_none_url():
     # Перевірка, що передача None не викликає помилку і функція повертає True
-    with patch('requests.get', side_effect=Exception("Invalid URL")):
+    with patch('requests.Session.get', side_effect=Exception("Invalid URL")):
         result = seo_checks.check_robots_txt(None)
         assert result is True
 
 def test_check_robots_txt_invalid_url():
     # Перевірка роботи з невалідним URL
-    with patch('requests.get', side_effect=Exception("Invalid URL format")):
+    with patch('requests.Session.get', side_effect=Exception("Invalid URL format")):
         result = seo_checks.check_robots_txt("not-a-valid-url")
         assert result is True
 
 def test_check_robots_txt_verify_ssl_false():
     # Перевірка, що параметр verify_ssl передається у запит
-    with patch('requests.get') as mock_get:
+    with patch('requests.Session.get') as mock_get:
         mock_resp = Mock()
         mock_resp.status_code = 200
         mock_resp.text = "User-agent: *\nDisallow:"
@@ -93,6 +94,56 @@ def test_check_robots_txt_verify_ssl_false():
         args, kwargs = mock_get.call_args
         assert kwargs["verify"] is False
 
+# ------------------------ ТЕСТИ ДЛЯ RobotsCache ------------------------
+
+@pytest.fixture
+def robots_cache():
+    cache = seo_checks.RobotsCache()
+    with activate_run(RunContext(robots_cache=cache)):
+        yield cache
+
+def test_robots_cache_fetches_once_per_origin(robots_cache):
+    # Дві перевірки (* та Googlebot) для кількох сторінок одного origin - один запит robots.txt
+    with patch('requests.Session.get') as mock_get:
+        mock_resp = Mock()
+        mock_resp.status_code = 200
+        mock_resp.text = "User-agent: Googlebot\nDisallow: /private"
+        mock_get.return_value.__enter__.return_value = mock_resp
+
+        assert seo_checks.check_robots_txt("http://example.com/a") is True
+        assert seo_checks.check_robots_txt("http://example.com/private/b", user_agent="Googlebot") is False
+        assert seo_checks.check_robots_txt("http://EXAMPLE.com/private/c") is True
+        assert mock_get.call_count == 1
+
+        seo_checks.check_robots_txt("https://example.com/a")
+        assert mock_get.call_count == 2
+    assert robots_cache.stats() == {"hits": 2, "misses": 2, "origins": 2}
+
+def test_robots_cache_keeps_error_outcome(robots_cache):
+    # Помилка запиту теж кешується: повторно недоступний хост не опитуємо
+    with patch('requests.Session.get', side_effect=Exception("Connection error")) as mock_get:
+        assert seo_checks.check_robots_txt("http://example.com/a") is True
+        assert seo_checks.check_robots_txt("http://example.com/b", user_agent="Googlebot") is True
+        assert mock_get.call_count == 1
+
+def test_robots_txt_not_cached_without_active_cache():
+    with patch('requests.Session.get') as mock_get:
+        mock_get.return_value.__enter__.return_value = Mock(status_code=404, text="")
+        seo_checks.check_robots_txt("http://example.com/a")
+        seo_checks.check_robots_txt("http://example.com/b")
+        assert mock_get.call_count == 2
+
+def test_robots_crawl_delay_passed_to_host_scheduler():
+    # Crawl-delay для * з robots.txt хоста сповільнює подальші запити до нього
+    from host_scheduler import HostScheduler
+    scheduler = HostScheduler(rate=0)
+    with activate_run(RunContext(host_scheduler=scheduler)):
+        seo_checks.robots_entry("http://example.com/robots.txt", 200, "User-agent: *\nCrawl-delay: 4\nDisallow:")
+        seo_checks.robots_entry("http://other.com/robots.txt", 200, "User-agent: *\nDisallow:")
+    assert scheduler.stats()["crawl_delay_hosts"] == 1
+    assert scheduler.reserve("http://example.com/a") == 0
+    assert scheduler.reserve("http://example.com/b") == pytest.approx(4, abs=0.1)
+
 # ========================== Далі йдуть інші функції ==========================
 
 # ------------------------ ТЕСТИ ДЛЯ check_indexing_directives ------------------------
@@ -269,7 +320,7 @@ def test_links_without_rel_but_correct_anchor():
     assert results['url1_rel'] is None
 
 # Інтеграційний тест: повна перевірка сторінки на robots.txt, мета-теги, canonical і посилання
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_full_page_analysis(mock_get):
     # Мокаємо robots.txt, який дозволяє доступ
     mock_resp = Mock()
@@ -310,7 +361,7 @@ def test_full_page_analysis(mock_get):
     assert link_results['anchor1_match'] == "Так"
 
 # Інтеграційний тест: коли відсутній robots.txt і canonical не збігається
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_no_robots_and_different_canonical(mock_get):
     mock_resp = Mock()
     mock_resp.status_code = 404
@@ -357,3 +408,60 @@ def test_googlebot_meta_and_rel_nofollow():
 
     link_results = seo_checks.check_links_on_page(html, url, "Anchor 1", "http://example.com/page1", None, None, None, None)
     assert link_results['url1_rel'] == "nofollow"
+
+def test_extract_links_reused_for_several_rows(monkeypatch):
+    # Посилання витягуються один раз; результати ті самі, що й при розборі HTML для кожного рядка
+    html = '<a href="/page1" rel="nofollow sponsored">Anchor 1</a><a href="http://[bad">x</a><a href="/page2">Anchor 2</a>'
+    links = seo_checks.extract_links(html, "https://example.com/")
+    assert [link["url"] for link in links] == ["https://example.com/page1", "https://example.com/page2"]
+    assert links[0]["rel"] == "nofollow, sponsored"
+
+    rows = [("Anchor 1", "https://example.com/page1", None, None, None, None),
+            ("Anchor 1", "https://example.com/page2", "Anchor 2", "https://example.com/page2", None, None)]
+    expected = [seo_checks.check_links_on_page(html, "https://example.com/", *pairs) for pairs in rows]
+    monkeypatch.setattr(seo_checks, 'BeautifulSoup', lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError("HTML вже розібрано")))
+    assert [seo_checks.check_links_on_page(html, "https://example.com/", *pairs, links=links) for pairs in rows] == expected
+
+# ------------------------ ТЕСТИ ДЛЯ PageCompletionTracker ------------------------
+
+def _feed_in_chunks(tracker, html, size=7):
+    # Подає HTML дрібними частинами, як під час потокового завантаження; повертає, після якої частини завершено
+    data = html.encode("utf-8")
+    for n, start in enumerate(range(0, len(data), size)):
+        if tracker.feed_bytes(data[start:start + size]):
+            return n
+    return None
+
+def test_tracker_completes_after_head_and_all_pairs():
+    html = ('<html><head><link rel="canonical" href="/"></head><body>'
+            '<a href="/one">First <b>Anchor</b></a><a href="http://other.com">Друге</a>'
+            + '<p>padding</p>' * 50 + '</body></html>')
+    tracker = seo_checks.PageCompletionTracker("http://example.com/", "FirstAnchor", "http://example.com/one",
+                                               "друге", "http://other.com", None, None)
+    stopped_at = _feed_in_chunks(tracker, html)
+    assert stopped_at is not None
+    # Зупинка відбулася до кінця сторінки
+    assert stopped_at * 7 < len(html.encode("utf-8")) - 500
+
+def test_tracker_waits_for_end_of_head():
+    tracker = seo_checks.PageCompletionTracker("http://example.com/", None, None, None, None, None, None)
+    assert tracker.feed_bytes(b'<html><head><meta name="robots" content="index">') is False
+    assert tracker.feed_bytes(b'</head>') is True
+
+def test_tracker_not_complete_on_anchor_mismatch():
+    html = '<html><head></head><body><a href="http://t.com/">Wrong</a></body></html>'
+    tracker = seo_checks.PageCompletionTracker("http://example.com/", "Right", "http://t.com", None, None, None, None)
+    assert _feed_in_chunks(tracker, html) is None
+
+def test_tracker_duplicate_pairs_need_separate_links():
+    # Як у check_links_on_page: одне посилання не може бути точним співпадінням для двох пар
+    tracker = seo_checks.PageCompletionTracker("http://example.com/", "a", "http://t.com", "a", "http://t.com", None, None)
+    assert tracker.feed_bytes(b'<head></head><a href="http://t.com">a</a>') is False
+    assert tracker.feed_bytes(b'<a href="http://t.com/">A</a>') is True
+
+def test_tracker_waits_for_pairs_of_every_row():
+    # Рядки з одним донором: одне посилання може бути співпадінням для пар різних рядків
+    tracker = seo_checks.PageCompletionTracker("http://example.com/", "a", "http://t.com", None, None, None, None)
+    tracker.add_pairs("a", "http://t.com", "b", "http://u.com", None, None)
+    assert tracker.feed_bytes(b'<head></head><a href="http://t.com">a</a>') is False
+    assert tracker.feed_bytes(b'<a href="http://u.com">b</a>') is True
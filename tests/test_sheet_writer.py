@@ -0,0 +1,107 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import threading
+
+import gspread
+import requests
+
+from sheet_writer import SheetWriter, result_size
+
+def _row(n):
+    return {"Url": f"http://example.com/{n}", "Анкор-1": "anchor", "Урл-1": "http://target.com"}
+
+def _result(n):
+    return dict(_row(n), url=f"http://example.com/{n}", final_status_code=200)
+
+class RecordingWriter:
+    """Замість Sheets API запам'ятовує пакети (номер рядка, Url); за потреби тримає запис до release."""
+
+    def __init__(self, blocked=False):
+        self.batches = []
+        self.release = threading.Event()
+        if not blocked:
+            self.release.set()
+
+    def __call__(self, worksheet, headers, row_results):
+        self.release.wait(5)
+        self.batches.append([(row_idx, result["Url"]) for row_idx, result in row_results])
+        return headers + ["Status Code"] if "Status Code" not in headers else headers
+
+def test_results_written_in_batches_with_sheet_row_numbers():
+    write_rows = RecordingWriter()
+    writer = SheetWriter(None, ["Url"], [(n + 2, _row(n)) for n in range(5)], batch_rows=2, write_rows=write_rows)
+    for n in (3, 0, 4, 1, 2):
+        writer.put(_result(n))
+    writer.close()
+    assert [len(batch) for batch in write_rows.batches] == [2, 2, 1]
+    assert sorted(row for batch in write_rows.batches for row in batch) == [(n + 2, f"http://example.com/{n}") for n in range(5)]
+    assert writer.headers == ["Url", "Status Code"]
+    assert writer.stats() == {"written": 5, "batches": 3, "waits": 0, "failed": 0}
+
+def test_full_queue_blocks_checks_until_batch_is_written():
+    # Черга вміщує лише один результат: другий put() чекає, доки перший пакет не запишеться
+    write_rows = RecordingWriter(blocked=True)
+    writer = SheetWriter(None, ["Url"], [(n + 2, _row(n)) for n in range(2)], batch_rows=10,
+                         max_pending_bytes=result_size(_result(0)), write_rows=write_rows)
+    writer.put(_result(0))
+    second = threading.Thread(target=writer.put, args=(_result(1),))
+    second.start()
+    second.join(0.3)
+    assert second.is_alive()
+    write_rows.release.set()
+    second.join(5)
+    writer.close()
+    assert write_rows.batches == [[(2, "http://example.com/0")], [(3, "http://example.com/1")]]
+    assert writer.stats()["waits"] == 1
+
+def test_duplicate_rows_and_restored_results():
+    # Два однакові рядки таблиці отримують по результату; put_remaining дописує лише незаписані
+    write_rows = RecordingWriter()
+    writer = SheetWriter(None, ["Url"], [(2, _row(0)), (3, _row(0)), (4, _row(1))], batch_rows=10, write_rows=write_rows)
+    writer.put(_result(0))
+    writer.put_remaining([_result(0), _result(0), _result(1)])
+    writer.put(_result(7)) # Рядка немає в таблиці
+    writer.close()
+    assert sorted(row for batch in write_rows.batches for row in batch) == [
+        (2, "http://example.com/0"), (3, "http://example.com/0"), (4, "http://example.com/1")]
+
+def test_failed_batch_is_kept_for_retry(capsys):
+    def failing(worksheet, headers, row_results):
+        raise RuntimeError("quota")
+    writer = SheetWriter(None, ["Url"], [(2, _row(0))], write_rows=failing)
+    writer.put(_result(0))
+    writer.close()
+    assert [row_idx for row_idx, _ in writer.failed] == [2]
+    assert writer.stats()["failed"] == 1
+    assert "quota" in capsys.readouterr().out
+
+class QuotaWorksheet:
+    """Аркуш, для якого Sheets API відхиляє оновлення комірок через квоту."""
+
+    def __init__(self):
+        self.header_updates = []
+
+    def update(self, values, range_name):
+        self.header_updates.append(list(values[0]))
+
+    def batch_update(self, batch):
+        response = requests.Response()
+        response.status_code = 429
+        response._content = json.dumps({"error": {"code": 429, "message": "Quota exceeded", "status": "RESOURCE_EXHAUSTED"}}).encode()
+        raise gspread.exceptions.APIError(response)
+
+def test_api_error_from_sheets_keeps_rows_for_retry():
+    # Справжній шлях update_rows_with_results: помилка API не губить рядки пакета
+    worksheet = QuotaWorksheet()
+    writer = SheetWriter(worksheet, ["Url"], [(n + 2, _row(n)) for n in range(2)], batch_rows=2)
+    writer.put(_result(0))
+    writer.put(_result(1))
+    writer.close()
+    assert sorted(row_idx for row_idx, _ in writer.failed) == [2, 3]
+    assert writer.stats() == {"written": 0, "batches": 0, "waits": 0, "failed": 2}
+    assert "Status Code" in writer.headers # Заголовки, додані до помилки, не додаються вдруге
+    assert len(worksheet.header_updates) == 1
@@ -0,0 +1,107 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight, coalesced
+from timeouts import RowDeadlineExceeded, row_deadline
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return "page"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do(("page", "u"), fetch))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["page"] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {"page": 3}
+
+def test_not_a_cache_after_completion():
+    flight = SingleFlight()
+    calls = []
+    for _ in range(2):
+        flight.do(("page", "u"), lambda: calls.append(1))
+    assert len(calls) == 2
+    assert flight.stats() == {}
+
+def test_error_shared_with_waiters():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.2)
+        raise ValueError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do(("indexing", "u"), failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=call)
+    follower.start()
+    leader.join()
+    follower.join()
+    assert errors == ["boom", "boom"]
+
+def test_waiter_respects_own_row_deadline():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "page"
+
+    leader = threading.Thread(target=lambda: flight.do(("page", "u"), slow))
+    leader.start()
+    started.wait()
+    with row_deadline(0.1):
+        with pytest.raises(RowDeadlineExceeded):
+            flight.do(("page", "u"), slow)
+    release.set()
+    leader.join()
+
+def test_async_calls_share_one_task_and_survive_cancelled_waiter():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return "page"
+
+    async def main():
+        cancelled = asyncio.ensure_future(flight.do_async(("page", "u"), fetch))
+        await asyncio.sleep(0.05)
+        waiters = [asyncio.ensure_future(flight.do_async(("page", "u"), fetch)) for _ in range(2)]
+        cancelled.cancel()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(main()) == ["page", "page"]
+    assert len(calls) == 1
+    assert flight.stats() == {"page": 2}
+
+def test_coalesced_without_active_single_flight_calls_directly():
+    assert coalesced(("page", "u"), lambda: 42) == 42
@@ -0,0 +1,40 @@
+import os
+import sys
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ssl_registry import SslHostRegistry, ssl_host_key
+
+def test_ssl_host_key():
+    assert ssl_host_key("https://Example.com:8443/page?x=1") == "example.com:8443"
+    assert ssl_host_key("not a url") is None
+
+def test_known_error_after_remember():
+    registry = SslHostRegistry()
+    assert registry.known_error("https://bad.com/a") is None
+    registry.remember("https://bad.com/a", "CERTIFICATE_VERIFY_FAILED")
+    # Інший шлях того ж хоста - той самий запис
+    assert registry.known_error("https://BAD.com/b") == "CERTIFICATE_VERIFY_FAILED"
+    assert registry.known_error("https://good.com/") is None
+    assert registry.stats() == {"hosts": 1, "skipped": 1}
+
+def test_registry_persists_between_runs(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first = SslHostRegistry(path)
+    first.remember("https://bad.com/", "CERTIFICATE_VERIFY_FAILED")
+    first.close()
+
+    second = SslHostRegistry(path)
+    assert second.known_error("https://bad.com/other") == "CERTIFICATE_VERIFY_FAILED"
+    second.close()
+
+def test_expired_records_ignored(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first = SslHostRegistry(path)
+    first.remember("https://bad.com/", "CERTIFICATE_VERIFY_FAILED")
+    first.close()
+
+    # Сертифікат могли виправити: записи старші за ttl не завантажуються
+    second = SslHostRegistry(path, ttl=0)
+    assert second.known_error("https://bad.com/") is None
+    second.close()
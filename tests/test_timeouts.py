@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+# Додаємо кореневу папку у шлях імпорту, щоб pytest бачив модуль
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+import http_client
+from timeouts import (HostTimeouts, RowDeadlineExceeded, row_deadline, time_left, check_deadline, clamp_to_deadline,
+                      fits_deadline)
+from run_context import RunContext, activate_run
+
+def test_no_deadline_outside_row():
+    assert time_left() is None
+    assert clamp_to_deadline(10) == 10
+    assert fits_deadline(1000)
+    check_deadline()
+
+def test_deadline_clamps_and_expires():
+    with row_deadline(0.2):
+        assert 0 < clamp_to_deadline(10) <= 0.2
+        assert not fits_deadline(1)
+        time.sleep(0.25)
+        with pytest.raises(RowDeadlineExceeded):
+            check_deadline()
+        with pytest.raises(RowDeadlineExceeded):
+            clamp_to_deadline(10)
+    # Після виходу з блоку ліміту знову немає
+    assert time_left() is None
+
+def test_deadline_disabled_with_zero():
+    with row_deadline(0):
+        assert time_left() is None
+
+def test_host_timeout_needs_enough_samples():
+    host_timeouts = HostTimeouts(min_samples=3)
+    host_timeouts.record("https://fast.com/a", 0.1)
+    host_timeouts.record("https://fast.com/b", 0.1)
+    assert host_timeouts.host_timeout("https://fast.com/", 10) == 10
+    host_timeouts.record("https://fast.com/c", 0.1)
+    # 0.1 * 3 менше мінімального таймауту - беремо мінімум
+    assert host_timeouts.host_timeout("https://fast.com/", 10) == 2
+    assert host_timeouts.stats() == {"hosts": 1, "shortened": 1}
+
+def test_host_timeout_uses_percentile_and_configured_cap():
+    host_timeouts = HostTimeouts(min_samples=5, percentile=0.95, multiplier=3, min_timeout=1)
+    for latency in (1, 1, 1, 1, 1.5):
+        host_timeouts.record("https://medium.com/", latency)
+    assert host_timeouts.host_timeout("https://medium.com/", 10) == 4.5
+    for latency in (5, 5, 5, 5, 5):
+        host_timeouts.record("https://slow.com/", latency)
+    # Адаптивний таймаут ніколи не перевищує налаштований
+    assert host_timeouts.host_timeout("https://slow.com/", 10) == 10
+
+def test_request_timeout_combines_host_timeout_and_deadline():
+    host_timeouts = HostTimeouts(min_samples=1, min_timeout=1)
+    host_timeouts.record("https://fast.com/", 0.5)
+    with activate_run(RunContext(host_timeouts=host_timeouts)):
+        assert http_client.request_timeout("head", "https://fast.com/page") == 1.5
+        # Для ValueSerp API адаптивний таймаут не застосовується
+        assert http_client.request_timeout("api", "https://fast.com/") == http_client.get_timeout("api")
+        with row_deadline(0.5):
+            assert http_client.request_timeout("head", "https://fast.com/page") <= 0.5
@@ -182,3 +182,25 @@ def test_integration_sheet_url_gid():
     assert sheet_id == "MySheetID"
     assert gid == 15
     assert normalized_url.endswith("?gid=15")
+
+
+# ------------------------ ТЕСТИ ДЛЯ buffered_row_output ------------------------
+
+def test_buffered_row_output_prints_block_on_exit(capsys):
+    # Вивід всередині контексту з'являється лише після виходу з нього
+    with utils.routed_stdout():
+        with utils.buffered_row_output() as buffer:
+            print("line1")
+            print("line2")
+            assert buffer.getvalue() == "line1\nline2\n"
+            inner = capsys.readouterr().out
+    assert inner == ""
+    assert capsys.readouterr().out == "line1\nline2\n"
+
+# ------------------------ ТЕСТИ ДЛЯ row_key ------------------------
+
+def test_row_key_normalizes_inputs():
+    base = {"Url": "http://example.com", "Анкор-1": "anchor", "Урл-1": "http://target.com"}
+    same = {"Url": "http://example.com/", "Анкор-1": " anchor ", "Урл-1": "http://target.com", "Анкор-2": float("nan")}
+    assert utils.row_key(base) == utils.row_key(same)
+    assert utils.row_key(base) != utils.row_key(dict(base, **{"Анкор-1": "other"}))
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlsplit
+
+import requests
+
+from run_context import run_component
+
+#
+# 3.6 ЛІМІТ ЧАСУ РЯДКА ТА АДАПТИВНІ ТАЙМАУТИ ХОСТІВ
+#
+
+# Загальний ліміт часу на перевірку одного донора (HEAD, GET, robots.txt, індексація), секунди
+DEFAULT_ROW_DEADLINE = 60
+
+# Адаптивний таймаут хоста: перцентиль затримки відповіді, помножений на запас, в межах
+# [DEFAULT_MIN_TIMEOUT, налаштований таймаут типу запиту]
+DEFAULT_LATENCY_PERCENTILE = 0.95
+DEFAULT_LATENCY_MULTIPLIER = 3
+DEFAULT_MIN_TIMEOUT = 2
+DEFAULT_MIN_SAMPLES = 5 # Скільки відповідей хоста потрібно, щоб довіряти перцентилю
+LATENCY_WINDOW = 50 # Скільки останніх затримок хоста враховується
+
+DEADLINE_MESSAGE = "Ліміт часу на перевірку рядка вичерпано"
+
+class RowDeadlineExceeded(requests.exceptions.Timeout):
+    """Ліміт часу рядка вичерпано: запит не надсилається або читання тіла зупиняється."""
+
+# Момент (time.monotonic), до якого має завершитися перевірка поточного рядка; свій для кожного потоку та asyncio-задачі
+_row_deadline = ContextVar("row_deadline", default=None)
+
+@contextmanager
+def row_deadline(seconds):
+    """Встановлює ліміт часу на перевірку рядка в межах блоку with (None або 0 - без ліміту)."""
+    token = _row_deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _row_deadline.reset(token)
+
+def time_left():
+    """Скільки секунд залишилось до ліміту часу поточного рядка (None - ліміту немає)."""
+    deadline = _row_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def check_deadline():
+    """Кидає RowDeadlineExceeded, якщо ліміт часу поточного рядка вичерпано."""
+    left = time_left()
+    if left is not None and left <= 0:
+        raise RowDeadlineExceeded(DEADLINE_MESSAGE)
+
+def clamp_to_deadline(timeout):
+    """Таймаут запиту, не довший за залишок часу рядка; RowDeadlineExceeded, якщо часу вже немає."""
+    check_deadline()
+    left = time_left()
+    return timeout if left is None else min(timeout, left)
+
+def fits_deadline(seconds):
+    """Чи встигне пауза в seconds секунд до ліміту часу рядка (для пауз між повторами)."""
+    left = time_left()
+    return left is None or seconds < left
+
+def is_deadline_error(error):
+    """Чи спричинена помилка лімітом часу рядка: RowDeadlineExceeded або таймаут, обрізаний до вже вичерпаного залишку."""
+    if isinstance(error, RowDeadlineExceeded):
+        return True
+    left = time_left()
+    return isinstance(error, (requests.exceptions.Timeout, asyncio.TimeoutError)) and left is not None and left <= 0
+
+def _host(url):
+    try:
+        return urlsplit(url).netloc.lower() or None
+    except (ValueError, AttributeError, TypeError):
+        return None
+
+class HostTimeouts:
+    """Адаптивні таймаути хостів на основі затримок відповідей протягом запуску.
+
+    Для хоста з щонайменше min_samples відповідями таймаут дорівнює percentile-перцентилю затримки,
+    помноженому на multiplier, але не менше min_timeout і не більше налаштованого таймауту типу запиту.
+    Швидкі хости отримують короткі таймаути, тож зависле з'єднання не тримає потік на повний таймаут.
+    """
+
+    def __init__(self, row_deadline=DEFAULT_ROW_DEADLINE, percentile=DEFAULT_LATENCY_PERCENTILE,
+                 multiplier=DEFAULT_LATENCY_MULTIPLIER, min_timeout=DEFAULT_MIN_TIMEOUT, min_samples=DEFAULT_MIN_SAMPLES):
+        self.row_deadline = row_deadline
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._latencies = {} # host -> deque останніх затримок, секунди
+        self.shortened = 0
+
+    def record(self, url, seconds):
+        """Запам'ятовує затримку відповіді (до отримання заголовків) для хоста URL."""
+        host = _host(url)
+        if host is None or seconds is None:
+            return
+        with self._lock:
+            self._latencies.setdefault(host, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def host_timeout(self, url, timeout):
+        """Таймаут для запиту до хоста URL: адаптивний, якщо для хоста достатньо спостережень, інакше timeout."""
+        host = _host(url)
+        with self._lock:
+            samples = sorted(self._latencies.get(host, ()))
+            if len(samples) < self.min_samples:
+                return timeout
+            latency = samples[min(len(samples) - 1, int(self.percentile * len(samples)))]
+            adaptive = min(timeout, max(self.min_timeout, latency * self.multiplier))
+            if adaptive < timeout:
+                self.shortened += 1
+            return adaptive
+
+    def stats(self):
+        """Кількість хостів зі спостереженнями та запитів, яким таймаут скорочено."""
+        with self._lock:
+            return {"hosts": len(self._latencies), "shortened": self.shortened}
+
+def get_host_timeouts():
+    """Адаптивні таймаути активного запуску або None."""
+    return run_component("host_timeouts")
@@ -1,6 +1,12 @@
+import hashlib
+import io
 import re
+import sys
+import threading
 import unicodedata
 import chardet
+from contextlib import contextmanager
+from contextvars import ContextVar
 from urllib.parse import urlparse, parse_qs, urlunparse, unquote
 
 #
@@ -35,6 +41,19 @@ def normalize_url(url_string):
         # У випадку помилки парсингу повертаємо оригінальний URL
         return url_string
 
+# Вхідні поля рядка таблиці, від яких залежить результат перевірки
+ROW_INPUT_FIELDS = ("Url", "Анкор-1", "Урл-1", "Анкор-2", "Урл-2", "Анкор-3", "Урл-3")
+
+def row_key(row_info):
+    """Стабільний ключ рядка за нормалізованим Url та парами Анкор/Урл (порожні значення і NaN - однакові)."""
+    values = []
+    for field in ROW_INPUT_FIELDS:
+        value = row_info.get(field)
+        # NaN з pandas не дорівнює сам собі
+        value = "" if value is None or value != value else str(value).strip()
+        values.append(normalize_url(value) if field == "Url" else value)
+    return hashlib.sha256("\x1f".join(values).encode("utf-8")).hexdigest()
+
 def extract_sheet_params(url):
     """Витягує ID таблиці та ID вкладки (gid) з URL Google таблиці."""
     sheet_id_match = re.search(r'/d/([a-zA-Z0-9-_]+)', url)
@@ -63,4 +82,52 @@ def detect_encoding(html_content_bytes):
         encoding = 'windows-1251'
 
     # Перевіряємо чи знайдено валідне кодування, інакше використовуємо utf-8
-    return encoding if encoding else 'utf-8' 
\ No newline at end of file
+    return encoding if encoding else 'utf-8' 
+
+#
+# 1.1 ВИВІД ПРИ ПАРАЛЕЛЬНІЙ ОБРОБЦІ
+#
+
+# ContextVar, а не threading.local: буфер має бути окремим і для потоків, і для asyncio-задач
+_row_output = ContextVar("row_output", default=None)
+_print_lock = threading.Lock()
+
+class _ThreadRoutedStdout:
+    """Проксі для sys.stdout: вивід потоку/задачі, що має буфер рядка, йде в цей буфер, решта - в оригінальний потік."""
+
+    def __init__(self, target):
+        self._target = target
+
+    def write(self, text):
+        buffer = _row_output.get()
+        return (buffer if buffer is not None else self._target).write(text)
+
+    def flush(self):
+        self._target.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+@contextmanager
+def routed_stdout():
+    """Тимчасово підміняє sys.stdout проксі, що розводить вивід потоків і задач по їхніх буферах."""
+    original = sys.stdout
+    sys.stdout = _ThreadRoutedStdout(original)
+    try:
+        yield
+    finally:
+        sys.stdout = original
+
+@contextmanager
+def buffered_row_output():
+    """Збирає вивід поточного потоку (або asyncio-задачі) в буфер і друкує його одним блоком після завершення."""
+    buffer = io.StringIO()
+    previous = _row_output.get()
+    token = _row_output.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _row_output.reset(token)
+        with _print_lock:
+            target = previous if previous is not None else sys.stdout
+            target.write(buffer.getvalue())